@@ -13,6 +13,8 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 from pathlib import Path
 import os
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -45,6 +47,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'equipment_api.metrics.MetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -79,10 +82,47 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# SQLite profiles, selected with DB_PROFILE. "tuned" enables WAL so readers
+# never block on the writer, relaxes fsyncs to WAL checkpoints, enlarges the
+# page cache and memory map, and keeps connections open between requests.
+# "default" reproduces SQLite's stock rollback-journal behaviour.
+SQLITE_PROFILES = {
+    'default': {
+        'conn_max_age': 0,
+        'timeout': 5,
+        'pragmas': {},
+    },
+    'tuned': {
+        'conn_max_age': 600,
+        'timeout': 20,
+        'pragmas': {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'cache_size': -64000,  # KiB, i.e. ~64MB
+            'mmap_size': 268435456,  # 256MB
+            'temp_store': 'MEMORY',
+        },
+    },
+}
+
+DB_PROFILE = os.environ.get('DB_PROFILE', 'tuned')
+if DB_PROFILE not in SQLITE_PROFILES:
+    raise ImproperlyConfigured(f"Unknown DB_PROFILE '{DB_PROFILE}', expected one of: {', '.join(SQLITE_PROFILES)}")
+
+# Bounded retries for writes that still hit "database is locked"
+DB_BUSY_RETRIES = int(os.environ.get('DB_BUSY_RETRIES', '5'))
+DB_BUSY_RETRY_BACKOFF = float(os.environ.get('DB_BUSY_RETRY_BACKOFF', '0.05'))
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': SQLITE_PROFILES[DB_PROFILE]['conn_max_age'],
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # Busy timeout (seconds) SQLite waits on a lock before raising
+            'timeout': SQLITE_PROFILES[DB_PROFILE]['timeout'],
+        },
     }
 }
 
@@ -155,3 +195,104 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 # File upload settings
 FILE_UPLOAD_MAX_MEMORY_SIZE = 10485760  # 10MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 10485760  # 10MB
+
+# Background report generation
+REPORTS_ROOT = os.path.join(MEDIA_ROOT, 'reports')
+REPORT_WORKERS = int(os.environ.get('REPORT_WORKERS', '2'))
+REPORT_JOB_STALE_SECONDS = int(os.environ.get('REPORT_JOB_STALE_SECONDS', '300'))
+
+# Rows of each lookup table (equipment names, types) cached per process, least recently used evicted first
+LOOKUP_CACHE_SIZE = int(os.environ.get('LOOKUP_CACHE_SIZE', '100000'))
+
+# Dataset retention and ingest
+DATASET_RETENTION = 5  # newest uploads kept; older ones are evicted on ingest
+INGEST_COORDINATOR = os.environ.get('INGEST_COORDINATOR', 'True') == 'True'
+INGEST_GROUP_LINGER = float(os.environ.get('INGEST_GROUP_LINGER', '0.02'))  # seconds to wait for more uploads
+INGEST_GROUP_MAX_ROWS = int(os.environ.get('INGEST_GROUP_MAX_ROWS', '200000'))
+INGEST_TIMEOUT = float(os.environ.get('INGEST_TIMEOUT', '120'))
+INGEST_LOCK_PATH = os.path.join(BASE_DIR, 'run', 'ingest.lock')
+
+# Tiered storage (see equipment_api.archive): with DATASET_ARCHIVE on, datasets
+# past the retention window are exported to compressed column files under
+# ARCHIVE_ROOT instead of deleted, and reading one rehydrates it; at most
+# ARCHIVE_CACHE_DATASETS stay rehydrated, the least recently read leave first
+DATASET_ARCHIVE = os.environ.get('DATASET_ARCHIVE', 'False') == 'True'
+ARCHIVE_ROOT = os.environ.get('ARCHIVE_ROOT', os.path.join(MEDIA_ROOT, 'archive'))
+ARCHIVE_CACHE_DATASETS = int(os.environ.get('ARCHIVE_CACHE_DATASETS', '2'))
+
+# Server-sent events (see equipment_api.events): one poller per worker process
+# reads new events every EVENTS_POLL_INTERVAL seconds; idle streams get a
+# keepalive comment every EVENTS_HEARTBEAT seconds and end after
+# EVENTS_STREAM_SECONDS, so clients reconnect and resume from their last event.
+# The newest EVENTS_RETAINED events are kept to resume from.
+EVENTS_POLL_INTERVAL = float(os.environ.get('EVENTS_POLL_INTERVAL', '0.5'))
+EVENTS_HEARTBEAT = float(os.environ.get('EVENTS_HEARTBEAT', '15'))
+EVENTS_STREAM_SECONDS = float(os.environ.get('EVENTS_STREAM_SECONDS', '300'))
+EVENTS_RETAINED = int(os.environ.get('EVENTS_RETAINED', '10000'))
+
+# CSV parsing: 'auto' uses the stdlib csv engine up to CSV_FAST_PATH_MAX_ROWS
+# lines and pandas above that; 'csv' or 'pandas' forces one engine
+CSV_ENGINE = os.environ.get('CSV_ENGINE', 'auto')
+if CSV_ENGINE not in ('auto', 'csv', 'pandas'):
+    raise ImproperlyConfigured(f"Unknown CSV_ENGINE '{CSV_ENGINE}', expected one of: auto, csv, pandas")
+CSV_FAST_PATH_MAX_ROWS = int(os.environ.get('CSV_FAST_PATH_MAX_ROWS', '2000'))
+# read_csv engine of the pandas path: 'auto' picks pyarrow when it is installed
+CSV_PANDAS_ENGINE = os.environ.get('CSV_PANDAS_ENGINE', 'auto')
+if CSV_PANDAS_ENGINE not in ('auto', 'c', 'pyarrow'):
+    raise ImproperlyConfigured(f"Unknown CSV_PANDAS_ENGINE '{CSV_PANDAS_ENGINE}', expected one of: auto, c, pyarrow")
+# Stored CSV uploads of at least CSV_SHARD_MIN_BYTES are parsed in shards by a
+# pool of CSV_PARSE_PROCESSES processes per worker; 0 or 1 parses in-process
+CSV_PARSE_PROCESSES = int(os.environ.get('CSV_PARSE_PROCESSES', '0'))
+CSV_SHARD_MIN_BYTES = int(os.environ.get('CSV_SHARD_MIN_BYTES', str(64 * 1024 * 1024)))
+
+# Anomaly detection at ingest (see equipment_api.anomalies): limits of the
+# IQR fences, the dataset z-score and the per-type modified z-score
+ANOMALY_IQR_FACTOR = float(os.environ.get('ANOMALY_IQR_FACTOR', '1.5'))
+ANOMALY_ZSCORE_LIMIT = float(os.environ.get('ANOMALY_ZSCORE_LIMIT', '3.0'))
+ANOMALY_ROBUST_LIMIT = float(os.environ.get('ANOMALY_ROBUST_LIMIT', '3.5'))
+
+# Upload admission control (see equipment_api.admission): concurrent uploads
+# per worker process and per host, bytes in flight per process, and uploads
+# per API token (a DRF rate such as '30/min'; empty to disable)
+UPLOAD_MAX_CONCURRENT_PER_PROCESS = int(os.environ.get('UPLOAD_MAX_CONCURRENT_PER_PROCESS', '2'))
+UPLOAD_MAX_CONCURRENT_PER_HOST = int(os.environ.get('UPLOAD_MAX_CONCURRENT_PER_HOST', '4'))
+# Also the largest upload accepted at all
+UPLOAD_MAX_INFLIGHT_BYTES = int(os.environ.get('UPLOAD_MAX_INFLIGHT_BYTES', str(256 * 1024 * 1024)))
+UPLOAD_RATE_LIMIT = os.environ.get('UPLOAD_RATE_LIMIT', '30/min') or None
+UPLOAD_RETRY_AFTER = int(os.environ.get('UPLOAD_RETRY_AFTER', '5'))  # seconds, sent with 503
+UPLOAD_SLOTS_DIR = os.path.join(BASE_DIR, 'run', 'upload-slots')
+
+# Compressed uploads (.csv.gz, .csv.bz2, .csv.zst) are decompressed as they are
+# parsed and rejected once they expand past either bound (zip bomb guard)
+UPLOAD_MAX_DECOMPRESSED_BYTES = int(os.environ.get('UPLOAD_MAX_DECOMPRESSED_BYTES', str(256 * 1024 * 1024)))
+UPLOAD_MAX_COMPRESSION_RATIO = int(os.environ.get('UPLOAD_MAX_COMPRESSION_RATIO', '100'))
+
+# Resumable chunked uploads: chunks wait under UPLOAD_SESSIONS_ROOT until
+# finalized; sessions idle for UPLOAD_SESSION_TTL seconds are deleted. Chunks
+# must fit in DATA_UPLOAD_MAX_MEMORY_SIZE, as they arrive as the request body.
+UPLOAD_SESSIONS_ROOT = os.path.join(MEDIA_ROOT, 'upload_sessions')
+UPLOAD_CHUNK_SIZE = int(os.environ.get('UPLOAD_CHUNK_SIZE', str(1024 * 1024)))
+UPLOAD_CHUNK_MAX_SIZE = 8 * 1024 * 1024
+UPLOAD_SESSION_MAX_BYTES = int(os.environ.get('UPLOAD_SESSION_MAX_BYTES', str(256 * 1024 * 1024)))
+UPLOAD_SESSION_TTL = int(os.environ.get('UPLOAD_SESSION_TTL', '86400'))
+
+# 'throttle' is shared by the workers on the host so rate limits hold across them
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'throttle': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'run', 'throttle'),
+    },
+}
+
+# Request metrics (exposed at /api/metrics/)
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True') == 'True'
+METRICS_DIR = os.path.join(BASE_DIR, 'run', 'metrics')  # per-worker snapshots merged by the endpoint
+METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', '5'))
+
+# Peak RSS growth allowed per request by `manage.py memory_budget`: a fixed
+# allowance plus an allowance per 100k rows
+MEMORY_BUDGET_BASE_MB = float(os.environ.get('MEMORY_BUDGET_BASE_MB', '64'))
+MEMORY_BUDGET_MB_PER_100K_ROWS = float(os.environ.get('MEMORY_BUDGET_MB_PER_100K_ROWS', '512'))
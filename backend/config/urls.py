@@ -21,6 +21,7 @@ from django.conf.urls.static import static
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/async/', include('equipment_api.async_urls')),
     path('api/', include('equipment_api.urls')),
     path('api-auth/', include('rest_framework.urls')),
 ]
@@ -1,20 +1,69 @@
 from django.contrib import admin
-from .models import Equipment, DatasetUpload
+from .models import AlertRule, Equipment, EquipmentName, EquipmentType, DatasetUpload, UploadSession
+from .search import InvalidSearch, match_expression, matching_name_ids
+
+
+class TagSearchMixin:
+    """Admin search through the full-text index over equipment tags instead of LIKE scans"""
+    # Field holding the EquipmentName id
+    tag_field = 'id'
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        try:
+            expression = match_expression(search_term)
+        except InvalidSearch:
+            return queryset.none(), False
+        return queryset.filter(**{f'{self.tag_field}__in': matching_name_ids(expression)}), False
 
 
 @admin.register(Equipment)
-class EquipmentAdmin(admin.ModelAdmin):
-    list_display = ['equipment_name', 'type', 'flowrate', 'pressure', 'temperature', 'dataset', 'created_at']
+class EquipmentAdmin(TagSearchMixin, admin.ModelAdmin):
+    list_display = ['equipment_name', 'type_name', 'flowrate', 'pressure', 'temperature', 'dataset', 'created_at']
+    # Types are picked in the filter; the search box looks up tags
     list_filter = ['type', 'dataset', 'created_at']
-    search_fields = ['equipment_name', 'type']
+    search_fields = ['name__name']
+    tag_field = 'name_id'
     ordering = ['-created_at']
     readonly_fields = ['created_at']
 
 
 @admin.register(DatasetUpload)
 class DatasetUploadAdmin(admin.ModelAdmin):
-    list_display = ['filename', 'upload_timestamp', 'total_count', 'avg_flowrate', 'avg_pressure', 'avg_temperature']
-    list_filter = ['upload_timestamp']
+    list_display = ['filename', 'upload_timestamp', 'total_count', 'avg_flowrate', 'avg_pressure', 'avg_temperature',
+                    'storage']
+    list_filter = ['upload_timestamp', 'storage']
     search_fields = ['filename']
     ordering = ['-upload_timestamp']
-    readonly_fields = ['upload_timestamp', 'total_count', 'avg_flowrate', 'avg_pressure', 'avg_temperature', 'type_distribution']
+    readonly_fields = ['upload_timestamp', 'total_count', 'avg_flowrate', 'avg_pressure', 'avg_temperature', 'type_distribution',
+                       'storage', 'archive_file', 'accessed_at']
+
+
+@admin.register(EquipmentType)
+class EquipmentTypeAdmin(admin.ModelAdmin):
+    list_display = ['id', 'name']
+    search_fields = ['name']
+
+
+@admin.register(EquipmentName)
+class EquipmentNameAdmin(TagSearchMixin, admin.ModelAdmin):
+    list_display = ['id', 'name']
+    search_fields = ['name']
+
+
+@admin.register(UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    list_display = ['id', 'filename', 'user', 'size', 'status', 'dataset_id', 'created_at', 'updated_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['filename']
+    ordering = ['-created_at']
+    readonly_fields = ['created_at', 'updated_at']
+
+
+@admin.register(AlertRule)
+class AlertRuleAdmin(admin.ModelAdmin):
+    list_display = ['name', 'equipment_type', 'parameter', 'min_value', 'max_value', 'severity', 'enabled']
+    list_filter = ['equipment_type', 'parameter', 'severity', 'enabled']
+    search_fields = ['name']
+    readonly_fields = ['created_at', 'updated_at']
@@ -0,0 +1,156 @@
+"""
+Admission control for the upload endpoint.
+
+A burst of large uploads must not occupy every worker, or read endpoints
+such as the summary stop answering. Before the request body is read, an
+upload has to obtain:
+
+* a slot in its process: at most ``UPLOAD_MAX_CONCURRENT_PER_PROCESS``
+  uploads, together declaring at most ``UPLOAD_MAX_INFLIGHT_BYTES``
+  (``Content-Length``);
+* a slot on the host: one of ``UPLOAD_MAX_CONCURRENT_PER_HOST`` lock files
+  in ``UPLOAD_SLOTS_DIR``, held with a non-blocking ``flock`` for the
+  duration of the upload, so every gunicorn worker shares the cap and a
+  killed worker's slot is released by the kernel.
+
+Otherwise the upload is refused with 503 and ``Retry-After``. An upload that
+alone declares more than ``UPLOAD_MAX_INFLIGHT_BYTES`` could never be
+admitted and is refused with 413 (``UploadTooLarge``), even by an idle
+worker: ``DATA_UPLOAD_MAX_MEMORY_SIZE`` does not apply to file uploads, so
+nothing else caps their size. Independently,
+``UploadRateThrottle`` limits each API token to ``UPLOAD_RATE_LIMIT``
+uploads (429 with ``Retry-After``, from DRF), counted in a file-based cache
+shared by the workers on the host.
+"""
+
+import os
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import SimpleRateThrottle
+
+from .metrics import registry
+
+try:
+    import fcntl
+except ImportError:  # Windows development servers run a single process
+    fcntl = None
+
+
+class UploadAdmissionDenied(Exception):
+    """No capacity for another upload right now; retry after ``retry_after`` seconds"""
+
+    def __init__(self, reason, message):
+        super().__init__(message)
+        self.reason = reason
+        self.retry_after = settings.UPLOAD_RETRY_AFTER
+
+
+class UploadTooLarge(Exception):
+    """An upload larger than ``UPLOAD_MAX_INFLIGHT_BYTES``, refused however idle the worker is"""
+
+    reason = 'too_large'
+
+    def __init__(self):
+        super().__init__(f'Upload exceeds the limit of {settings.UPLOAD_MAX_INFLIGHT_BYTES} bytes')
+
+
+class _ProcessUploads:
+    """Uploads admitted in this process and the bytes they declared"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = 0
+        self.inflight_bytes = 0
+
+    def acquire(self, size):
+        if size > settings.UPLOAD_MAX_INFLIGHT_BYTES:
+            raise UploadTooLarge()
+        with self.lock:
+            if self.active >= settings.UPLOAD_MAX_CONCURRENT_PER_PROCESS:
+                raise UploadAdmissionDenied('process', 'Too many uploads in progress on this worker')
+            if self.inflight_bytes + size > settings.UPLOAD_MAX_INFLIGHT_BYTES:
+                raise UploadAdmissionDenied('bytes', 'Too much upload data in progress on this worker')
+            self.active += 1
+            self.inflight_bytes += size
+
+    def release(self, size):
+        with self.lock:
+            self.active -= 1
+            self.inflight_bytes -= size
+
+
+_process_uploads = _ProcessUploads()
+
+
+def _acquire_host_slot():
+    """Open and lock a free host slot file, or None when there is no host-wide cap"""
+    if fcntl is None or settings.UPLOAD_MAX_CONCURRENT_PER_HOST <= 0:
+        return None
+    os.makedirs(settings.UPLOAD_SLOTS_DIR, exist_ok=True)
+    for slot in range(settings.UPLOAD_MAX_CONCURRENT_PER_HOST):
+        slot_file = open(os.path.join(settings.UPLOAD_SLOTS_DIR, f'{slot}.lock'), 'a')
+        try:
+            fcntl.flock(slot_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            slot_file.close()
+            continue
+        return slot_file
+    raise UploadAdmissionDenied('host', 'Too many uploads in progress, please retry shortly')
+
+
+class UploadTicket:
+    """An admitted upload; leaving the ``with`` block gives its slots back"""
+
+    def __init__(self, size, host_slot):
+        self.size = size
+        self.host_slot = host_slot
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.host_slot is not None:
+            self.host_slot.close()  # closing the file drops its flock
+        _process_uploads.release(self.size)
+
+
+def admit_upload(size):
+    """Reserve process and host capacity for an upload of ``size`` bytes.
+
+    Returns an ``UploadTicket`` to hold while the upload is processed, or
+    raises ``UploadAdmissionDenied`` or ``UploadTooLarge``.
+    """
+    try:
+        _process_uploads.acquire(size)
+        try:
+            host_slot = _acquire_host_slot()
+        except BaseException:
+            _process_uploads.release(size)
+            raise
+    except (UploadAdmissionDenied, UploadTooLarge) as e:
+        if settings.METRICS_ENABLED:
+            registry.inc('upload_admission_total', {'outcome': f'denied_{e.reason}'})
+        raise
+    if settings.METRICS_ENABLED:
+        registry.inc('upload_admission_total', {'outcome': 'admitted'})
+    return UploadTicket(size, host_slot)
+
+
+class UploadRateThrottle(SimpleRateThrottle):
+    """``UPLOAD_RATE_LIMIT`` uploads per API token, shared by the workers on the host"""
+
+    scope = 'upload'
+
+    @property
+    def cache(self):
+        return caches['throttle']
+
+    def get_rate(self):
+        return settings.UPLOAD_RATE_LIMIT
+
+    def get_cache_key(self, request, view):
+        if request.auth is None:
+            return None
+        return self.cache_format % {'scope': self.scope, 'ident': request.auth.pk}
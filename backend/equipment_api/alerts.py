@@ -0,0 +1,107 @@
+"""
+Threshold alert rules evaluated at ingest.
+
+``AlertRule`` rows hold a site's operating limits: a minimum and/or a
+maximum for one parameter, of one equipment type or of every type. The
+enabled rules are compiled into one group per (type, parameter), holding the
+group's bounds as arrays. A new dataset's readings are sorted once per
+parameter and evaluated group by group: ``searchsorted`` finds for all of
+the group's rules at once how many of the group's readings lie below each
+minimum and above each maximum; the violations are a prefix and a suffix of
+the sorted readings. The cost grows with the rows and the violations found, hardly with
+the number of rules.
+
+Violations are written with the dataset as ``Alert`` rows, indexed by
+dataset, so all alerts of a dataset are one indexed query.
+"""
+
+from .models import Alert, AlertRule
+
+BOUNDS = (Alert.BOUND_MIN, Alert.BOUND_MAX)
+
+
+class CompiledRules:
+    """Enabled rules grouped by (equipment type, '' for every type, and parameter), bounds as arrays"""
+
+    def __init__(self, rules):
+        import numpy as np
+
+        grouped = {}
+        for rule_id, equipment_type, parameter, min_value, max_value in rules:
+            grouped.setdefault((equipment_type, parameter), []).append((rule_id, min_value, max_value))
+
+        # (type, parameter) -> (rule ids, minimums, maximums); a missing bound never matches
+        self.groups = {}
+        for key, group in grouped.items():
+            rule_ids, minimums, maximums = zip(*group)
+            self.groups[key] = (
+                np.array(rule_ids, dtype=np.int64),
+                np.array([-np.inf if value is None else value for value in minimums]),
+                np.array([np.inf if value is None else value for value in maximums]),
+            )
+
+
+def load_rules():
+    """Compile the enabled alert rules"""
+    return CompiledRules(list(
+        AlertRule.objects.filter(enabled=True).order_by().values_list(
+            'id', 'equipment_type', 'parameter', 'min_value', 'max_value'
+        )
+    ))
+
+
+def evaluate_alerts(rules, arrays):
+    """Violations of the ``CompiledRules`` in a dataset's ``DatasetArrays``.
+
+    Returns (row position, rule id, value, limit, bound) tuples in row order.
+    """
+    import numpy as np
+
+    type_codes = {name: code for code, name in enumerate(arrays.types)}
+    # Parameter -> row positions by reading, missing readings left out; sorted once per parameter
+    sorted_rows = {}
+    positions, rule_ids, values, limits, bounds = [], [], [], [], []
+    for (equipment_type, parameter), (group_ids, minimums, maximums) in rules.groups.items():
+        if equipment_type and equipment_type not in type_codes:
+            continue
+        readings = arrays.readings[parameter]
+        if parameter not in sorted_rows:
+            order = np.argsort(readings, kind='stable')
+            sorted_rows[parameter] = order[~np.isnan(readings[order])]
+        rows = sorted_rows[parameter]
+        if equipment_type:
+            # Filtering keeps the order, so one type's rows need no sort of their own
+            rows = rows[arrays.type_codes[rows] == type_codes[equipment_type]]
+        ordered = readings[rows]
+
+        # Readings before ``below`` are under the minimum, from ``above`` on over the maximum
+        below = np.searchsorted(ordered, minimums, side='left')
+        above = np.searchsorted(ordered, maximums, side='right')
+        for index in np.flatnonzero(below > 0):
+            matched = rows[:below[index]]
+            positions.append(matched)
+            values.append(readings[matched])
+            rule_ids.append(np.full(len(matched), group_ids[index]))
+            limits.append(np.full(len(matched), minimums[index]))
+            bounds.append(np.zeros(len(matched), dtype=np.intp))
+        for index in np.flatnonzero(above < len(rows)):
+            matched = rows[above[index]:]
+            positions.append(matched)
+            values.append(readings[matched])
+            rule_ids.append(np.full(len(matched), group_ids[index]))
+            limits.append(np.full(len(matched), maximums[index]))
+            bounds.append(np.ones(len(matched), dtype=np.intp))
+
+    if not positions:
+        return []
+    positions, rule_ids, values, limits, bounds = (
+        np.concatenate(column) for column in (positions, rule_ids, values, limits, bounds)
+    )
+    order = np.lexsort((rule_ids, positions))
+    return list(zip(
+        positions[order].tolist(),
+        rule_ids[order].tolist(),
+        values[order].tolist(),
+        limits[order].tolist(),
+        [BOUNDS[bound] for bound in bounds[order].tolist()],
+    ))
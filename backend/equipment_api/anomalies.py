@@ -0,0 +1,102 @@
+"""
+Outlier and anomaly detection at ingest.
+
+Three vectorized tests run over each reading column of a dataset when it is
+ingested:
+
+* ``iqr``: beyond Tukey's fences, ``ANOMALY_IQR_FACTOR`` interquartile ranges
+  outside the dataset's quartiles;
+* ``zscore``: more than ``ANOMALY_ZSCORE_LIMIT`` standard deviations from the
+  dataset mean;
+* ``type``: a modified z-score beyond ``ANOMALY_ROBUST_LIMIT``, from the
+  median and median absolute deviation of the rows of the same equipment
+  type. This catches a pump at 140 bar although 140 bar is a normal reactor
+  pressure.
+
+Each test rates a reading by how far past its limit it lies, 1 being on the
+limit. Rows rated above 1 by any test are flagged: ``Equipment.anomaly_score``
+holds the highest rating and ``anomaly_reasons`` the failed
+``<column>:<test>`` pairs. Other rows keep a NULL score, so the partial index
+over flagged rows stays small, and the anomalies endpoint, the equipment list
+and the PDF report only read the stored flags.
+"""
+
+from django.conf import settings
+
+from .derived import READING_COLUMNS
+
+TESTS = ('iqr', 'zscore', 'type')
+# Scales the median absolute deviation to a standard deviation for normal data
+MAD_SCALE = 0.6745
+
+
+def _iqr_rating(values, type_codes):
+    import numpy as np
+
+    present = values[~np.isnan(values)]
+    if not len(present):
+        return np.full(len(values), np.nan)
+    q1, q3 = np.percentile(present, [25, 75])
+    span = settings.ANOMALY_IQR_FACTOR * (q3 - q1)
+    if span <= 0:
+        return np.zeros(len(values))
+    return np.maximum(values - q3, q1 - values) / span
+
+
+def _zscore_rating(values, type_codes):
+    import numpy as np
+
+    present = values[~np.isnan(values)]
+    std = present.std() if len(present) else 0.0
+    if std <= 0:
+        return np.zeros(len(values))
+    return np.abs(values - present.mean()) / (std * settings.ANOMALY_ZSCORE_LIMIT)
+
+
+def _type_rating(values, type_codes):
+    import numpy as np
+
+    types = type_codes.max() + 1 if len(type_codes) else 0
+    medians = np.full(types, np.nan)
+    deviations = np.full(types, np.nan)
+    for code in range(types):
+        group = values[type_codes == code]
+        group = group[~np.isnan(group)]
+        if len(group):
+            medians[code] = np.median(group)
+            deviations[code] = np.median(np.abs(group - medians[code]))
+    # A type whose readings are mostly identical has no spread to measure against
+    deviations[deviations <= 0] = np.nan
+    return MAD_SCALE * np.abs(values - medians[type_codes]) / (deviations[type_codes] * settings.ANOMALY_ROBUST_LIMIT)
+
+
+RATINGS = {
+    'iqr': _iqr_rating,
+    'zscore': _zscore_rating,
+    'type': _type_rating,
+}
+
+
+def detect_anomalies(arrays):
+    """Anomaly fields of a dataset's ``DatasetArrays``: ``anomaly_score`` and ``anomaly_reasons`` in row order"""
+    import numpy as np
+
+    labels = []
+    ratings = []
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for column in READING_COLUMNS:
+            for test in TESTS:
+                labels.append(f'{column}:{test}')
+                ratings.append(RATINGS[test](arrays.readings[column], arrays.type_codes))
+    ratings = np.vstack(ratings)
+
+    # fmax skips the NaN ratings of missing readings and undefined spreads
+    scores = np.fmax.reduce(ratings, axis=0)
+    flagged = np.flatnonzero(scores > 1)
+    anomaly_scores = [None] * len(scores)
+    anomaly_reasons = [''] * len(scores)
+    failed = ratings[:, flagged] > 1
+    for position, index in enumerate(flagged.tolist()):
+        anomaly_scores[index] = float(scores[index])
+        anomaly_reasons[index] = ','.join(label for label, fails in zip(labels, failed[:, position]) if fails)
+    return {'anomaly_score': anomaly_scores, 'anomaly_reasons': anomaly_reasons}
@@ -0,0 +1,189 @@
+"""
+Tiered storage for datasets past the retention window.
+
+With ``DATASET_ARCHIVE`` off, retention deletes old datasets outright. With it
+on, retention archives them instead: a dataset's equipment rows are written
+column by column to a compressed NumPy file under ``ARCHIVE_ROOT`` and
+deleted from ``Equipment``. The ``DatasetUpload`` row stays with its summary,
+as do its alerts and trend rollups, so history, summaries, trends and search
+never touch the archive.
+
+Reading the rows of an archived dataset rehydrates it: the rows are inserted
+again under their original ids, so its alerts still point at them, and every
+read path works unchanged. Rehydrated datasets form a cache bounded by
+``ARCHIVE_CACHE_DATASETS``; whenever a dataset joins it, the least recently
+read ones beyond the bound drop their rows again. Their archive files are
+kept, so leaving the cache costs one DELETE.
+
+A dataset can thus lose its rows while a request reads them: the
+rehydration of other datasets evicts it, or retention archives it. Reads go
+through ``read_hot``, which compares the dataset's storage and rehydration
+count after the read with those it started from and reads again if they
+changed, rather than returning an empty or partial result.
+"""
+
+import os
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .db import retry_on_locked
+from .models import DatasetUpload, Equipment
+
+# Equipment columns kept in an archive; rehydrated rows get a new created_at
+ARCHIVE_FIELDS = [
+    field for field in Equipment._meta.concrete_fields if field.attname not in ('dataset_id', 'created_at')
+]
+# Reads of a dataset whose rows keep moving before giving up
+READ_ATTEMPTS = 3
+
+
+class DatasetUnavailable(Exception):
+    """The rows of a dataset were evicted during every attempt to read them"""
+
+    def __init__(self, dataset):
+        super().__init__(f'Dataset {dataset.id} was moved between storage tiers while it was read; retry')
+
+
+def archive_path(dataset):
+    return os.path.join(settings.ARCHIVE_ROOT, f"dataset_{dataset.id}.npz")
+
+
+def _column(field, values):
+    """One archived column; NULLs become NaN, as every nullable column is a float"""
+    import numpy as np
+
+    internal_type = field.get_internal_type()
+    if internal_type == 'CharField':
+        return np.array(values, dtype=str)
+    if internal_type == 'FloatField':
+        return np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+    return np.array(values, dtype=np.int64)
+
+
+def export_dataset(dataset):
+    """Write a dataset's equipment rows to its archive file, returning the file's path"""
+    import numpy as np
+
+    names = [field.attname for field in ARCHIVE_FIELDS]
+    # In (dataset, created_at) index order, which is insertion order
+    rows = list(Equipment.objects.filter(dataset=dataset).order_by('created_at', 'id').values_list(*names))
+    values = list(zip(*rows)) if rows else [()] * len(names)
+    columns = {field.attname: _column(field, column) for field, column in zip(ARCHIVE_FIELDS, values)}
+
+    path = archive_path(dataset)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Written aside and renamed, so a crash never leaves a truncated archive behind
+    with open(f'{path}.tmp', 'wb') as output:
+        np.savez_compressed(output, **columns)
+    os.replace(f'{path}.tmp', path)
+    return path
+
+
+def load_archive(dataset):
+    """Unsaved ``Equipment`` objects, with their original ids, from a dataset's archive file"""
+    import numpy as np
+
+    with np.load(dataset.archive_file, allow_pickle=False) as archive:
+        # Fields added after the dataset was archived keep their defaults
+        fields = [field for field in ARCHIVE_FIELDS if field.attname in archive.files]
+        columns = []
+        for field in fields:
+            column = archive[field.attname]
+            if field.null:
+                column = np.where(np.isnan(column), None, column)
+            columns.append(column.tolist())
+    names = [field.attname for field in fields]
+    return [Equipment(dataset_id=dataset.id, **dict(zip(names, row))) for row in zip(*columns)]
+
+
+def archive_dataset(dataset):
+    """Move a hot dataset's equipment rows to its archive file; runs in the writer's transaction"""
+    dataset.archive_file = export_dataset(dataset)
+    Equipment.objects.filter(dataset=dataset).delete()
+    dataset.storage = DatasetUpload.STORAGE_ARCHIVED
+    dataset.save(update_fields=['storage', 'archive_file'])
+
+
+def evict_rehydrated():
+    """Drop the rows of the least recently read rehydrated datasets beyond ``ARCHIVE_CACHE_DATASETS``"""
+    stale = DatasetUpload.objects.filter(storage=DatasetUpload.STORAGE_REHYDRATED).order_by(
+        '-accessed_at', '-id'
+    )[settings.ARCHIVE_CACHE_DATASETS:]
+    for dataset_id in list(stale.values_list('id', flat=True)):
+        Equipment.objects.filter(dataset_id=dataset_id).delete()
+        DatasetUpload.objects.filter(id=dataset_id).update(storage=DatasetUpload.STORAGE_ARCHIVED, accessed_at=None)
+
+
+@retry_on_locked
+def _write_rehydrated(dataset, equipment):
+    """Insert an archived dataset's rows and return its rehydration count"""
+    from .ingest import host_write_lock
+
+    with host_write_lock(), transaction.atomic():
+        # Another request may have rehydrated the dataset while this one waited for the lock
+        storage, rehydrations = DatasetUpload.objects.filter(id=dataset.id).values_list(
+            'storage', 'rehydrations'
+        ).get()
+        if storage == DatasetUpload.STORAGE_ARCHIVED:
+            Equipment.objects.bulk_create(equipment)
+            rehydrations += 1
+        DatasetUpload.objects.filter(id=dataset.id).update(
+            storage=DatasetUpload.STORAGE_REHYDRATED, accessed_at=timezone.now(), rehydrations=rehydrations
+        )
+        evict_rehydrated()
+    return rehydrations
+
+
+def ensure_hot(dataset):
+    """Make the equipment rows of a dataset readable, rehydrating it from its archive if needed"""
+    if dataset.storage == DatasetUpload.STORAGE_HOT:
+        return
+    now = timezone.now()
+    if dataset.storage == DatasetUpload.STORAGE_REHYDRATED:
+        # Every read moves the dataset to the front of the cache
+        if DatasetUpload.objects.filter(
+            id=dataset.id, storage=DatasetUpload.STORAGE_REHYDRATED, rehydrations=dataset.rehydrations
+        ).update(accessed_at=now):
+            dataset.accessed_at = now
+            return
+        # It left the cache since it was read; rehydrate it again
+
+    # Read and decode the file before taking the write lock
+    dataset.rehydrations = _write_rehydrated(dataset, load_archive(dataset))
+    dataset.storage = DatasetUpload.STORAGE_REHYDRATED
+    dataset.accessed_at = now
+
+
+def rows_may_move(dataset):
+    """Whether the rows of a dataset can be evicted or archived during a read"""
+    return dataset.storage != DatasetUpload.STORAGE_HOT or settings.DATASET_ARCHIVE
+
+
+def kept_rows(dataset):
+    """Whether the rows of a dataset stayed in place since ``ensure_hot``, refreshing its storage if not"""
+    current = DatasetUpload.objects.filter(id=dataset.id).values_list('storage', 'rehydrations').first()
+    if current is None:
+        # Deleted by retention; reading again finds nothing either
+        return True
+    if current == (dataset.storage, dataset.rehydrations):
+        return True
+    dataset.storage, dataset.rehydrations = current
+    return False
+
+
+def read_hot(dataset, read):
+    """Return ``read()``, a complete read of a dataset's rows, once it ran while the rows stayed in place.
+
+    An archived dataset is rehydrated first; a read during which the rows
+    moved runs again, up to ``READ_ATTEMPTS`` times.
+    """
+    if not rows_may_move(dataset):
+        return read()
+    for _ in range(READ_ATTEMPTS):
+        ensure_hot(dataset)
+        result = read()
+        if kept_rows(dataset):
+            return result
+    raise DatasetUnavailable(dataset)
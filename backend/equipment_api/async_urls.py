@@ -0,0 +1,11 @@
+from django.urls import path
+from . import async_views
+
+urlpatterns = [
+    path('equipment/', async_views.equipment_list, name='async_equipment_list'),
+    path('equipment/page/', async_views.equipment_page, name='async_equipment_page'),
+    path('equipment/stream/', async_views.equipment_stream, name='async_equipment_stream'),
+    path('summary/', async_views.summary_view, name='async_summary'),
+    path('history/', async_views.history_view, name='async_history'),
+    path('events/', async_views.events_view, name='async_events'),
+]
@@ -0,0 +1,318 @@
+"""
+Native async read endpoints built on Django's async ORM.
+
+DRF's ``@api_view`` only supports synchronous views, so these are plain
+Django coroutine views that reuse the DRF token model and serializers and
+return the same payloads as their counterparts in ``views``. Under an ASGI
+server a request waiting on a slow client or a long stream no longer holds a
+worker thread.
+"""
+
+import itertools
+import json
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework.authtoken.models import Token
+
+from .archive import READ_ATTEMPTS, DatasetUnavailable, ensure_hot, kept_rows, rows_may_move
+from .derived import InvalidMetricQuery, filter_and_order, range_filters
+from .events import event_stream, latest_event_id
+from .models import Equipment, DatasetUpload, aprime_lookups, prime_lookups
+from .serializers import EquipmentSerializer, DatasetUploadSerializer
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+HISTORY_PAGE_SIZE = 5
+STREAM_CHUNK_SIZE = 500
+
+
+async def aauthenticate(request):
+    """Resolve the user for a ``Authorization: Token <key>`` header, or None"""
+    header = request.headers.get('Authorization', '')
+    parts = header.split()
+    if len(parts) != 2 or parts[0].lower() != 'token':
+        return None
+    try:
+        token = await Token.objects.select_related('user').aget(key=parts[1])
+    except Token.DoesNotExist:
+        return None
+    return token.user if token.user.is_active else None
+
+
+def async_api_view(http_method_names):
+    """Async counterpart of ``@api_view`` + ``IsAuthenticated`` for coroutine views"""
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in http_method_names:
+                return JsonResponse(
+                    {'detail': f'Method "{request.method}" not allowed.'},
+                    status=405
+                )
+            user = await aauthenticate(request)
+            if user is None:
+                return JsonResponse(
+                    {'detail': 'Authentication credentials were not provided.'},
+                    status=401
+                )
+            request.user = user
+            try:
+                return await view(request, *args, **kwargs)
+            except Exception as e:
+                return JsonResponse({'error': str(e)}, status=500)
+        return wrapper
+    return decorator
+
+
+async def _resolve_dataset(request):
+    """Return (dataset, error_response) for ``?dataset_id=`` or the latest dataset"""
+    dataset_id = request.GET.get('dataset_id')
+    if dataset_id:
+        try:
+            dataset = await DatasetUpload.objects.aget(id=dataset_id)
+        except DatasetUpload.DoesNotExist:
+            return None, JsonResponse({'error': 'Dataset not found'}, status=404)
+        return dataset, None
+    return await DatasetUpload.objects.order_by('-upload_timestamp').afirst(), None
+
+
+async def _read_hot(dataset, read):
+    """Async ``archive.read_hot``: await ``read()`` once it ran while the dataset's rows stayed in place"""
+    if not rows_may_move(dataset):
+        return await read()
+    for _ in range(READ_ATTEMPTS):
+        await sync_to_async(ensure_hot)(dataset)
+        result = await read()
+        if await sync_to_async(kept_rows)(dataset):
+            return result
+    raise DatasetUnavailable(dataset)
+
+
+def _unavailable(error):
+    return JsonResponse({'error': str(error)}, status=503)
+
+
+def _equipment(request, dataset):
+    """(queryset, error_response): the dataset's equipment with the filter and ordering parameters applied"""
+    try:
+        return filter_and_order(Equipment.objects.filter(dataset=dataset), request.GET), None
+    except InvalidMetricQuery as e:
+        return None, JsonResponse({'error': str(e)}, status=400)
+
+
+async def _fetch(queryset):
+    """The rows of ``queryset``, their names and types cached for the serializer, which must not query here"""
+    equipment = [row async for row in queryset.all()]
+    await aprime_lookups(equipment)
+    return equipment
+
+
+def _ndjson(equipment):
+    return ''.join(json.dumps(EquipmentSerializer(eq).data) + '\n' for eq in equipment)
+
+
+def _int_param(request, name, default, minimum=1, maximum=None):
+    """Parse a positive integer query parameter, clamping it to ``maximum``"""
+    try:
+        value = max(int(request.GET.get(name, default)), minimum)
+    except (TypeError, ValueError):
+        value = default
+    return min(value, maximum) if maximum else value
+
+
+@async_api_view(['GET'])
+async def equipment_list(request):
+    """Get equipment list for a specific dataset or latest dataset"""
+    dataset, error = await _resolve_dataset(request)
+    if error:
+        return error
+    if not dataset:
+        return JsonResponse([], safe=False)
+
+    queryset, error = _equipment(request, dataset)
+    if error:
+        return error
+    try:
+        equipment = await _read_hot(dataset, lambda: _fetch(queryset))
+    except DatasetUnavailable as e:
+        return _unavailable(e)
+    return JsonResponse(EquipmentSerializer(equipment, many=True).data, safe=False)
+
+
+@async_api_view(['GET'])
+async def summary_view(request):
+    """Get analytics summary for a specific dataset or latest dataset"""
+    dataset, error = await _resolve_dataset(request)
+    if error:
+        return error
+    if not dataset:
+        return JsonResponse({
+            'total_count': 0,
+            'avg_flowrate': 0.0,
+            'avg_pressure': 0.0,
+            'avg_temperature': 0.0,
+            'type_distribution': {}
+        })
+
+    return JsonResponse({
+        'total_count': dataset.total_count,
+        'avg_flowrate': dataset.avg_flowrate,
+        'avg_pressure': dataset.avg_pressure,
+        'avg_temperature': dataset.avg_temperature,
+        'type_distribution': dataset.type_distribution
+    })
+
+
+@async_api_view(['GET'])
+async def history_view(request):
+    """Get the upload records, newest first, 5 per page (``?page=``, ``?page_size=``)"""
+    page = _int_param(request, 'page', 1)
+    page_size = _int_param(request, 'page_size', HISTORY_PAGE_SIZE, maximum=MAX_PAGE_SIZE)
+    count = await DatasetUpload.objects.acount()
+    offset = (page - 1) * page_size
+    datasets = [ds async for ds in DatasetUpload.objects.order_by('-upload_timestamp')[offset:offset + page_size]]
+
+    def page_url(number):
+        return request.build_absolute_uri(f"{request.path}?page={number}&page_size={page_size}")
+
+    return JsonResponse({
+        'count': count,
+        'next': page_url(page + 1) if page * page_size < count else None,
+        'previous': page_url(page - 1) if page > 1 else None,
+        'results': DatasetUploadSerializer(datasets, many=True).data
+    })
+
+
+@async_api_view(['GET'])
+async def equipment_page(request):
+    """Get one page of the equipment list (``?page=``, ``?page_size=``)"""
+    dataset, error = await _resolve_dataset(request)
+    if error:
+        return error
+
+    page = _int_param(request, 'page', 1)
+    page_size = _int_param(request, 'page_size', DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE)
+    count = 0
+    results = []
+    if dataset:
+        queryset, error = _equipment(request, dataset)
+        if error:
+            return error
+        offset = (page - 1) * page_size
+
+        async def read():
+            # Unfiltered, the dataset row already carries its row count, so no COUNT(*) is needed
+            count = await queryset.acount() if range_filters(request.GET) else dataset.total_count
+            return count, await _fetch(queryset[offset:offset + page_size])
+
+        try:
+            count, equipment = await _read_hot(dataset, read)
+        except DatasetUnavailable as e:
+            return _unavailable(e)
+        results = EquipmentSerializer(equipment, many=True).data
+
+    base = request.build_absolute_uri(request.path)
+    dataset_param = f"dataset_id={dataset.id}&" if dataset else ""
+    # Filters and ordering carry over to the neighbouring pages
+    extra = request.GET.copy()
+    for key in ('dataset_id', 'page', 'page_size'):
+        extra.pop(key, None)
+    extra_params = f"&{extra.urlencode()}" if extra else ""
+
+    def page_url(number):
+        return f"{base}?{dataset_param}page={number}&page_size={page_size}{extra_params}"
+
+    return JsonResponse({
+        'count': count,
+        'next': page_url(page + 1) if page * page_size < count else None,
+        'previous': page_url(page - 1) if page > 1 else None,
+        'results': results
+    })
+
+
+@async_api_view(['GET'])
+async def equipment_stream(request):
+    """Stream the equipment list as newline-delimited JSON"""
+    dataset, error = await _resolve_dataset(request)
+    if error:
+        return error
+    queryset = None
+    if dataset:
+        queryset, error = _equipment(request, dataset)
+        if error:
+            return error
+
+    def sync_rows():
+        # A WSGI server would collect the async body below in full before sending any of it
+        if not dataset:
+            return
+        if rows_may_move(dataset):
+            ensure_hot(dataset)
+        equipment = queryset.iterator(chunk_size=STREAM_CHUNK_SIZE)
+        for chunk in iter(lambda: list(itertools.islice(equipment, STREAM_CHUNK_SIZE)), []):
+            prime_lookups(chunk)
+            yield _ndjson(chunk)
+        if rows_may_move(dataset) and not kept_rows(dataset):
+            raise DatasetUnavailable(dataset)
+
+    async def rows():
+        if not dataset:
+            return
+        if rows_may_move(dataset):
+            await sync_to_async(ensure_hot)(dataset)
+        chunk = []
+        async for eq in queryset.aiterator(chunk_size=STREAM_CHUNK_SIZE):
+            chunk.append(eq)
+            if len(chunk) == STREAM_CHUNK_SIZE:
+                await aprime_lookups(chunk)
+                yield _ndjson(chunk)
+                chunk = []
+        if chunk:
+            await aprime_lookups(chunk)
+            yield _ndjson(chunk)
+        # Rows already sent cannot be taken back; failing the stream tells the client it is incomplete
+        if rows_may_move(dataset) and not await sync_to_async(kept_rows)(dataset):
+            raise DatasetUnavailable(dataset)
+
+    body = rows() if isinstance(request, ASGIRequest) else sync_rows()
+    response = StreamingHttpResponse(body, content_type='application/x-ndjson')
+    if dataset:
+        response['X-Dataset-Id'] = str(dataset.id)
+    return response
+
+
+@async_api_view(['GET'])
+async def events_view(request):
+    """Push dataset, ingest and report events as server-sent events (see events.py).
+
+    Resumes after the ``Last-Event-ID`` header or ``?last_event_id=``;
+    without either, the stream starts with the next event. Only served under
+    ASGI: a WSGI server collects an async body in full before sending any of
+    it, so no event would arrive before the stream ended, while it held a
+    worker for ``EVENTS_STREAM_SECONDS``.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse(
+            {'error': 'The event stream needs an ASGI server (config.asgi); poll the other endpoints instead'},
+            status=501
+        )
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    if last_event_id:
+        try:
+            after_id = int(last_event_id)
+        except ValueError:
+            return JsonResponse({'error': 'Last-Event-ID must be an integer'}, status=400)
+    else:
+        after_id = await sync_to_async(latest_event_id)()
+
+    response = StreamingHttpResponse(
+        event_stream(after_id, settings.EVENTS_STREAM_SECONDS), content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Proxies such as nginx would otherwise hold events back in their buffers
+    response['X-Accel-Buffering'] = 'no'
+    return response
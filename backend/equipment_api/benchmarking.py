@@ -0,0 +1,48 @@
+"""
+Helpers shared by the benchmark management commands
+"""
+
+import os
+import tempfile
+from contextlib import contextmanager
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import override_settings
+from rest_framework.authtoken.models import Token
+
+
+@contextmanager
+def scratch_database():
+    """Run the block against a freshly migrated file database instead of the real one.
+
+    The file (rather than ``:memory:``) lets child processes started by a
+    benchmark open the same database, just like gunicorn workers would.
+    The upload rate limit is off, as benchmarks upload far faster than any
+    real client would.
+    """
+    with tempfile.TemporaryDirectory() as tmp, override_settings(UPLOAD_RATE_LIMIT=None):
+        test_settings = connection.settings_dict.setdefault('TEST', {})
+        previous_name = test_settings.get('NAME')
+        test_settings['NAME'] = os.path.join(tmp, 'bench.sqlite3')
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            yield test_settings['NAME']
+        finally:
+            connections.close_all()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            test_settings['NAME'] = previous_name
+
+
+def api_client(username='benchmark'):
+    """Django test client authenticated with a fresh API token"""
+    user, _ = User.objects.get_or_create(username=username)
+    token, _ = Token.objects.get_or_create(user=user)
+    return Client(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+
+def upload(client, content, filename='synthetic.csv'):
+    """POST raw CSV bytes to ``upload_csv`` and return the response"""
+    return client.post('/api/upload/', {'file': SimpleUploadedFile(filename, content, content_type='text/csv')})
@@ -0,0 +1,115 @@
+"""
+Parquet and Arrow IPC uploads.
+
+Historians that export Parquet or Arrow do not need a round trip through
+CSV: only the required columns are read, their types are checked and cast to
+the Arrow types the CSV path declares (``parsing.arrow_column_types``), and
+the columns go through the same validation as a CSV upload
+(``parsing.prepare_frame``). Nothing is parsed as text, and float64 readings
+are used as stored. Needs pyarrow.
+"""
+
+import importlib.util
+
+from django.conf import settings
+
+from .metrics import registry, stage
+from .parsing import REQUIRED_COLUMNS, UploadRejected, arrow_column_types, arrow_to_frame, prepare_frame
+
+# Suffix -> format; '.arrow' and '.feather' may hold the IPC file or the IPC stream format
+COLUMNAR_SUFFIXES = {
+    '.parquet': 'parquet',
+    '.arrow': 'arrow',
+    '.arrows': 'arrow',
+    '.feather': 'arrow',
+}
+NUMERIC_COLUMNS = ['Flowrate', 'Pressure', 'Temperature']
+
+
+def columnar_format(filename):
+    """Format of a Parquet or Arrow upload named ``filename``, None for anything else"""
+    name = filename.lower()
+    for suffix, file_format in COLUMNAR_SUFFIXES.items():
+        if name.endswith(suffix):
+            if importlib.util.find_spec('pyarrow') is None:
+                raise UploadRejected('Parquet and Arrow uploads are not supported by this server')
+            return file_format
+    return None
+
+
+def _read_table(data, file_format):
+    """The required columns of a Parquet or Arrow IPC file, as stored"""
+    import pyarrow as pa
+
+    if file_format == 'parquet':
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(pa.BufferReader(data))
+        missing_columns = [col for col in REQUIRED_COLUMNS if col not in parquet_file.schema_arrow.names]
+        if missing_columns:
+            raise UploadRejected(f'Missing required columns: {", ".join(missing_columns)}')
+        return parquet_file.read(columns=REQUIRED_COLUMNS)
+
+    try:
+        # The IPC file format reads the record batches in place, without copying them
+        table = pa.ipc.open_file(pa.BufferReader(data)).read_all()
+    except pa.ArrowInvalid:
+        table = pa.ipc.open_stream(pa.BufferReader(data)).read_all()
+    missing_columns = [col for col in REQUIRED_COLUMNS if col not in table.column_names]
+    if missing_columns:
+        raise UploadRejected(f'Missing required columns: {", ".join(missing_columns)}')
+    return table.select(REQUIRED_COLUMNS)
+
+
+def _cast_columns(table):
+    """``table`` with the types of ``arrow_column_types``; ``UploadRejected`` for columns that cannot take them"""
+    import pyarrow as pa
+
+    def is_text(data_type):
+        return pa.types.is_string(data_type) or pa.types.is_large_string(data_type)
+
+    columns = []
+    for name, target in arrow_column_types().items():
+        column = table.column(name)
+        data_type = column.type
+        if pa.types.is_dictionary(data_type):
+            value_type = data_type.value_type
+        else:
+            value_type = data_type
+        if name in NUMERIC_COLUMNS:
+            if not (pa.types.is_floating(value_type) or pa.types.is_integer(value_type)):
+                raise UploadRejected(f'Column {name} must be numeric, got {data_type}')
+            if data_type != target:
+                try:
+                    # safe: integers too large for a float64 are rejected rather than rounded
+                    column = column.cast(target)
+                except pa.ArrowInvalid:
+                    raise UploadRejected(f'Column {name} has values that do not fit a float64')
+        elif not is_text(value_type):
+            raise UploadRejected(f'Column {name} must be text, got {data_type}')
+        elif pa.types.is_dictionary(target):
+            if not pa.types.is_dictionary(data_type):
+                column = column.dictionary_encode()
+            column = column.cast(target)
+        elif data_type != target:
+            column = column.cast(target)
+        columns.append(column)
+    return pa.table(columns, names=list(arrow_column_types()))
+
+
+def parse_columnar(filename, data, file_format):
+    """Parse and validate a Parquet or Arrow IPC upload into a ``PreparedDataset``"""
+    import pyarrow as pa
+
+    try:
+        with stage('parse'):
+            try:
+                table = _cast_columns(_read_table(data, file_format))
+            except (pa.ArrowException, OSError) as e:
+                raise UploadRejected(f'Invalid {file_format} file: {e}')
+            df = arrow_to_frame(table)
+            del table
+        return prepare_frame(filename, df)
+    finally:
+        if settings.METRICS_ENABLED:
+            registry.inc('upload_csv_engine_total', {'engine': file_format})
@@ -0,0 +1,140 @@
+"""
+Compressed CSV uploads.
+
+``.csv.gz``, ``.csv.bz2`` and ``.csv.zst`` uploads are decompressed as a
+stream while they are parsed (see ``parsing.parse_upload_stream``), so the
+decompressed CSV is never held in memory as a whole. Because a few KB of
+input can expand to gigabytes, ``DecompressingReader`` stops with
+``UploadRejected`` as soon as the output exceeds
+``UPLOAD_MAX_DECOMPRESSED_BYTES`` or ``UPLOAD_MAX_COMPRESSION_RATIO`` times
+the compressed bytes consumed so far. zstd is read with ``zstandard``
+(requirements.txt); without it zstd uploads are rejected.
+"""
+
+import bz2
+import importlib.util
+import io
+import zlib
+
+from django.conf import settings
+
+from .parsing import UploadRejected
+
+# Suffix -> codec; plain '.csv' uploads are not compressed
+COMPRESSED_SUFFIXES = {
+    '.csv.gz': 'gzip',
+    '.csv.bz2': 'bz2',
+    '.csv.zst': 'zstd',
+}
+READ_SIZE = 64 * 1024
+# Below this much output the ratio is not checked: tiny files of repeated rows compress very well
+RATIO_CHECK_MIN_BYTES = 1024 * 1024
+
+
+def upload_compression(filename):
+    """Codec of an upload named ``filename``, None for plain CSV; ``UploadRejected`` for anything else"""
+    name = filename.lower()
+    for suffix, codec in COMPRESSED_SUFFIXES.items():
+        if name.endswith(suffix):
+            if codec == 'zstd' and importlib.util.find_spec('zstandard') is None:
+                raise UploadRejected('zstd compressed uploads are not supported by this server')
+            return codec
+    if name.endswith('.csv'):
+        return None
+    raise UploadRejected(
+        'File must be a CSV, optionally compressed (.csv.gz, .csv.bz2, .csv.zst), or a Parquet or Arrow file'
+    )
+
+
+def _decompressor(codec):
+    if codec == 'gzip':
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    return bz2.BZ2Decompressor()
+
+
+class _CountingReader:
+    """Counts the compressed bytes read from ``source``, for the ratio check"""
+
+    def __init__(self, source):
+        self.source = source
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        data = self.source.read(size)
+        self.bytes_read += len(data)
+        return data
+
+
+class DecompressingReader(io.RawIOBase):
+    """Binary stream of the decompressed contents of ``source``, bounded in size and ratio"""
+
+    def __init__(self, source, codec):
+        self.source = _CountingReader(source)
+        self.codec = codec
+        self.decompressed_bytes = 0
+        self.pending = b''
+        if codec == 'zstd':
+            import zstandard
+
+            self.zstd_reader = zstandard.ZstdDecompressor().stream_reader(self.source, read_across_frames=True)
+        else:
+            self.decompressor = _decompressor(codec)
+
+    def readable(self):
+        return True
+
+    def _decompress_some(self):
+        """Up to ``READ_SIZE`` more decompressed bytes; b'' once the input is used up"""
+        if self.codec == 'zstd':
+            return self.zstd_reader.read(READ_SIZE)
+        while True:
+            decompressor = self.decompressor
+            # Output is capped at READ_SIZE per call, so input both decompressors still hold comes first
+            if self.codec == 'gzip' and decompressor.unconsumed_tail:
+                return decompressor.decompress(decompressor.unconsumed_tail, READ_SIZE)
+            if self.codec == 'bz2' and not decompressor.eof and not decompressor.needs_input:
+                return decompressor.decompress(b'', READ_SIZE)
+            if decompressor.eof:
+                # gzip and bz2 files may hold several members back to back
+                data = decompressor.unused_data or self.source.read(READ_SIZE)
+                if not data:
+                    return b''
+                self.decompressor = _decompressor(self.codec)
+            else:
+                data = self.source.read(READ_SIZE)
+                if not data:
+                    raise UploadRejected(f'The {self.codec} upload is truncated')
+            output = self.decompressor.decompress(data, READ_SIZE)
+            if output:
+                return output
+
+    def _check_limits(self):
+        if self.decompressed_bytes > settings.UPLOAD_MAX_DECOMPRESSED_BYTES:
+            raise UploadRejected(
+                f'Decompressed upload exceeds {settings.UPLOAD_MAX_DECOMPRESSED_BYTES // (1024 * 1024)} MB'
+            )
+        if (self.decompressed_bytes > RATIO_CHECK_MIN_BYTES
+                and self.decompressed_bytes > settings.UPLOAD_MAX_COMPRESSION_RATIO * self.source.bytes_read):
+            raise UploadRejected(
+                f'Upload expands more than {settings.UPLOAD_MAX_COMPRESSION_RATIO}x when decompressed'
+            )
+
+    def readinto(self, buffer):
+        if not self.pending:
+            try:
+                self.pending = self._decompress_some()
+            except UploadRejected:
+                raise
+            except Exception as e:  # zlib.error, OSError, zstandard.ZstdError
+                raise UploadRejected(f'The upload is not valid {self.codec} data: {e}')
+            self.decompressed_bytes += len(self.pending)
+            self._check_limits()
+        size = min(len(buffer), len(self.pending))
+        buffer[:size] = self.pending[:size]
+        self.pending = self.pending[size:]
+        return size
+
+
+def open_decompressed(data, codec):
+    """Buffered binary stream over the decompressed contents of the compressed bytes ``data``"""
+    return io.BufferedReader(DecompressingReader(io.BytesIO(data), codec), READ_SIZE)
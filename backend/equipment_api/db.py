@@ -0,0 +1,58 @@
+"""
+SQLite connection tuning and busy handling.
+
+The active profile is picked with the ``DB_PROFILE`` environment variable
+(see ``SQLITE_PROFILES`` in settings). Its pragmas are applied to every new
+connection through the ``connection_created`` signal, and write paths wrap
+their transactions in ``retry_on_locked`` so a "database is locked" error is
+retried a bounded number of times instead of failing the request.
+"""
+
+import random
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.db import OperationalError
+
+
+def apply_pragmas(cursor, pragmas):
+    """Run ``PRAGMA name = value`` for each configured pragma"""
+    for name, value in pragmas.items():
+        cursor.execute(f"PRAGMA {name} = {value}")
+
+
+def configure_sqlite_connection(sender, connection, **kwargs):
+    """``connection_created`` handler applying the active profile's pragmas"""
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = settings.SQLITE_PROFILES[settings.DB_PROFILE]['pragmas']
+    if pragmas:
+        with connection.cursor() as cursor:
+            apply_pragmas(cursor, pragmas)
+
+
+def is_locked_error(error):
+    """True for SQLite's transient "database is locked"/"busy" errors"""
+    message = str(error).lower()
+    return 'database is locked' in message or 'database is busy' in message
+
+
+def retry_on_locked(func):
+    """Retry a write transaction with jittered backoff while SQLite reports a lock.
+
+    Must wrap the whole ``transaction.atomic()`` block: a transaction that
+    hit SQLITE_BUSY cannot be resumed, only restarted.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        attempts = settings.DB_BUSY_RETRIES
+        delay = settings.DB_BUSY_RETRY_BACKOFF
+        for attempt in range(attempts + 1):
+            try:
+                return func(*args, **kwargs)
+            except OperationalError as e:
+                if attempt == attempts or not is_locked_error(e):
+                    raise
+                time.sleep(delay * (2 ** attempt) * random.uniform(0.5, 1.5))
+    return wrapper
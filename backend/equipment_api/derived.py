@@ -0,0 +1,171 @@
+"""
+Derived metrics computed at ingest.
+
+``DERIVED_METRICS`` declares per-row quantities that are evaluated once per
+upload, vectorized over the whole dataset with NumPy, and stored in the
+``Equipment`` column of the same name. Equipment reads filter and sort on them
+in SQL (``?order_by=-pressure_zscore&flowrate_zscore__gte=2``), so a request
+never computes anything per row.
+
+Each metric applies one of ``TRANSFORMS`` to one reading column. Adding a
+metric takes its declaration here, a nullable ``FloatField`` of the same name
+on ``Equipment`` with its migration, and ``manage.py derive_metrics`` to fill
+it in for datasets uploaded before.
+"""
+
+import math
+
+# Reading columns: model field -> position in ``PreparedDataset.rows``
+READING_COLUMNS = {'flowrate': 2, 'pressure': 3, 'temperature': 4}
+RANGE_LOOKUPS = ('gt', 'gte', 'lt', 'lte')
+ORDER_PARAM = 'order_by'
+
+
+class InvalidMetricQuery(ValueError):
+    """An unknown field or a bad value in the filter or ordering parameters"""
+
+
+class DerivedMetric:
+    """``transform`` applied to the ``column`` readings of a dataset, stored per row as ``name``"""
+
+    def __init__(self, name, column, transform, description):
+        self.name = name
+        self.column = column
+        self.transform = transform
+        self.description = description
+
+    def compute(self, values, type_codes):
+        return TRANSFORMS[self.transform](values, type_codes)
+
+
+def _mean(values):
+    """Mean of the readings present (NaN marks a missing reading); NaN when there are none"""
+    import numpy as np
+
+    present = values[~np.isnan(values)]
+    return present.mean() if len(present) else np.nan
+
+
+def _zscore(values, type_codes):
+    """Standard deviations from the dataset mean; 0 when every reading is the same"""
+    import numpy as np
+
+    present = values[~np.isnan(values)]
+    if not len(present):
+        return values
+    std = present.std()
+    return (values - present.mean()) / std if std > 0 else np.where(np.isnan(values), np.nan, 0.0)
+
+
+def _ratio_to_mean(values, type_codes):
+    """Reading over the dataset mean (the validated ranges keep the mean positive)"""
+    return values / _mean(values)
+
+
+def _type_deviation(values, type_codes):
+    """Reading minus the mean reading of the rows with the same base type"""
+    import numpy as np
+
+    present = ~np.isnan(values)
+    types = type_codes.max() + 1 if len(type_codes) else 0
+    totals = np.bincount(type_codes[present], weights=values[present], minlength=types)
+    counts = np.bincount(type_codes[present], minlength=types)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = totals / counts
+    return values - means[type_codes]
+
+
+TRANSFORMS = {
+    'zscore': _zscore,
+    'ratio_to_mean': _ratio_to_mean,
+    'type_deviation': _type_deviation,
+}
+
+DERIVED_METRICS = [
+    DerivedMetric('flowrate_zscore', 'flowrate', 'zscore', 'Flowrate z-score within the dataset'),
+    DerivedMetric('pressure_zscore', 'pressure', 'zscore', 'Pressure z-score within the dataset'),
+    DerivedMetric('temperature_zscore', 'temperature', 'zscore', 'Temperature z-score within the dataset'),
+    DerivedMetric('pressure_ratio', 'pressure', 'ratio_to_mean', 'Pressure over the dataset mean pressure'),
+    DerivedMetric('temperature_ratio', 'temperature', 'ratio_to_mean',
+                  'Temperature over the dataset mean temperature'),
+    DerivedMetric('flowrate_type_deviation', 'flowrate', 'type_deviation',
+                  'Flowrate minus the mean flowrate of the same equipment type'),
+    DerivedMetric('pressure_type_deviation', 'pressure', 'type_deviation',
+                  'Pressure minus the mean pressure of the same equipment type'),
+    DerivedMetric('temperature_type_deviation', 'temperature', 'type_deviation',
+                  'Temperature minus the mean temperature of the same equipment type'),
+]
+DERIVED_METRIC_NAMES = [metric.name for metric in DERIVED_METRICS]
+# Fields the equipment reads may filter and sort on
+QUERYABLE_FIELDS = list(READING_COLUMNS) + DERIVED_METRIC_NAMES
+
+
+class DatasetArrays:
+    """A dataset's row tuples as NumPy arrays, built once for every computation at ingest"""
+
+    def __init__(self, rows):
+        import numpy as np
+
+        name_index = {}
+        # Row -> index into ``names``, in order of first occurrence
+        self.name_codes = np.fromiter(
+            (name_index.setdefault(row[0], len(name_index)) for row in rows), dtype=np.intp, count=len(rows)
+        )
+        self.names = list(name_index)
+        type_index = {}
+        # Row -> index into ``types``, in order of first occurrence
+        self.type_codes = np.fromiter(
+            (type_index.setdefault(row[1], len(type_index)) for row in rows), dtype=np.intp, count=len(rows)
+        )
+        self.types = list(type_index)
+        # Reading column -> float64 array; NaN marks a missing reading
+        self.readings = {
+            column: np.fromiter((row[position] for row in rows), dtype=np.float64, count=len(rows))
+            for column, position in READING_COLUMNS.items()
+        }
+
+
+def compute_derived_metrics(arrays):
+    """Every derived metric of a dataset's ``DatasetArrays``: name -> values in row order, None where undefined"""
+    import numpy as np
+
+    derived = {}
+    for metric in DERIVED_METRICS:
+        values = metric.compute(arrays.readings[metric.column], arrays.type_codes)
+        missing = np.isnan(values)
+        # NaN is not a value every database stores; a missing metric is NULL
+        derived[metric.name] = np.where(missing, None, values).tolist() if missing.any() else values.tolist()
+    return derived
+
+
+def range_filters(params):
+    """The ``?<field>__gte=``-style range filters in ``params`` as queryset lookups"""
+    filters = {}
+    for key, value in params.items():
+        field, _, lookup = key.partition('__')
+        if lookup not in RANGE_LOOKUPS:
+            continue
+        if field not in QUERYABLE_FIELDS:
+            raise InvalidMetricQuery(f'Cannot filter on {field}; choose from {", ".join(QUERYABLE_FIELDS)}')
+        try:
+            filters[key] = float(value)
+        except ValueError:
+            filters[key] = math.nan
+        if not math.isfinite(filters[key]):
+            raise InvalidMetricQuery(f'{key} must be a finite number')
+    return filters
+
+
+def filter_and_order(queryset, params):
+    """Apply the range filters and ``?order_by=[-]<field>`` in ``params`` to an equipment queryset"""
+    filters = range_filters(params)
+    if filters:
+        queryset = queryset.filter(**filters)
+
+    ordering = params.get(ORDER_PARAM)
+    if ordering:
+        if ordering.lstrip('-') not in QUERYABLE_FIELDS:
+            raise InvalidMetricQuery(f'Cannot order by {ordering}; choose from {", ".join(QUERYABLE_FIELDS)}')
+        # The id keeps rows with equal values in a stable order across pages
+        queryset = queryset.order_by(ordering, '-id' if ordering.startswith('-') else 'id')
+    return queryset
@@ -0,0 +1,166 @@
+"""
+Server-sent events for dataset, ingest and report changes.
+
+Changes are published as ``Event`` rows in the transaction that makes them,
+so an event is visible exactly when its change is, to every worker process on
+the host: the database is the fan-out, no broker is involved. The event id is
+the stream position, and a client that reconnects with ``Last-Event-ID``
+receives everything it missed that is still retained.
+
+Within a worker, streams share one ``EventHub`` per event loop: a single task
+polls for rows past the newest it has seen every ``EVENTS_POLL_INTERVAL``
+seconds, while any stream is open, and puts them on each stream's queue. A
+stream too slow to drain its queue is ended rather than allowed to grow
+without bound; its client resumes from its last event.
+
+Kinds:
+
+- ``dataset.created``: an upload was stored (``dataset_id``, ``filename``,
+  ``total_count``, ``upload_timestamp``)
+- ``dataset.evicted``: retention removed a dataset's rows (``dataset_id``,
+  ``archived``, true when they were archived rather than deleted)
+- ``ingest.progress``: a resumable upload changed status: finalizing, open
+  again after a failed attempt, done or failed (``session_id``, ``status``,
+  ``received_chunks``, ``chunk_count``; ``dataset_id`` once done, ``error``
+  once failed). Stored chunks publish nothing, sparing a write per chunk.
+- ``report.ready`` / ``report.failed``: a report job finished (``job_id``,
+  ``dataset_id``; ``error`` when failed)
+"""
+
+import asyncio
+import json
+import weakref
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Max
+
+from .models import Event
+
+DATASET_CREATED = 'dataset.created'
+DATASET_EVICTED = 'dataset.evicted'
+INGEST_PROGRESS = 'ingest.progress'
+REPORT_READY = 'report.ready'
+REPORT_FAILED = 'report.failed'
+
+# Milliseconds a client waits before reconnecting (the ``retry:`` field)
+RECONNECT_DELAY = 3000
+# Events a stream may have waiting before it is ended as too slow
+QUEUE_SIZE = 1000
+
+_hubs = weakref.WeakKeyDictionary()
+
+
+def publish(kind, **data):
+    """Record an event; ``data`` must be JSON-serializable"""
+    Event.objects.create(kind=kind, data=data)
+
+
+def latest_event_id():
+    return Event.objects.aggregate(newest=Max('id'))['newest'] or 0
+
+
+def prune_events():
+    """Delete all but the newest ``EVENTS_RETAINED`` events"""
+    Event.objects.filter(id__lte=latest_event_id() - settings.EVENTS_RETAINED).delete()
+
+
+def events_after(event_id):
+    """Retained events past ``event_id``, oldest first"""
+    return list(Event.objects.filter(id__gt=event_id).order_by('id'))
+
+
+def format_event(event):
+    """One event in the ``text/event-stream`` wire format"""
+    return f"id: {event.id}\nevent: {event.kind}\ndata: {json.dumps(event.data)}\n\n"
+
+
+class Subscription:
+    """One stream's queue of new events; ``dropped`` once it fell too far behind"""
+
+    def __init__(self):
+        self.queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.dropped = False
+
+
+class EventHub:
+    """Fans new events out to the streams of one event loop from a single poller task"""
+
+    def __init__(self):
+        self.subscriptions = set()
+        self.last_id = 0
+        self.poller = None
+
+    def subscribe(self, after_id):
+        subscription = Subscription()
+        self.subscriptions.add(subscription)
+        if self.poller is None or self.poller.done():
+            self.last_id = after_id
+            self.poller = asyncio.ensure_future(self._poll())
+        return subscription
+
+    def unsubscribe(self, subscription):
+        self.subscriptions.discard(subscription)
+
+    async def _poll(self):
+        while self.subscriptions:
+            await asyncio.sleep(settings.EVENTS_POLL_INTERVAL)
+            try:
+                events = await sync_to_async(events_after)(self.last_id)
+            except Exception:
+                # A locked or restarting database; the next poll picks up where this one failed
+                continue
+            for event in events:
+                self.last_id = event.id
+                for subscription in list(self.subscriptions):
+                    try:
+                        subscription.queue.put_nowait(event)
+                    except asyncio.QueueFull:
+                        subscription.dropped = True
+                        self.subscriptions.discard(subscription)
+
+
+def get_hub():
+    """The ``EventHub`` of the running event loop"""
+    loop = asyncio.get_running_loop()
+    hub = _hubs.get(loop)
+    if hub is None:
+        hub = _hubs[loop] = EventHub()
+    return hub
+
+
+async def event_stream(after_id, duration):
+    """Server-sent events past ``after_id``: the retained backlog, then new events for ``duration`` seconds"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + duration
+    yield f"retry: {RECONNECT_DELAY}\n\n"
+    for event in await sync_to_async(events_after)(after_id):
+        after_id = event.id
+        yield format_event(event)
+    if loop.time() >= deadline:
+        return
+
+    hub = get_hub()
+    subscription = hub.subscribe(after_id)
+    try:
+        # Events committed between the backlog read and subscribing
+        for event in await sync_to_async(events_after)(after_id):
+            after_id = event.id
+            yield format_event(event)
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0 or (subscription.dropped and subscription.queue.empty()):
+                return
+            try:
+                event = await asyncio.wait_for(
+                    subscription.queue.get(), min(remaining, settings.EVENTS_HEARTBEAT)
+                )
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            # The hub may deliver events this stream already read from the database
+            if event.id > after_id:
+                after_id = event.id
+                yield format_event(event)
+    finally:
+        hub.unsubscribe(subscription)
@@ -0,0 +1,271 @@
+"""
+Dataset persistence and the single-writer ingest coordinator.
+
+SQLite admits one writer at a time, so instead of every request thread
+opening its own write transaction, parsed uploads are handed to a writer
+thread through a queue. The writer groups whatever is waiting into one
+transaction, applies retention once for the whole group, and resolves each
+caller's future with its ``DatasetUpload``. A host-wide file lock makes the
+writer threads of all gunicorn workers take turns, so they queue on the lock
+instead of spinning on SQLITE_BUSY, and readers (WAL mode) are never blocked.
+"""
+
+import itertools
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from .db import retry_on_locked
+from .alerts import evaluate_alerts, load_rules
+from .archive import archive_dataset
+from .anomalies import detect_anomalies
+from .derived import DatasetArrays, compute_derived_metrics
+from .events import DATASET_CREATED, DATASET_EVICTED, prune_events, publish
+from .metrics import active_query_timers, count_queries, stage
+from .models import Alert, Equipment, EquipmentName, EquipmentRollup, EquipmentType, DatasetUpload
+from .report_jobs import discard_reports
+from .trends import compute_rollups
+
+try:
+    import fcntl
+except ImportError:  # Windows development servers run a single process
+    fcntl = None
+
+
+class PreparedDataset:
+    """A validated upload ready to be written: summary values plus row tuples"""
+
+    def __init__(self, filename, total_count, avg_flowrate, avg_pressure, avg_temperature,
+                 type_distribution, rows, derived=None):
+        self.filename = filename
+        self.total_count = total_count
+        self.avg_flowrate = avg_flowrate
+        self.avg_pressure = avg_pressure
+        self.avg_temperature = avg_temperature
+        self.type_distribution = type_distribution
+        # (equipment_name, base_type, flowrate, pressure, temperature)
+        self.rows = rows
+        # Equipment field -> per-row values computed over the whole dataset (see
+        # computed_fields); left NULL when not computed
+        self.derived = derived or {}
+        # Alert rule violations: (row position, rule id, value, limit, bound), see alerts.py
+        self.alerts = []
+        # Per-equipment aggregates: (equipment_name, row count, {rollup field: value}), see trends.py
+        self.rollups = None
+        # Query timers of the submitting request, counting its queries in the writer thread
+        self.query_timers = ()
+
+
+@contextmanager
+def host_write_lock():
+    """Exclusive lock shared by every process on this host that writes datasets"""
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(os.path.dirname(settings.INGEST_LOCK_PATH), exist_ok=True)
+    with open(settings.INGEST_LOCK_PATH, 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def computed_fields(arrays):
+    """Equipment fields computed from a whole dataset's ``DatasetArrays``: derived metrics and anomaly flags"""
+    return {**compute_derived_metrics(arrays), **detect_anomalies(arrays)}
+
+
+def apply_retention():
+    """Evict every hot dataset beyond the newest ``DATASET_RETENTION`` uploads.
+
+    With ``DATASET_ARCHIVE`` the dataset is archived (see archive.py),
+    otherwise it is deleted.
+    """
+    stale = DatasetUpload.objects.filter(storage=DatasetUpload.STORAGE_HOT).order_by(
+        '-upload_timestamp', '-id'
+    )[settings.DATASET_RETENTION:]
+    for dataset in list(stale):
+        publish(DATASET_EVICTED, dataset_id=dataset.id, archived=settings.DATASET_ARCHIVE)
+        if settings.DATASET_ARCHIVE:
+            archive_dataset(dataset)
+            continue
+        discard_reports(dataset)
+        Equipment.objects.filter(dataset=dataset).delete()
+        # Its alerts and trend rollups cascade
+        dataset.delete()
+
+
+def _insert_dataset(batch):
+    """Create the ``DatasetUpload`` row and the equipment rows of one upload"""
+    dataset = DatasetUpload.objects.create(
+        filename=batch.filename,
+        total_count=batch.total_count,
+        avg_flowrate=batch.avg_flowrate,
+        avg_pressure=batch.avg_pressure,
+        avg_temperature=batch.avg_temperature,
+        type_distribution=batch.type_distribution
+    )
+    type_ids = EquipmentType.objects.ids_for(row[1] for row in batch.rows)
+    name_ids = EquipmentName.objects.ids_for(row[0] for row in batch.rows)
+    metric_names = list(batch.derived)
+    metric_rows = zip(*batch.derived.values()) if metric_names else itertools.repeat(())
+    equipment = Equipment.objects.bulk_create([
+        Equipment(
+            name_id=name_ids[name],
+            type_id=type_ids[base_type],
+            flowrate=flowrate,
+            pressure=pressure,
+            temperature=temperature,
+            dataset=dataset,
+            **dict(zip(metric_names, metrics))
+        )
+        for (name, base_type, flowrate, pressure, temperature), metrics in zip(batch.rows, metric_rows)
+    ])
+    if batch.alerts:
+        if equipment[0].pk is not None:
+            equipment_ids = [eq.pk for eq in equipment]
+        else:
+            # Backends that cannot return ids from bulk inserts; writes are serialized, so ids follow row order
+            equipment_ids = list(Equipment.objects.filter(dataset=dataset).order_by('id').values_list('id', flat=True))
+        Alert.objects.bulk_create([
+            Alert(dataset=dataset, equipment_id=equipment_ids[position], rule_id=rule_id,
+                  value=value, limit=limit, bound=bound)
+            for position, rule_id, value, limit, bound in batch.alerts
+        ])
+
+    # Batches written without going through ingest() still get their trend points
+    rollups = batch.rollups if batch.rollups is not None else compute_rollups(DatasetArrays(batch.rows))
+    EquipmentRollup.objects.bulk_create([
+        EquipmentRollup(name_id=name_ids[name], dataset=dataset, uploaded_at=dataset.upload_timestamp,
+                        row_count=row_count, **values)
+        for name, row_count, values in rollups
+    ])
+    publish(DATASET_CREATED, dataset_id=dataset.id, filename=dataset.filename, total_count=dataset.total_count,
+            upload_timestamp=dataset.upload_timestamp.isoformat())
+    return dataset
+
+
+@retry_on_locked
+def write_datasets(batches):
+    """Persist prepared datasets in one transaction and apply retention once.
+
+    Each upload's queries count for its request; the shared ones (the
+    transaction, retention) count for every request of the group.
+    """
+    shared_timers = [timer for batch in batches for timer in batch.query_timers]
+    with count_queries(*shared_timers), host_write_lock(), transaction.atomic():
+        datasets = []
+        for batch in batches:
+            with stage('insert'), count_queries(*batch.query_timers):
+                datasets.append(_insert_dataset(batch))
+
+        with stage('evict'):
+            apply_retention()
+            prune_events()
+    return datasets
+
+
+class IngestCoordinator:
+    """Writer thread that batches queued uploads into shared transactions"""
+
+    def __init__(self):
+        self.pid = os.getpid()
+        self.pending = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name='ingest-writer', daemon=True)
+        self.thread.start()
+
+    def submit(self, batch):
+        """Queue a prepared dataset, returning a Future for its ``DatasetUpload``"""
+        future = Future()
+        self.pending.put((batch, future))
+        return future
+
+    def _collect(self):
+        """Block for one upload, then gather more until the group is full or the linger expires.
+
+        A group never holds more uploads than the retention window keeps, so
+        retention cannot evict a dataset in the transaction that creates it.
+        """
+        group = [self.pending.get()]
+        rows = group[0][0].total_count
+        deadline = time.monotonic() + settings.INGEST_GROUP_LINGER
+        while rows < settings.INGEST_GROUP_MAX_ROWS and len(group) < settings.DATASET_RETENTION:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self.pending.get(timeout=remaining)
+            except queue.Empty:
+                break
+            group.append(item)
+            rows += item[0].total_count
+        return group
+
+    def _run(self):
+        while True:
+            # Uploads whose caller stopped waiting are dropped, not written
+            group = [(batch, future) for batch, future in self._collect() if future.set_running_or_notify_cancel()]
+            if not group:
+                continue
+            try:
+                close_old_connections()
+                datasets = write_datasets([batch for batch, _ in group])
+                for (_, future), dataset in zip(group, datasets):
+                    future.set_result(dataset)
+            except Exception as e:
+                if len(group) == 1:
+                    group[0][1].set_exception(e)
+                    continue
+                # Isolate the failing upload so the rest of the group still lands
+                for batch, future in group:
+                    try:
+                        future.set_result(write_datasets([batch])[0])
+                    except Exception as single_error:
+                        future.set_exception(single_error)
+
+
+_coordinator = None
+_coordinator_lock = threading.Lock()
+
+
+def get_coordinator():
+    """Return this process's ingest coordinator, starting its writer thread on first use"""
+    global _coordinator
+    with _coordinator_lock:
+        # A forked worker inherits the object but not the thread behind it
+        if _coordinator is None or _coordinator.pid != os.getpid():
+            _coordinator = IngestCoordinator()
+        return _coordinator
+
+
+def ingest(batch):
+    """Persist a prepared dataset and return its ``DatasetUpload``.
+
+    Derived metrics, anomaly flags, alert rule violations and trend rollups
+    are computed here, in the caller's thread, so the writer only inserts.
+    """
+    if not batch.derived:
+        with stage('derive'):
+            arrays = DatasetArrays(batch.rows)
+            batch.derived = computed_fields(arrays)
+            batch.alerts = evaluate_alerts(load_rules(), arrays)
+            batch.rollups = compute_rollups(arrays)
+    batch.query_timers = active_query_timers()
+    if not settings.INGEST_COORDINATOR:
+        return write_datasets([batch])[0]
+    future = get_coordinator().submit(batch)
+    try:
+        return future.result(timeout=settings.INGEST_TIMEOUT)
+    except FutureTimeout:
+        # Still queued: withdraw it, so a request reported as failed stores nothing
+        if future.cancel():
+            raise
+    # The writer already started on it; its outcome is the upload's
+    return future.result()
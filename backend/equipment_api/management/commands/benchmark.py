@@ -0,0 +1,151 @@
+"""
+End-to-end API benchmark suite.
+
+Uploads deterministic synthetic datasets of each requested size through the
+Django test client against a scratch database, times the upload and the
+read/report endpoints for that dataset, and stores the results as JSON:
+
+    python manage.py benchmark --sizes 1000,10000,100000 --repeat 3
+    python manage.py benchmark --sizes 1000,10000 --compare benchmarks/results/previous.json
+
+Sizes from 1k up to 1M rows are supported; PDF rendering dominates at the
+large end, so ``--skip generate_pdf_report`` keeps those runs short.
+"""
+
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from equipment_api.benchmarking import api_client, scratch_database, upload
+from equipment_api.synthetic import csv_bytes
+
+BENCHMARKS = ['upload_csv', 'equipment_list', 'summary_view', 'history_view', 'generate_pdf_report']
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = 'Benchmark upload, read and report endpoints on synthetic datasets and store JSON results'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,10000,100000',
+                            help='Comma-separated dataset sizes in rows (1000 to 1000000)')
+        parser.add_argument('--repeat', type=int, default=3, help='Timed runs per benchmark and size')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--skip', default='', help=f"Comma-separated benchmarks to skip: {', '.join(BENCHMARKS)}")
+        parser.add_argument('--output', help='Result file (default: benchmarks/results/<timestamp>.json)')
+        parser.add_argument('--compare', help='Earlier result file to compare the medians against')
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(s) for s in options['sizes'].split(',')]
+        except ValueError:
+            raise CommandError('--sizes must be a comma-separated list of integers')
+        skip = {s.strip() for s in options['skip'].split(',') if s.strip()}
+        unknown = skip - set(BENCHMARKS)
+        if unknown:
+            raise CommandError(f"Unknown benchmarks: {', '.join(sorted(unknown))}")
+
+        started = datetime.now(timezone.utc)
+        setup_test_environment()
+        try:
+            with scratch_database():
+                results = self.run_suite(sizes, [b for b in BENCHMARKS if b not in skip], options)
+        finally:
+            teardown_test_environment()
+
+        report = {
+            'meta': {
+                'started': started.isoformat(),
+                'git_revision': _git_revision(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'db_profile': settings.DB_PROFILE,
+                'ingest_coordinator': settings.INGEST_COORDINATOR,
+                'seed': options['seed'],
+                'repeat': options['repeat'],
+            },
+            'results': results,
+        }
+        output = options['output'] or os.path.join(
+            settings.BASE_DIR, 'benchmarks', 'results', f"{started.strftime('%Y%m%dT%H%M%SZ')}.json"
+        )
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+        self.stdout.write(f'Results written to {output}')
+
+        if options['compare']:
+            self.compare(options['compare'], results)
+
+    def run_suite(self, sizes, benchmarks, options):
+        client = api_client()
+        results = []
+        self.stdout.write(f"{'benchmark':<22}{'rows':>10}{'min ms':>12}{'median ms':>12}{'max ms':>12}")
+        for rows in sizes:
+            content = csv_bytes(rows, seed=options['seed'])
+            response = upload(client, content)
+            if response.status_code != 200:
+                raise CommandError(f'Upload of {rows} rows failed: {response.content[:200]!r}')
+            dataset_id = response.json()['dataset_id']
+
+            requests = {
+                'upload_csv': lambda: upload(client, content),
+                'equipment_list': lambda: client.get('/api/equipment/', {'dataset_id': dataset_id}),
+                'summary_view': lambda: client.get('/api/summary/', {'dataset_id': dataset_id}),
+                'history_view': lambda: client.get('/api/history/'),
+                'generate_pdf_report': lambda: client.get('/api/report/pdf/', {'dataset_id': dataset_id}),
+            }
+            # Reads first: timed uploads push older datasets out of the retention window
+            for name in sorted(benchmarks, key=lambda b: b == 'upload_csv'):
+                timings = []
+                for _ in range(options['repeat']):
+                    started = time.perf_counter()
+                    response = requests[name]()
+                    if response.status_code != 200:
+                        raise CommandError(f'{name} with {rows} rows returned {response.status_code}')
+                    timings.append((time.perf_counter() - started) * 1000)
+                result = {
+                    'benchmark': name,
+                    'rows': rows,
+                    'runs_ms': timings,
+                    'min_ms': min(timings),
+                    'median_ms': statistics.median(timings),
+                    'max_ms': max(timings),
+                }
+                results.append(result)
+                self.stdout.write(
+                    f"{name:<22}{rows:>10}{result['min_ms']:>12.1f}{result['median_ms']:>12.1f}{result['max_ms']:>12.1f}"
+                )
+        return results
+
+    def compare(self, path, results):
+        """Print median ratios against an earlier run (>1.00 means slower now)"""
+        with open(path) as f:
+            baseline = {(r['benchmark'], r['rows']): r for r in json.load(f)['results']}
+        self.stdout.write(f"\n{'benchmark':<22}{'rows':>10}{'before ms':>12}{'after ms':>12}{'ratio':>8}")
+        for result in results:
+            before = baseline.get((result['benchmark'], result['rows']))
+            if not before:
+                continue
+            ratio = result['median_ms'] / before['median_ms'] if before['median_ms'] else float('inf')
+            self.stdout.write(
+                f"{result['benchmark']:<22}{result['rows']:>10}{before['median_ms']:>12.1f}"
+                f"{result['median_ms']:>12.1f}{ratio:>8.2f}"
+            )
@@ -0,0 +1,217 @@
+"""
+Equivalence check and timings of the two CSV upload engines.
+
+Every case in ``CASES`` (hand-written edge cases plus synthetic uploads) is
+parsed by the pandas engine and by the csv engine (falling back to pandas
+where it declines, as ``parse_upload`` does). The run fails unless both give
+the same result: identical rows, bit-identical averages and the same type
+distribution in the same order, or the same validation or parse error. It
+also fails when a case meant for the csv engine was handed to pandas, so
+the fast path cannot quietly stop being taken. When pyarrow is installed
+the pandas engine reads with it, and every case is also read with the C
+parser to check the two agree. Every case is also gzip compressed and read
+as a stream (``parse_upload_stream``), and parsed from a file in shards by
+a process pool (``equipment_api.sharding``); both have to give the same
+result.
+
+With ``--sizes`` it then times both engines on synthetic uploads of each
+size, which is what ``CSV_FAST_PATH_MAX_ROWS`` is chosen from:
+
+    python manage.py check_csv_engines
+    python manage.py check_csv_engines --sizes 100,1000,5000,20000 --repeat 7
+"""
+
+import gzip
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from equipment_api.compression import open_decompressed
+from equipment_api.parsing import (
+    UnsupportedByCsvEngine, UploadRejected, pandas_csv_engine, parse_upload_stream, parse_with_csv,
+    parse_with_pandas
+)
+from equipment_api.sharding import parse_sharded
+from equipment_api.synthetic import HEADER, csv_bytes
+
+HEADER_LINE = ','.join(HEADER)
+# Split every case into several shards, so rows cross shard boundaries
+SHARD_PROCESSES = 3
+
+
+def _csv(*lines, header=HEADER_LINE, newline='\n'):
+    return newline.join([header, *lines]) + newline
+
+
+def _synthetic(rows, seed=7):
+    return csv_bytes(rows, seed=seed).decode('utf-8')
+
+
+def _integers(rows, seed=11):
+    """Whole-number readings only"""
+    rng = random.Random(seed)
+    return _csv(*(
+        f'Pump P-{i},Pump,{rng.randint(11, 500)},{rng.randint(1, 150)},{rng.randint(20, 350)}'
+        for i in range(rows)
+    ))
+
+
+def _many_types(rows, seed=13):
+    """More than 16 distinct Type values with tied counts, to pin value_counts' tie order"""
+    rng = random.Random(seed)
+    return _csv(*(
+        f'Valve V-{i},Valve-{rng.randrange(40)},{rng.uniform(10.5, 500):.2f},50.5,100.25'
+        for i in range(rows)
+    ))
+
+
+# (name, content, engine expected to produce the result: 'csv' or 'pandas')
+CASES = [
+    ('synthetic 10', _synthetic(10), 'csv'),
+    ('synthetic 1000', _synthetic(1000), 'csv'),
+    ('synthetic 50000', _synthetic(50000), 'csv'),
+    ('integer columns 200', _integers(200), 'csv'),
+    ('integer columns 30000', _integers(30000), 'csv'),
+    ('mixed int and float', _csv('Pump A,Pump,100,1.5,20', 'Pump B,Pump,10.5,150,350.0'), 'csv'),
+    ('signs and bare points', _csv('Pump A,Pump,+100.,+1.5,200', 'Pump B,Pump,10.50,150.,349.'), 'csv'),
+    ('leading point', _csv('Pump A,Pump,100,.5,20'), 'csv'),
+    ('tied type counts', _many_types(400), 'csv'),
+    ('reordered and extra columns', _csv('7,125.5,x,Reactor R-1,45.2,180.5,Reactor-CSTR',
+                                         header='Id,Flowrate,Note,Equipment Name,Pressure,Temperature,Type'), 'csv'),
+    ('quoted fields', _csv('"Pump ""Main"", East",Pump,"100.5",1.5,20', '"Valve\nsplit",Valve,50,2,30'), 'csv'),
+    ('crlf line endings', _csv('Pump A,Pump,100,1.5,20', 'Pump B,Pump,200,2.5,30', newline='\r\n'), 'csv'),
+    ('cr line endings', _csv('Pump A,Pump,100,1.5,20', 'Pump B,Pump,200,2.5,30', newline='\r'), 'csv'),
+    ('blank lines', _csv('Pump A,Pump,100,1.5,20', '', 'Pump B,Pump,200,2.5,30', '', ''), 'csv'),
+    ('trailing comma', _csv('Pump A,Pump,100,1.5,20,', header=HEADER_LINE + ','), 'csv'),
+    ('spaces inside text', _csv(' Pump A ,Pump Large ,100,1.5,20'), 'csv'),
+    ('range bounds', _csv('Pump A,Pump,10.5,1.0,20.0', 'Pump B,Pump,500.0,150.0,350.0'), 'csv'),
+    ('missing columns', _csv('Pump A,100', header='Equipment Name,Flowrate'), 'csv'),
+    ('invalid types', _csv('A,Mixer,100,1.5,20', 'B,Pump,100,1.5,20', 'C,Tank,100,1.5,20', 'D,Mixer,100,1.5,20'), 'csv'),
+    ('flowrate out of range', _csv('Pump A,Pump,10.4,1.5,20'), 'csv'),
+    ('pressure out of range', _csv('Pump A,Pump,100,150.1,20'), 'csv'),
+    ('temperature out of range', _csv('Pump A,Pump,100,1.5,350.01'), 'csv'),
+    ('invalid type and range', _csv('Pump A,Tank,600,1.5,20'), 'csv'),
+    ('numeric names', _csv('1001,Pump,100,1.5,20', '007,Pump,200,2.5,30'), 'csv'),
+    ('boolean type', _csv('Pump A,True,100,1.5,20'), 'csv'),
+    # Inputs pandas reads in its own way; the csv engine must hand them over
+    ('missing value', _csv('Pump A,Pump,100,1.5,', 'Pump B,Pump,200,2.5,30'), 'pandas'),
+    ('NA name', _csv('NA,Pump,100,1.5,20'), 'pandas'),
+    ('quoted missing value', _csv('"",Pump,100,1.5,20'), 'pandas'),
+    ('exponent', _csv('Pump A,Pump,1.005e2,1.5,20'), 'pandas'),
+    ('sixteen digits', _csv('Pump A,Pump,100.0000000000001,1.5,20'), 'pandas'),
+    ('padded number', _csv('Pump A,Pump, 100,1.5,20'), 'pandas'),
+    ('infinity', _csv('Pump A,Pump,inf,1.5,20'), 'pandas'),
+    ('text in numbers', _csv('Pump A,Pump,fast,1.5,20'), 'pandas'),
+    ('ragged row', _csv('Pump A,Pump,100,1.5,20,extra', 'Pump B,Pump,200,2.5,30'), 'pandas'),
+    ('short row', _csv('Pump A,Pump,100,1.5'), 'pandas'),
+    ('byte order mark', '\ufeff' + _csv('Pump A,Pump,100,1.5,20'), 'pandas'),
+    ('leading blank lines', '\n\n' + _csv('Pump A,Pump,100,1.5,20'), 'pandas'),
+    ('duplicate header', _csv('Pump A,Pump,100,1.5,20,Pump', header=HEADER_LINE + ',Type'), 'pandas'),
+    ('header only', _csv(), 'pandas'),
+    ('empty file', '', 'pandas'),
+]
+
+
+def outcome(parse, content):
+    """Comparable result of one engine: the prepared dataset or the error it raised"""
+    try:
+        dataset = parse('upload.csv', content)
+    except UnsupportedByCsvEngine:
+        raise
+    except UploadRejected as e:
+        return ('rejected', str(e))
+    except Exception as e:
+        return ('error', f'{type(e).__name__}: {e}')
+    return ('ok', dataset.total_count, dataset.avg_flowrate, dataset.avg_pressure, dataset.avg_temperature,
+            list(dataset.type_distribution.items()), dataset.rows)
+
+
+def parse_with_c_parser(filename, content):
+    return parse_with_pandas(filename, content, engine='c')
+
+
+def parse_gzip_stream(filename, content):
+    """The upload gzip compressed, streamed into read_csv whatever its size"""
+    data = gzip.compress(content.encode('utf-8'))
+    with override_settings(CSV_ENGINE='pandas'):
+        return parse_upload_stream(filename, lambda: open_decompressed(data, 'gzip'))
+
+
+def parse_in_shards(filename, content):
+    """The upload stored in a file and parsed in shards; in one piece where it cannot be split"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, filename)
+        with open(path, 'wb') as f:
+            f.write(content.encode('utf-8'))
+        with override_settings(CSV_PARSE_PROCESSES=SHARD_PROCESSES):
+            prepared = parse_sharded(filename, path)
+    return prepared or parse_with_pandas(filename, content)
+
+
+def csv_engine_outcome(content):
+    """Outcome of the csv engine, and which engine produced it"""
+    try:
+        return outcome(parse_with_csv, content), 'csv'
+    except UnsupportedByCsvEngine:
+        return outcome(parse_with_pandas, content), 'pandas'
+
+
+class Command(BaseCommand):
+    help = 'Check that the csv and pandas upload engines agree, and time both'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='', help='Comma-separated upload sizes in rows to time')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per engine and size')
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(s) for s in options['sizes'].split(',') if s]
+        except ValueError:
+            raise CommandError('--sizes must be a comma-separated list of integers')
+
+        compare_c_parser = pandas_csv_engine() != 'c'
+        failures = []
+        self.stdout.write(f"{'case':<30}{'engine':<8}{'result':<10}  check")
+        for name, content, expected_engine in CASES:
+            expected = outcome(parse_with_pandas, content)
+            actual, engine = csv_engine_outcome(content)
+            problems = []
+            if repr(actual) != repr(expected):
+                problems.append('results differ')
+            if engine != expected_engine:
+                problems.append(f'expected the {expected_engine} engine')
+            if compare_c_parser and repr(outcome(parse_with_c_parser, content)) != repr(expected):
+                problems.append('pyarrow and C parsers differ')
+            if repr(outcome(parse_gzip_stream, content)) != repr(expected):
+                problems.append('streamed gzip differs')
+            if repr(outcome(parse_in_shards, content)) != repr(expected):
+                problems.append('sharded parse differs')
+            failures += [f'{name}: {problem}' for problem in problems]
+            status = self.style.ERROR('FAIL ' + ', '.join(problems)) if problems else self.style.SUCCESS('ok')
+            self.stdout.write(f'{name:<30}{engine:<8}{expected[0]:<10}  {status}')
+            if 'results differ' in problems:
+                self.stdout.write(f'    pandas: {repr(expected)[:300]}')
+                self.stdout.write(f'    csv:    {repr(actual)[:300]}')
+
+        if sizes:
+            self.stdout.write(f"\n{'rows':>8}{'pandas ms':>12}{'csv ms':>10}{'speedup':>10}")
+            for rows in sizes:
+                content = _synthetic(rows, seed=rows)
+                timings = {parse: [] for parse in (parse_with_pandas, parse_with_csv)}
+                for _ in range(options['repeat']):
+                    for parse, runs in timings.items():
+                        started = time.perf_counter()
+                        parse('upload.csv', content)
+                        runs.append((time.perf_counter() - started) * 1000)
+                pandas_ms = statistics.median(timings[parse_with_pandas])
+                csv_ms = statistics.median(timings[parse_with_csv])
+                self.stdout.write(f'{rows:>8}{pandas_ms:>12.2f}{csv_ms:>10.2f}{pandas_ms / csv_ms:>9.1f}x')
+
+        if failures:
+            raise CommandError(f'{len(failures)} CSV engine check(s) failed:\n  ' + '\n  '.join(failures))
+        self.stdout.write(self.style.SUCCESS('Both CSV engines agree on every case'))
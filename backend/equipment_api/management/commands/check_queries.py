@@ -0,0 +1,449 @@
+"""
+Query-count and query-plan regression guards for every API endpoint.
+
+Runs each endpoint of ``equipment_api.urls`` and ``equipment_api.async_urls``
+against a scratch database at several dataset sizes, and fails when:
+
+* the number of SQL queries differs from the count pinned in ``CHECKS``
+  (an N+1 makes the count grow with the dataset size);
+* ``EXPLAIN QUERY PLAN`` shows a full-table scan or a temporary B-tree sort
+  that is not listed in ``KNOWN_PLAN_ISSUES``;
+* an endpoint has no check at all.
+
+    python manage.py check_queries
+    python manage.py check_queries --sizes 10,1000,5000 --show-sql
+
+When a change legitimately alters a count, update the pinned value in the
+same commit so the new number is reviewed together with the code.
+"""
+
+import hashlib
+import math
+import tempfile
+import time
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from equipment_api import async_urls, urls
+from equipment_api.benchmarking import api_client, scratch_database, upload
+from equipment_api.models import (
+    Alert, DatasetUpload, Equipment, EquipmentName, EquipmentRollup, EquipmentType, ReportJob
+)
+from equipment_api.querycheck import EndpointCheck, bulk_insert_queries
+from equipment_api.synthetic import csv_bytes, generate_rows
+
+CHECK_PASSWORD = 'check-queries'
+
+
+def _get(url_name, with_dataset=True, query=None, **kwargs):
+    """Request builder for a GET endpoint, optionally scoped to the context dataset"""
+    def request(client, context):
+        params = {'dataset_id': context['dataset_id']} if with_dataset else {}
+        params.update(query or {})
+        url_kwargs = {key: context[value] for key, value in kwargs.items()}
+        return client.get(reverse(url_name, kwargs=url_kwargs or None), params)
+    return request
+
+
+def _get_trend(client, context):
+    return client.get(reverse('equipment_trend'), {'name': context['trend_name'], 'parameter': 'pressure'})
+
+
+def _search(client, context):
+    return client.get(reverse('equipment_search'), {'q': context['trend_name'][:-1]})
+
+
+def _upload(client, context):
+    response = upload(client, context['content'])
+    if response.status_code == 200:
+        context['uploaded_id'] = response.json()['dataset_id']
+    return response
+
+
+def _archiving_upload(client, context):
+    with override_settings(DATASET_ARCHIVE=True):
+        return _upload(client, context)
+
+
+def _get_archived(client, context):
+    return client.get(reverse('equipment_list'), {'dataset_id': context['archived_id']})
+
+
+def _create_report_job(client, context):
+    response = client.post(reverse('report_job_create'), {'dataset_id': context['dataset_id']})
+    if response.status_code == 202:
+        context['job_id'] = response.json()['id']
+    return response
+
+
+def _create_upload_session(client, context):
+    content = context['content']
+    response = client.post(reverse('upload_session_create'), {
+        'filename': 'session.csv',
+        'size': len(content),
+        'chunk_size': len(content),
+        'sha256': hashlib.sha256(content).hexdigest(),
+    }, content_type='application/json')
+    if response.status_code == 201:
+        context['session_id'] = response.json()['id']
+    return response
+
+
+def _put_upload_chunk(client, context):
+    content = context['content']
+    return client.put(
+        reverse('upload_session_chunk', args=[context['session_id'], 0]), content,
+        content_type='application/octet-stream', HTTP_X_CHUNK_SHA256=hashlib.sha256(content).hexdigest()
+    )
+
+
+def _finalize_upload_session(client, context):
+    return client.post(reverse('upload_session_finalize', args=[context['session_id']]))
+
+
+def _create_alert_rule(client, context):
+    response = client.post(reverse('alert_rule_list'), ALERT_RULE, content_type='application/json')
+    if response.status_code == 201:
+        context['rule_id'] = response.json()['id']
+    return response
+
+
+def _update_alert_rule(client, context):
+    return client.patch(reverse('alert_rule_detail', args=[context['rule_id']]), {'severity': 'critical'},
+                        content_type='application/json')
+
+
+def _delete_alert_rule(client, context):
+    return client.delete(reverse('alert_rule_detail', args=[context['rule_id']]))
+
+
+def _login(client, context):
+    return client.post(reverse('login'), {'username': context['username'], 'password': CHECK_PASSWORD})
+
+
+def _get_asgi(url_name):
+    """Request builder for an async endpoint as an ASGI server runs it, scoped to the context dataset"""
+    def request(client, context):
+        headers = {'Authorization': client.defaults['HTTP_AUTHORIZATION']}
+
+        async def get():
+            return await AsyncClient().get(reverse(url_name), {'dataset_id': context['dataset_id']}, headers=headers)
+
+        return async_to_sync(get)()
+    return request
+
+
+def _stream_events(client, context):
+    # Served under ASGI only; replays the retained events and ends instead of waiting for new ones
+    headers = {'Authorization': client.defaults['HTTP_AUTHORIZATION'], 'Last-Event-ID': '0'}
+
+    async def request():
+        return await AsyncClient().get(reverse('async_events'), headers=headers)
+
+    with override_settings(EVENTS_STREAM_SECONDS=0):
+        return async_to_sync(request)()
+
+
+def _logout(client, context):
+    return Client(HTTP_AUTHORIZATION=f"Token {context['logout_token']}").post(reverse('logout'))
+
+
+def _upload_queries(context):
+    # token, alert rules, BEGIN, dataset INSERT, equipment INSERTs, alert INSERTs, rollup INSERTs,
+    # event INSERT, retention SELECT, newest event id, event prune DELETE, COMMIT; new names, missing from
+    # the warm lookup cache, add their SELECTs (one per LOOKUP_CHUNK names) and INSERTs
+    names = context['names']
+    new_names = names - set(EquipmentName.objects.filter(name__in=names).values_list('name', flat=True))
+    lookup_queries = (math.ceil(len(new_names) / EquipmentName.objects.LOOKUP_CHUNK)
+                      + bulk_insert_queries(EquipmentName, len(new_names)))
+    alert_queries = bulk_insert_queries(Alert, context['alerts']) if context['alerts'] else 0
+    rollup_queries = bulk_insert_queries(EquipmentRollup, len(names))
+    return 9 + lookup_queries + bulk_insert_queries(Equipment, context['rows']) + alert_queries + rollup_queries
+
+
+def _finalize_queries(context):
+    # token, session, BEGIN, finalize claim, its event, COMMIT; the upload minus its token;
+    # BEGIN, the final status UPDATE, its event, COMMIT
+    return 6 + _upload_queries(context) - 1 + 4
+
+
+def _evicting_upload_queries(context):
+    # plus, for the evicted dataset: its event, report file paths, equipment DELETE, then
+    # the dataset DELETE with its equipment, report job, alert and rollup cascades
+    return _upload_queries(context) + 8
+
+
+def _archiving_upload_queries(context):
+    # plus, for the archived dataset: its event, its equipment SELECT and DELETE, and the dataset UPDATE
+    return _upload_queries(context) + 4
+
+
+def _rehydrate_queries(context):
+    # token, dataset, BEGIN, storage SELECT, equipment INSERTs (ids included), dataset UPDATE,
+    # rehydrated cache SELECT, COMMIT, then the read itself and the storage re-check
+    rows = DatasetUpload.objects.get(id=context['archived_id']).total_count
+    return 9 + bulk_insert_queries(Equipment, rows, with_pk=True)
+
+
+# Created by the alert rule checks; synthetic pressures reach 150 bar
+ALERT_RULE = {'name': 'High pressure', 'parameter': 'pressure', 'max_value': 140.0}
+
+# Filter and sort on derived metrics (see equipment_api.derived)
+METRIC_QUERY = {'pressure_zscore__gte': '-1', 'order_by': '-flowrate_type_deviation'}
+
+# Reads run first against a fresh dataset of the requested size, then report
+# jobs, then writes (uploads and auth), so every count is deterministic.
+READ_CHECKS = [
+    EndpointCheck('equipment_list', _get('equipment_list'), queries=3),
+    EndpointCheck('equipment_list', _get('equipment_list', with_dataset=False), queries=3,
+                  label='equipment_list (latest)'),
+    EndpointCheck('equipment_list', _get('equipment_list', query=METRIC_QUERY), queries=3,
+                  label='equipment_list (by metric)'),
+    EndpointCheck('equipment_trend', _get_trend, queries=2),
+    # token, match COUNT(*), page of matches, their datasets
+    EndpointCheck('equipment_search', _search, queries=4),
+    EndpointCheck('anomaly_list', _get('anomaly_list'), queries=3),
+    EndpointCheck('alert_list', _get('alert_list'), queries=3),
+    EndpointCheck('alert_rule_list', _get('alert_rule_list', with_dataset=False), queries=2),
+    EndpointCheck('summary', _get('summary'), queries=2),
+    EndpointCheck('summary', _get('summary', with_dataset=False), queries=2, label='summary (latest)'),
+    EndpointCheck('history', _get('history', with_dataset=False), queries=3),
+    EndpointCheck('generate_pdf_report', _get('generate_pdf_report'), queries=3),
+    EndpointCheck('metrics', _get('metrics', with_dataset=False), queries=1),
+    EndpointCheck('async_equipment_list', _get('async_equipment_list'), queries=3),
+    EndpointCheck('async_equipment_page', _get('async_equipment_page'), queries=3),
+    # plus the COUNT(*) of the filtered rows
+    EndpointCheck('async_equipment_page', _get('async_equipment_page', query=METRIC_QUERY), queries=4,
+                  label='async_equipment_page (by metric)'),
+    EndpointCheck('async_equipment_stream', _get('async_equipment_stream'), queries=3),
+    EndpointCheck('async_equipment_stream', _get_asgi('async_equipment_stream'), queries=3,
+                  label='async_equipment_stream (ASGI)'),
+    EndpointCheck('async_summary', _get('async_summary'), queries=2),
+    EndpointCheck('async_history', _get('async_history', with_dataset=False), queries=3),
+]
+
+REPORT_CREATE_CHECK = EndpointCheck('report_job_create', _create_report_job, queries=7, status=202)
+
+REPORT_CHECKS = [
+    EndpointCheck('report_job_status', _get('report_job_status', with_dataset=False, job_id='job_id'), queries=2),
+    EndpointCheck('report_job_download', _get('report_job_download', with_dataset=False, job_id='job_id'),
+                  queries=2),
+]
+
+# The rule stays in place for the uploads below, so they write alerts too
+ALERT_RULE_CHECKS = [
+    EndpointCheck('alert_rule_list', _create_alert_rule, queries=2, status=201, label='alert_rule_list (create)'),
+    EndpointCheck('alert_rule_detail', _get('alert_rule_detail', with_dataset=False, rule_id='rule_id'), queries=2),
+    EndpointCheck('alert_rule_detail', _update_alert_rule, queries=3, label='alert_rule_detail (update)'),
+]
+# token, rule, BEGIN, alert cascade, rule DELETE, COMMIT
+ALERT_RULE_DELETE_CHECK = EndpointCheck('alert_rule_detail', _delete_alert_rule, queries=6, status=204,
+                                        label='alert_rule_detail (delete)')
+
+# One-chunk resumable upload of the context CSV; it does not evict anything yet
+UPLOAD_SESSION_CHECKS = [
+    EndpointCheck('upload_session_create', _create_upload_session, queries=3, status=201),
+    EndpointCheck('upload_session_chunk', _put_upload_chunk, queries=3),
+    EndpointCheck('upload_session_status', _get('upload_session_status', with_dataset=False,
+                                                session_id='session_id'), queries=2),
+    EndpointCheck('upload_session_finalize', _finalize_upload_session, queries=_finalize_queries),
+]
+
+UPLOAD_CHECK = EndpointCheck('upload_csv', _upload, queries=_upload_queries)
+EVICTING_UPLOAD_CHECK = EndpointCheck('upload_csv', _upload, queries=_evicting_upload_queries,
+                                      label='upload_csv (evicts one)')
+
+# With tiered storage on, the next upload archives the oldest hot dataset,
+# and the first read of it rehydrates it; the second reads the cached rows
+ARCHIVING_UPLOAD_CHECK = EndpointCheck('upload_csv', _archiving_upload, queries=_archiving_upload_queries,
+                                       label='upload_csv (archives one)')
+ARCHIVE_READ_CHECKS = [
+    EndpointCheck('equipment_list', _get_archived, queries=_rehydrate_queries, label='equipment_list (rehydrates)'),
+    # token, dataset, accessed_at UPDATE, the read, the storage re-check
+    EndpointCheck('equipment_list', _get_archived, queries=5, label='equipment_list (rehydrated)'),
+]
+
+# token, retained events; runs last, once every check above has published its events
+EVENTS_CHECK = EndpointCheck('async_events', _stream_events, queries=2)
+# Under WSGI the stream is refused after authentication
+WSGI_EVENTS_CHECK = EndpointCheck('async_events', _get('async_events', with_dataset=False), queries=1, status=501,
+                                  label='async_events (WSGI)')
+
+AUTH_CHECKS = [
+    EndpointCheck('login', _login, queries=2),
+    EndpointCheck('logout', _logout, queries=2),
+]
+
+CHECKS = (READ_CHECKS + [REPORT_CREATE_CHECK] + REPORT_CHECKS + ALERT_RULE_CHECKS + UPLOAD_SESSION_CHECKS
+          + [UPLOAD_CHECK, EVICTING_UPLOAD_CHECK, ARCHIVING_UPLOAD_CHECK] + ARCHIVE_READ_CHECKS
+          + [ALERT_RULE_DELETE_CHECK, EVENTS_CHECK, WSGI_EVENTS_CHECK] + AUTH_CHECKS)
+
+# Plan issues accepted for now, by check label; anything else fails the run.
+# Remove entries as the plans are fixed so they cannot come back unnoticed.
+KNOWN_PLAN_ISSUES = {
+    # Derived metrics are not indexed: one index per metric would slow every
+    # upload, while sorting one dataset's rows is bounded by the retention
+    'equipment_list (by metric)': {'USE TEMP B-TREE FOR ORDER BY ON equipment_api_equipment'},
+    'async_equipment_page (by metric)': {'USE TEMP B-TREE FOR ORDER BY ON equipment_api_equipment'},
+    # Ranking sorts the matching tags, as FTS5's own rank order would; tags are distinct, not rows
+    'equipment_search': {'USE TEMP B-TREE FOR ORDER BY ON equipment_api_equipmentname_fts'},
+}
+
+# Tables read whole by design: the alert rules, compiled at ingest (see alerts.py)
+WHOLE_TABLE_READS = {
+    'SCAN equipment_api_alertrule',
+}
+
+
+class Command(BaseCommand):
+    help = 'Pin SQL query counts and flag full scans / temp B-tree sorts for every API endpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10,100,1000', help='Comma-separated dataset sizes in rows')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--show-sql', action='store_true', help='Print the captured SQL of every check')
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(s) for s in options['sizes'].split(',')]
+        except ValueError:
+            raise CommandError('--sizes must be a comma-separated list of integers')
+
+        uncovered = self.uncovered_endpoints()
+        if uncovered:
+            raise CommandError(f"No query check defined for: {', '.join(uncovered)}")
+
+        setup_test_environment()
+        try:
+            with scratch_database():
+                failures = self.run_checks(sizes, options['seed'], options['show_sql'])
+        finally:
+            teardown_test_environment()
+
+        if failures:
+            raise CommandError(f'{len(failures)} query check(s) failed:\n  ' + '\n  '.join(failures))
+        self.stdout.write(self.style.SUCCESS('All query checks passed'))
+
+    def run_checks(self, sizes, seed, show_sql=False):
+        """Run every check at each dataset size against the current database and return the failures"""
+        failures = []
+        # Uploads are written inline so their queries are captured on this connection
+        with tempfile.TemporaryDirectory() as reports_root, \
+                tempfile.TemporaryDirectory() as upload_sessions_root, \
+                tempfile.TemporaryDirectory() as archive_root, \
+                override_settings(INGEST_COORDINATOR=False, REPORTS_ROOT=reports_root,
+                                  UPLOAD_SESSIONS_ROOT=upload_sessions_root, ARCHIVE_ROOT=archive_root):
+            client = api_client()
+            self.stdout.write(f"{'check':<34}{'rows':>8}{'queries':>9}{'expected':>10}  result")
+            for rows in sizes:
+                for result in self.run_size(client, rows, seed):
+                    failures += self.report(result, show_sql)
+        return failures
+
+    def uncovered_endpoints(self):
+        names = [pattern.name for pattern in urls.urlpatterns + async_urls.urlpatterns]
+        covered = {check.url_name for check in CHECKS}
+        return [name for name in names if name not in covered]
+
+    def seed(self, client, rows, seed):
+        response = upload(client, csv_bytes(rows, seed=seed))
+        if response.status_code != 200:
+            raise CommandError(f'Seeding {rows} rows failed: {response.content[:200]!r}')
+        return response.json()['dataset_id']
+
+    def run_size(self, client, rows, seed):
+        ReportJob.objects.all().delete()
+        DatasetUpload.objects.all().delete()
+        # A server that has been up a while has every lookup row it reads cached (see models.LookupManager)
+        for manager in (EquipmentName.objects, EquipmentType.objects):
+            manager.names_for(manager.values_list('id', flat=True))
+        context = {
+            'rows': rows,
+            'content': csv_bytes(rows, seed=seed + 1),
+            'names': {row[0] for row in generate_rows(rows, seed=seed + 1)},
+            # Rows of the context CSV that break ALERT_RULE
+            'alerts': sum(1 for row in generate_rows(rows, seed=seed + 1) if row[3] > ALERT_RULE['max_value']),
+            'dataset_id': self.seed(client, rows, seed),
+            # Present in the seeded dataset, so its trend has a point
+            'trend_name': next(generate_rows(1, seed=seed))[0],
+        }
+
+        for check in READ_CHECKS:
+            yield check.run(client, context)
+
+        yield REPORT_CREATE_CHECK.run(client, context)
+        self.wait_for_job(context['job_id'])
+        for check in REPORT_CHECKS:
+            yield check.run(client, context)
+
+        for check in ALERT_RULE_CHECKS:
+            yield check.run(client, context)
+
+        for check in UPLOAD_SESSION_CHECKS:
+            yield check.run(client, context)
+
+        yield UPLOAD_CHECK.run(client, context)
+        # Fill the retention window so the next upload evicts exactly one dataset (the seeded one)
+        for _ in range(settings.DATASET_RETENTION - DatasetUpload.objects.count()):
+            self.seed(client, 10, seed)
+        yield EVICTING_UPLOAD_CHECK.run(client, context)
+
+        context['archived_id'] = DatasetUpload.objects.order_by('upload_timestamp', 'id').values_list(
+            'id', flat=True
+        ).first()
+        yield ARCHIVING_UPLOAD_CHECK.run(client, context)
+        for check in ARCHIVE_READ_CHECKS:
+            yield check.run(client, context)
+        yield ALERT_RULE_DELETE_CHECK.run(client, context)
+        yield EVENTS_CHECK.run(client, context)
+        yield WSGI_EVENTS_CHECK.run(client, context)
+
+        user, _ = User.objects.get_or_create(username='check-queries')
+        user.set_password(CHECK_PASSWORD)
+        user.save()
+        Token.objects.filter(user=user).delete()
+        Token.objects.create(user=user)
+        context['username'] = user.username
+        context['logout_token'] = Token.objects.create(user=User.objects.create(username=f'logout-{rows}')).key
+        for check in AUTH_CHECKS:
+            yield check.run(Client(), context)
+
+    def wait_for_job(self, job_id, timeout=300):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            job = ReportJob.objects.get(id=job_id)
+            if job.status == ReportJob.STATUS_DONE:
+                return
+            if job.status == ReportJob.STATUS_FAILED:
+                raise CommandError(f'Report job {job_id} failed: {job.error}')
+            time.sleep(0.05)
+        raise CommandError(f'Report job {job_id} did not finish within {timeout}s')
+
+    def report(self, result, show_sql):
+        label = result.check.label
+        failures = []
+        if not result.status_ok:
+            failures.append(f'{label} with {result.rows} rows returned {result.status_code}')
+        if not result.count_ok:
+            failures.append(f'{label} with {result.rows} rows ran {len(result.queries)} queries, expected {result.expected}')
+        known = KNOWN_PLAN_ISSUES.get(label, set()) | WHOLE_TABLE_READS
+        for issue in result.issues:
+            if issue not in known:
+                failures.append(f'{label} with {result.rows} rows: {issue}')
+
+        status = self.style.SUCCESS('ok') if not failures else self.style.ERROR('FAIL')
+        self.stdout.write(f"{label:<34}{result.rows:>8}{len(result.queries):>9}{result.expected:>10}  {status}")
+        for issue in result.issues:
+            note = ' (known)' if issue in known else ''
+            self.stdout.write(f'    plan: {issue}{note}')
+        if show_sql or not result.count_ok:
+            for sql in result.queries:
+                self.stdout.write(f'    sql: {sql[:300]}')
+        return failures
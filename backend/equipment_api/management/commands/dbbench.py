@@ -0,0 +1,169 @@
+"""
+Read/write concurrency benchmark for the SQLite profiles.
+
+Each profile runs against a scratch database file with the same mix of
+reader and writer processes (modelling gunicorn workers): writers insert an
+upload-sized batch and evict the oldest dataset beyond the retention window,
+readers fetch the latest dataset. Connections are opened per operation when
+the profile has ``conn_max_age`` 0 and kept open otherwise, and writes use
+the profile's busy timeout and the configured bounded retries.
+
+    python manage.py dbbench --profiles default,tuned --readers 6 --writers 2
+"""
+
+import multiprocessing
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from equipment_api.db import apply_pragmas, is_locked_error
+
+RETAINED_DATASETS = 5
+TYPES = ['Reactor', 'Pump', 'Heat Exchanger', 'Compressor', 'Valve', 'Condenser']
+
+SCHEMA = """
+CREATE TABLE dataset (id INTEGER PRIMARY KEY AUTOINCREMENT, created REAL NOT NULL);
+CREATE TABLE equipment (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    dataset_id INTEGER NOT NULL REFERENCES dataset(id),
+    equipment_name TEXT NOT NULL,
+    type TEXT NOT NULL,
+    flowrate REAL NOT NULL,
+    pressure REAL NOT NULL,
+    temperature REAL NOT NULL
+);
+CREATE INDEX equipment_dataset ON equipment(dataset_id);
+"""
+
+
+def _connect(path, profile):
+    connection = sqlite3.connect(path, timeout=profile['timeout'], isolation_level=None)
+    apply_pragmas(connection.cursor(), profile['pragmas'])
+    return connection
+
+
+def _write(connection, batch_rows, rng):
+    connection.execute('BEGIN')
+    try:
+        cursor = connection.execute('INSERT INTO dataset (created) VALUES (?)', (time.time(),))
+        dataset_id = cursor.lastrowid
+        connection.executemany(
+            'INSERT INTO equipment (dataset_id, equipment_name, type, flowrate, pressure, temperature) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            [(dataset_id, f'EQ-{i}', rng.choice(TYPES), rng.uniform(10.5, 500.0),
+              rng.uniform(1.0, 150.0), rng.uniform(20.0, 350.0)) for i in range(batch_rows)]
+        )
+        stale = connection.execute(
+            'SELECT id FROM dataset ORDER BY id DESC LIMIT -1 OFFSET ?', (RETAINED_DATASETS,)
+        ).fetchall()
+        for (stale_id,) in stale:
+            connection.execute('DELETE FROM equipment WHERE dataset_id = ?', (stale_id,))
+            connection.execute('DELETE FROM dataset WHERE id = ?', (stale_id,))
+        connection.execute('COMMIT')
+    except BaseException:
+        connection.execute('ROLLBACK')
+        raise
+
+
+def _read(connection):
+    row = connection.execute('SELECT id FROM dataset ORDER BY id DESC LIMIT 1').fetchone()
+    if row:
+        connection.execute('SELECT * FROM equipment WHERE dataset_id = ?', (row[0],)).fetchall()
+
+
+def _worker(args):
+    """Run one reader or writer process until the deadline, returning its tallies"""
+    path, profile, role, deadline, batch_rows, retries, backoff, seed = args
+    rng = random.Random(seed)
+    persistent = profile['conn_max_age'] > 0
+    connection = _connect(path, profile) if persistent else None
+    latencies, locked, failed = [], 0, 0
+    while time.time() < deadline:
+        started = time.perf_counter()
+        conn = connection or _connect(path, profile)
+        try:
+            for attempt in range(retries + 1):
+                try:
+                    if role == 'writer':
+                        _write(conn, batch_rows, rng)
+                    else:
+                        _read(conn)
+                    latencies.append(time.perf_counter() - started)
+                    break
+                except sqlite3.OperationalError as e:
+                    if not is_locked_error(e):
+                        raise
+                    locked += 1
+                    if attempt == retries:
+                        failed += 1
+                    else:
+                        time.sleep(backoff * (2 ** attempt) * rng.uniform(0.5, 1.5))
+        finally:
+            if not persistent:
+                conn.close()
+    if connection:
+        connection.close()
+    return role, latencies, locked, failed
+
+
+class Command(BaseCommand):
+    help = 'Benchmark concurrent SQLite reads and writes under each database profile'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', default='default,tuned',
+                            help=f"Comma-separated profiles from: {', '.join(settings.SQLITE_PROFILES)}")
+        parser.add_argument('--readers', type=int, default=6, help='Reader processes')
+        parser.add_argument('--writers', type=int, default=2, help='Writer processes')
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds per profile')
+        parser.add_argument('--batch-rows', type=int, default=500, help='Rows inserted per write')
+
+    def handle(self, *args, **options):
+        profiles = [p.strip() for p in options['profiles'].split(',') if p.strip()]
+        unknown = [p for p in profiles if p not in settings.SQLITE_PROFILES]
+        if unknown:
+            raise CommandError(f"Unknown profiles: {', '.join(unknown)}")
+
+        self.stdout.write(
+            f"{'profile':<10}{'role':<8}{'ops/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'locked':>8}{'failed':>8}"
+        )
+        for name in profiles:
+            for role, summary in self.run_profile(settings.SQLITE_PROFILES[name], options).items():
+                self.stdout.write(
+                    f"{name:<10}{role:<8}{summary['ops']:>10.1f}{summary['p50']:>10.1f}"
+                    f"{summary['p95']:>10.1f}{summary['locked']:>8}{summary['failed']:>8}"
+                )
+
+    def run_profile(self, profile, options):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'bench.sqlite3')
+            setup = _connect(path, profile)
+            setup.executescript(SCHEMA)
+            setup.close()
+
+            deadline = time.time() + options['duration']
+            roles = ['writer'] * options['writers'] + ['reader'] * options['readers']
+            jobs = [
+                (path, profile, role, deadline, options['batch_rows'],
+                 settings.DB_BUSY_RETRIES, settings.DB_BUSY_RETRY_BACKOFF, seed)
+                for seed, role in enumerate(roles)
+            ]
+            with multiprocessing.Pool(len(jobs)) as pool:
+                results = pool.map(_worker, jobs)
+
+        summary = {}
+        for role in ('writer', 'reader'):
+            latencies = sorted(ms * 1000 for r, lat, _, _ in results if r == role for ms in lat)
+            summary[role] = {
+                'ops': len(latencies) / options['duration'],
+                'p50': statistics.median(latencies) if latencies else 0.0,
+                'p95': latencies[int(len(latencies) * 0.95)] if latencies else 0.0,
+                'locked': sum(locked for r, _, locked, _ in results if r == role),
+                'failed': sum(failed for r, _, _, failed in results if r == role),
+            }
+        return summary
@@ -0,0 +1,51 @@
+"""
+Compute the derived metrics (``equipment_api.derived``) and anomaly flags
+(``equipment_api.anomalies``) of stored datasets.
+
+Uploads compute them at ingest; run this after adding a metric or changing
+the anomaly limits, or once for datasets uploaded before either existed.
+
+    python manage.py derive_metrics
+    python manage.py derive_metrics --dataset 12 --missing-only
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from equipment_api.derived import DERIVED_METRIC_NAMES, DatasetArrays
+from equipment_api.ingest import computed_fields, host_write_lock
+from equipment_api.models import DatasetUpload, Equipment
+
+UPDATE_BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = 'Compute and store the derived metrics and anomaly flags of every (or one) stored dataset'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dataset', type=int, help='Only this dataset id')
+        parser.add_argument('--missing-only', action='store_true',
+                            help='Skip datasets whose rows all have every metric already')
+
+    def handle(self, *args, **options):
+        datasets = DatasetUpload.objects.order_by('id')
+        if options['dataset'] is not None:
+            datasets = datasets.filter(id=options['dataset'])
+
+        for dataset in datasets:
+            equipment = Equipment.objects.filter(dataset=dataset).order_by('id')
+            if options['missing_only'] and not any(
+                equipment.filter(**{f'{name}__isnull': True}).exists() for name in DERIVED_METRIC_NAMES
+            ):
+                continue
+
+            records = list(equipment.values_list('id', 'type_id', 'flowrate', 'pressure', 'temperature'))
+            # The type id stands in for the base type; the name is not used
+            derived = computed_fields(DatasetArrays([(None,) + record[1:] for record in records]))
+            updated = [
+                Equipment(id=record[0], **dict(zip(derived, metrics)))
+                for record, metrics in zip(records, zip(*derived.values()))
+            ]
+            with host_write_lock(), transaction.atomic():
+                Equipment.objects.bulk_update(updated, list(derived), batch_size=UPDATE_BATCH_SIZE)
+            self.stdout.write(f'Dataset {dataset.id}: {len(updated)} rows updated')
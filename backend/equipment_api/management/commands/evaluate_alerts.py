@@ -0,0 +1,47 @@
+"""
+Evaluate the current alert rules (``equipment_api.alerts``) against stored
+datasets, replacing the alerts raised when they were uploaded.
+
+    python manage.py evaluate_alerts
+    python manage.py evaluate_alerts --dataset 12
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from equipment_api.alerts import evaluate_alerts, load_rules
+from equipment_api.derived import DatasetArrays
+from equipment_api.ingest import host_write_lock
+from equipment_api.models import Alert, DatasetUpload, Equipment, EquipmentType
+
+
+class Command(BaseCommand):
+    help = 'Re-evaluate the alert rules against every (or one) stored dataset'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dataset', type=int, help='Only this dataset id')
+
+    def handle(self, *args, **options):
+        datasets = DatasetUpload.objects.order_by('id')
+        if options['dataset'] is not None:
+            datasets = datasets.filter(id=options['dataset'])
+
+        rules = load_rules()
+        for dataset in datasets:
+            records = list(Equipment.objects.filter(dataset=dataset).order_by('id').values_list(
+                'id', 'type_id', 'flowrate', 'pressure', 'temperature'
+            ))
+            type_names = EquipmentType.objects.names_for({r[1] for r in records})
+            arrays = DatasetArrays([
+                (None, type_names[type_id], flowrate, pressure, temperature)
+                for _, type_id, flowrate, pressure, temperature in records
+            ])
+            alerts = [
+                Alert(dataset=dataset, equipment_id=records[position][0], rule_id=rule_id,
+                      value=value, limit=limit, bound=bound)
+                for position, rule_id, value, limit, bound in evaluate_alerts(rules, arrays)
+            ]
+            with host_write_lock(), transaction.atomic():
+                Alert.objects.filter(dataset=dataset).delete()
+                Alert.objects.bulk_create(alerts)
+            self.stdout.write(f'Dataset {dataset.id}: {len(alerts)} alerts')
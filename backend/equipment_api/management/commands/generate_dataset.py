@@ -0,0 +1,25 @@
+"""
+Write a deterministic synthetic equipment CSV.
+
+    python manage.py generate_dataset --rows 100000 --seed 42 --output equipment_100k.csv
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from equipment_api.synthetic import write_csv
+
+
+class Command(BaseCommand):
+    help = 'Generate a valid synthetic equipment CSV of any size'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', required=True, help='Path of the CSV file to write')
+
+    def handle(self, *args, **options):
+        if options['rows'] < 1:
+            raise CommandError('--rows must be at least 1')
+        with open(options['output'], 'w', newline='', encoding='utf-8') as f:
+            write_csv(f, options['rows'], options['seed'])
+        self.stdout.write(f"Wrote {options['rows']} rows to {options['output']}")
@@ -0,0 +1,155 @@
+"""
+Query plans and latency of the hot read paths on a large Equipment table.
+
+Fills a scratch database with ``--rows`` equipment rows spread over the
+retained datasets, then runs each hot query twice: "before", with the
+hot-path indexes removed and only the plain ``dataset_id`` indexes the
+foreign keys used to carry, and "after", with the indexes of the current
+models. For each it prints the ``EXPLAIN QUERY PLAN`` and the median time to
+execute the SQL and fetch every row:
+
+    python manage.py indexbench --rows 1000000 --repeat 5
+"""
+
+import random
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, models
+from django.db.models import Count
+
+from equipment_api.benchmarking import scratch_database
+from equipment_api.ingest import PreparedDataset, write_datasets
+from equipment_api.models import DatasetUpload, Equipment, ReportJob
+from equipment_api.synthetic import TYPE_VARIANTS, generate_rows
+
+BASE_TYPES = dict(TYPE_VARIANTS)
+
+# Single-column foreign key indexes, as the schema had them before 0004
+LEGACY_INDEXES = [
+    (Equipment, models.Index(fields=['dataset'], name='bench_equipment_dataset_idx')),
+    (ReportJob, models.Index(fields=['dataset'], name='bench_reportjob_dataset_idx')),
+]
+
+
+def _latest():
+    return DatasetUpload.objects.order_by('-upload_timestamp')[:1]
+
+
+def _latest_id():
+    return DatasetUpload.objects.order_by('-upload_timestamp').values_list('id', flat=True).first()
+
+
+def _middle_page(page_size=100):
+    dataset = DatasetUpload.objects.order_by('-upload_timestamp').first()
+    offset = dataset.total_count // 2
+    return Equipment.objects.filter(dataset=dataset)[offset:offset + page_size]
+
+
+# name -> queryset factory; each mirrors a query issued by a view or the writer
+HOT_QUERIES = {
+    'latest dataset': _latest,
+    'history': lambda: DatasetUpload.objects.order_by('-upload_timestamp')[:5],
+    'retention': lambda: DatasetUpload.objects.order_by('-upload_timestamp', '-id')[settings.DATASET_RETENTION:],
+    'equipment of dataset': lambda: Equipment.objects.filter(dataset_id=_latest_id()),
+    'equipment page (middle)': _middle_page,
+    'type breakdown': lambda: (
+        Equipment.objects.filter(dataset_id=_latest_id()).values('type').annotate(count=Count('id')).order_by()
+    ),
+    'report jobs of dataset': lambda: ReportJob.objects.filter(dataset_id=_latest_id()),
+}
+
+
+class Command(BaseCommand):
+    help = 'Compare query plans and latency of the hot read paths with and without the hot-path indexes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000, help='Total equipment rows')
+        parser.add_argument('--datasets', type=int, default=settings.DATASET_RETENTION,
+                            help='Datasets the rows are spread over (at most DATASET_RETENTION)')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per query')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        if not 1 <= options['datasets'] <= settings.DATASET_RETENTION:
+            raise CommandError(f'--datasets must be between 1 and {settings.DATASET_RETENTION}')
+
+        with scratch_database():
+            self.fill(options['rows'], options['datasets'], options['seed'])
+            connection.cursor().execute('ANALYZE')
+
+            self.set_hot_path_indexes(False)
+            before = self.run_queries(options['repeat'])
+            self.set_hot_path_indexes(True)
+            after = self.run_queries(options['repeat'])
+
+        self.stdout.write(f"\n{'query':<26}{'before ms':>12}{'after ms':>12}{'speedup':>10}")
+        for name in HOT_QUERIES:
+            speedup = before[name]['median_ms'] / after[name]['median_ms'] if after[name]['median_ms'] else float('inf')
+            self.stdout.write(
+                f"{name:<26}{before[name]['median_ms']:>12.2f}{after[name]['median_ms']:>12.2f}{speedup:>9.1f}x"
+            )
+        self.stdout.write('\nQuery plans (before -> after):')
+        for name in HOT_QUERIES:
+            self.stdout.write(f'  {name}')
+            for label, result in (('before', before), ('after', after)):
+                self.stdout.write(f"    {label:<7}{' / '.join(result[name]['plan'])}")
+
+    def fill(self, rows, datasets, seed):
+        started = time.perf_counter()
+        rng = random.Random(seed)
+        per_dataset = -(-rows // datasets)
+        remaining = rows
+        for index in range(datasets):
+            count = min(per_dataset, remaining)
+            remaining -= count
+            batch = [
+                (name, BASE_TYPES[type_value], flowrate, pressure, temperature)
+                for name, type_value, flowrate, pressure, temperature in generate_rows(count, seed=rng.random())
+            ]
+            write_datasets([PreparedDataset(
+                filename=f'indexbench_{index}.csv',
+                total_count=count,
+                avg_flowrate=statistics.fmean(row[2] for row in batch),
+                avg_pressure=statistics.fmean(row[3] for row in batch),
+                avg_temperature=statistics.fmean(row[4] for row in batch),
+                type_distribution={},
+                rows=batch,
+            )])
+        self.stdout.write(f'Inserted {rows} equipment rows in {datasets} datasets in {time.perf_counter() - started:.1f}s')
+
+    def set_hot_path_indexes(self, enabled):
+        """Swap between the current indexes and the plain foreign key indexes"""
+        with connection.schema_editor() as editor:
+            for model in (DatasetUpload, Equipment, ReportJob):
+                for index in model._meta.indexes:
+                    if enabled:
+                        editor.add_index(model, index)
+                    else:
+                        editor.remove_index(model, index)
+            for model, index in LEGACY_INDEXES:
+                if enabled:
+                    editor.remove_index(model, index)
+                else:
+                    editor.add_index(model, index)
+        connection.cursor().execute('ANALYZE')
+
+    def run_queries(self, repeat):
+        results = {}
+        for name, factory in HOT_QUERIES.items():
+            sql, params = factory().query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+                plan = [row[-1] for row in cursor.fetchall()]
+                cursor.execute(sql, params)  # warm the page cache
+                cursor.fetchall()
+                timings = []
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    cursor.execute(sql, params)
+                    cursor.fetchall()
+                    timings.append((time.perf_counter() - started) * 1000)
+            results[name] = {'plan': plan, 'median_ms': statistics.median(timings)}
+        return results
@@ -0,0 +1,144 @@
+"""
+Upload throughput under concurrency, with and without the ingest coordinator.
+
+Uploader processes (gunicorn workers) each run several threads that write
+prepared datasets through ``ingest()``, while reader processes keep fetching
+the latest dataset and record their latency. Runs against a scratch
+database, so the real data and its retention window are untouched.
+
+    python manage.py ingestbench --modes direct,coordinator --workers 4 --threads 4
+"""
+
+import multiprocessing
+import random
+import statistics
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from equipment_api.benchmarking import scratch_database
+from equipment_api.ingest import PreparedDataset, ingest
+from equipment_api.models import Equipment, DatasetUpload
+
+TYPES = ['Reactor', 'Pump', 'Heat Exchanger', 'Compressor', 'Valve', 'Condenser']
+
+# Set by run_mode before the reader pool forks, so readers inherit it
+_stop_readers = None
+
+
+def _prepared(rows, seed):
+    rng = random.Random(seed)
+    data = [(f'{t} {i}', t, rng.uniform(10.5, 500.0), rng.uniform(1.0, 150.0), rng.uniform(20.0, 350.0))
+            for i, t in enumerate(rng.choice(TYPES) for _ in range(rows))]
+    distribution = {}
+    for _, t, _, _, _ in data:
+        distribution[t] = distribution.get(t, 0) + 1
+    return PreparedDataset(
+        filename=f'bench_{seed}.csv',
+        total_count=rows,
+        avg_flowrate=statistics.fmean(r[2] for r in data),
+        avg_pressure=statistics.fmean(r[3] for r in data),
+        avg_temperature=statistics.fmean(r[4] for r in data),
+        type_distribution=distribution,
+        rows=data,
+    )
+
+
+def _uploader(args):
+    """One worker process: ``threads`` request threads each ingesting ``uploads`` datasets"""
+    worker, use_coordinator, threads, uploads, rows = args
+    settings.INGEST_COORDINATOR = use_coordinator
+    errors = []
+
+    def run(thread):
+        for n in range(uploads):
+            try:
+                ingest(_prepared(rows, seed=(worker * 1000 + thread) * 1000 + n))
+            except Exception as e:
+                errors.append(str(e))
+            finally:
+                if not use_coordinator:
+                    connections.close_all()
+
+    pool = [threading.Thread(target=run, args=(t,)) for t in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return errors
+
+
+def _reader(_):
+    """Fetch the latest dataset's rows until told to stop, returning latencies"""
+    latencies = []
+    while not _stop_readers.is_set():
+        started = time.perf_counter()
+        latest = DatasetUpload.objects.order_by('-upload_timestamp').first()
+        if latest:
+            list(Equipment.objects.filter(dataset=latest).values_list('id', flat=True))
+        latencies.append(time.perf_counter() - started)
+        time.sleep(0.005)
+    return latencies
+
+
+class Command(BaseCommand):
+    help = 'Measure upload throughput under concurrency with and without the ingest coordinator'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modes', default='direct,coordinator',
+                            help='Comma-separated write modes: direct, coordinator')
+        parser.add_argument('--workers', type=int, default=4, help='Uploader processes')
+        parser.add_argument('--threads', type=int, default=4, help='Request threads per uploader process')
+        parser.add_argument('--uploads', type=int, default=5, help='Uploads per thread')
+        parser.add_argument('--rows', type=int, default=1000, help='Rows per upload')
+        parser.add_argument('--readers', type=int, default=2, help='Reader processes')
+
+    def handle(self, *args, **options):
+        modes = [m.strip() for m in options['modes'].split(',') if m.strip()]
+        if any(m not in ('direct', 'coordinator') for m in modes):
+            raise CommandError('--modes accepts: direct, coordinator')
+
+        self.stdout.write(
+            f"{'mode':<13}{'uploads/s':>11}{'rows/s':>12}{'errors':>8}{'read p50 ms':>13}{'read p95 ms':>13}"
+        )
+        for mode in modes:
+            with scratch_database():
+                result = self.run_mode(mode == 'coordinator', options)
+            self.stdout.write(
+                f"{mode:<13}{result['uploads_per_s']:>11.1f}{result['rows_per_s']:>12.0f}"
+                f"{result['errors']:>8}{result['read_p50']:>13.1f}{result['read_p95']:>13.1f}"
+            )
+            for error in result['sample_errors']:
+                self.stderr.write(f"  {mode}: {error}")
+
+    def run_mode(self, use_coordinator, options):
+        global _stop_readers
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        _stop_readers = context.Event()
+        uploads = options['workers'] * options['threads'] * options['uploads']
+
+        with context.Pool(options['readers']) as readers, context.Pool(options['workers']) as uploaders:
+            reading = readers.map_async(_reader, range(options['readers']))
+            started = time.perf_counter()
+            errors = uploaders.map(_uploader, [
+                (worker, use_coordinator, options['threads'], options['uploads'], options['rows'])
+                for worker in range(options['workers'])
+            ])
+            elapsed = time.perf_counter() - started
+            _stop_readers.set()
+            latencies = sorted(ms * 1000 for chunk in reading.get() for ms in chunk)
+
+        errors = [e for worker_errors in errors for e in worker_errors]
+        succeeded = uploads - len(errors)
+        return {
+            'uploads_per_s': succeeded / elapsed,
+            'rows_per_s': succeeded * options['rows'] / elapsed,
+            'errors': len(errors),
+            'sample_errors': errors[:3],
+            'read_p50': statistics.median(latencies) if latencies else 0.0,
+            'read_p95': latencies[int(len(latencies) * 0.95)] if latencies else 0.0,
+        }
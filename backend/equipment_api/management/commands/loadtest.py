@@ -0,0 +1,89 @@
+"""
+Concurrency load test against a running server.
+
+Compare the WSGI (sync DRF) and ASGI (async) read paths by pointing the same
+run at both URL prefixes:
+
+    python manage.py loadtest --token KEY --paths equipment/,async/equipment/ \\
+        --concurrency 8,32,128 --requests 400 --read-delay 0.01
+
+``--read-delay`` makes every client read the body in small pieces with a pause
+between them, simulating slow clients and long streaming downloads.
+"""
+
+import statistics
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Measure throughput and latency of API endpoints at increasing client concurrency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000/api/')
+        parser.add_argument('--token', required=True, help='API token used for every request')
+        parser.add_argument('--paths', default='equipment/,async/equipment/',
+                            help='Comma-separated paths relative to --base-url')
+        parser.add_argument('--concurrency', default='1,8,32,128',
+                            help='Comma-separated numbers of simultaneous clients')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per path and concurrency level')
+        parser.add_argument('--read-delay', type=float, default=0.0,
+                            help='Seconds to pause between 1KB body reads (slow client simulation)')
+        parser.add_argument('--timeout', type=float, default=30.0)
+
+    def handle(self, *args, **options):
+        base_url = options['base_url'].rstrip('/') + '/'
+        paths = [p.strip().lstrip('/') for p in options['paths'].split(',') if p.strip()]
+        try:
+            levels = [int(c) for c in options['concurrency'].split(',')]
+        except ValueError:
+            raise CommandError('--concurrency must be a comma-separated list of integers')
+
+        headers = {'Authorization': f"Token {options['token']}"}
+        self.stdout.write(f"{'path':<32}{'clients':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}{'errors':>8}")
+        for path in paths:
+            url = base_url + path
+            for clients in levels:
+                result = self.run_level(url, headers, clients, options)
+                self.stdout.write(
+                    f"{path:<32}{clients:>8}{result['throughput']:>10.1f}{result['p50']:>10.1f}"
+                    f"{result['p95']:>10.1f}{result['max']:>10.1f}{result['errors']:>8}"
+                )
+
+    def run_level(self, url, headers, clients, options):
+        """Fire ``--requests`` requests from ``clients`` threads and summarise them"""
+        read_delay = options['read_delay']
+        timeout = options['timeout']
+
+        def fetch(_):
+            started = time.perf_counter()
+            try:
+                request = urllib.request.Request(url, headers=headers)
+                with urllib.request.urlopen(request, timeout=timeout) as response:
+                    while response.read(1024):
+                        if read_delay:
+                            time.sleep(read_delay)
+                return time.perf_counter() - started, None
+            except (urllib.error.URLError, OSError) as e:
+                return time.perf_counter() - started, e
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clients) as pool:
+            outcomes = list(pool.map(fetch, range(options['requests'])))
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(duration * 1000 for duration, error in outcomes if error is None)
+        errors = sum(1 for _, error in outcomes if error is not None)
+        if not latencies:
+            return {'throughput': 0.0, 'p50': 0.0, 'p95': 0.0, 'max': 0.0, 'errors': errors}
+        return {
+            'throughput': len(latencies) / elapsed,
+            'p50': statistics.median(latencies),
+            'p95': latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+            'max': latencies[-1],
+            'errors': errors,
+        }
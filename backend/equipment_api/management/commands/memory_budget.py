@@ -0,0 +1,212 @@
+"""
+Memory budget harness for the upload and PDF report paths.
+
+For each dataset size, uploads a synthetic CSV and renders its PDF report
+against a scratch database while measuring peak RSS growth and tracemalloc
+allocations (per stage for uploads). The command exits with an error when
+peak RSS growth exceeds the budget (a fixed allowance plus a per-100k-rows
+allowance scaled to the dataset size), and prints the
+top allocation sites of each stage so a regression can be attributed:
+
+    python manage.py memory_budget --sizes 10000,100000 --budget-mb-per-100k 300 --base-mb 32
+
+Small warm-up uploads (one per CSV engine) and a report run first so
+one-off import and connection costs are not charged to the smallest size.
+Peak RSS is reset between measurements through /proc/self/clear_refs on
+Linux; elsewhere the process-lifetime peak is used, which only grows.
+"""
+
+import gc
+import resource
+import sys
+import tracemalloc
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from equipment_api import metrics
+from equipment_api.benchmarking import api_client, scratch_database, upload
+from equipment_api.synthetic import csv_bytes
+
+MB = 1024 * 1024
+
+
+def reset_peak_rss():
+    """Reset the kernel's peak RSS counter for this process, where supported"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+def peak_rss_bytes():
+    """Peak resident set size since the last reset (or since process start)"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def current_rss_bytes():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return peak_rss_bytes()
+
+
+class StageProfiler:
+    """``metrics.stage_listeners`` hook recording tracemalloc peaks and top sites per stage"""
+
+    def __init__(self, top):
+        self.top = top
+        self.started = {}
+        self.stages = {}
+
+    def __call__(self, name, event):
+        if event == 'start':
+            tracemalloc.reset_peak()
+            snapshot = tracemalloc.take_snapshot() if self.top else None
+            self.started[name] = (tracemalloc.get_traced_memory()[0], snapshot)
+            return
+
+        current, peak = tracemalloc.get_traced_memory()
+        baseline, snapshot = self.started.pop(name)
+        sites = []
+        if self.top:
+            diff = tracemalloc.take_snapshot().compare_to(snapshot, 'lineno')
+            sites = [stat for stat in diff if stat.size_diff > 0][:self.top]
+        self.stages[name] = {
+            'peak_bytes': peak - baseline,
+            'retained_bytes': current - baseline,
+            'sites': sites,
+        }
+
+
+class Command(BaseCommand):
+    help = 'Measure peak memory of upload_csv (per stage) and generate_pdf_report against a budget'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10000,100000', help='Comma-separated dataset sizes in rows')
+        parser.add_argument('--budget-mb-per-100k', type=float, default=float(settings.MEMORY_BUDGET_MB_PER_100K_ROWS),
+                            help='Allowed peak RSS growth in MB per 100k rows')
+        parser.add_argument('--base-mb', type=float, default=float(settings.MEMORY_BUDGET_BASE_MB),
+                            help='Fixed peak RSS allowance in MB per request, independent of size')
+        parser.add_argument('--top', type=int, default=5, help='Allocation sites to print per stage (0 disables)')
+        parser.add_argument('--skip-report', action='store_true', help='Only measure the upload path')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(s) for s in options['sizes'].split(',')]
+        except ValueError:
+            raise CommandError('--sizes must be a comma-separated list of integers')
+
+        # Write inline so upload allocations are not split across the writer thread
+        settings.INGEST_COORDINATOR = False
+        setup_test_environment()
+        tracemalloc.start(25)
+        violations = []
+        try:
+            with scratch_database():
+                client = api_client()
+                self.warm_up(client)
+                for rows in sizes:
+                    violations += self.measure_size(client, rows, options)
+        finally:
+            tracemalloc.stop()
+            teardown_test_environment()
+
+        if violations:
+            raise CommandError('Memory budget exceeded:\n  ' + '\n  '.join(violations))
+        self.stdout.write(self.style.SUCCESS('All measurements within budget'))
+
+    def measure_size(self, client, rows, options):
+        budget = (options['base_mb'] + options['budget_mb_per_100k'] * rows / 100000) * MB
+        content = csv_bytes(rows, seed=options['seed'])
+        violations = []
+
+        profiler = StageProfiler(options['top'])
+        metrics.stage_listeners.append(profiler)
+        try:
+            response, rss, traced, _ = self.measure(lambda: upload(client, content))
+        finally:
+            metrics.stage_listeners.remove(profiler)
+        if response.status_code != 200:
+            raise CommandError(f'Upload of {rows} rows failed: {response.content[:200]!r}')
+        dataset_id = response.json()['dataset_id']
+        # Stages reset the tracemalloc peak, so the request-wide peak is the largest stage peak
+        traced = max([traced] + [result['peak_bytes'] for result in profiler.stages.values()])
+        self.print_result('upload_csv', rows, rss, traced, budget)
+        for name, result in profiler.stages.items():
+            self.stdout.write(
+                f"    stage {name:<10} peak {result['peak_bytes'] / MB:8.1f} MB"
+                f"   retained {result['retained_bytes'] / MB:8.1f} MB"
+            )
+            self.print_sites(result['sites'])
+        if rss > budget:
+            violations.append(f'upload_csv with {rows} rows: {rss / MB:.1f} MB > {budget / MB:.1f} MB')
+        del response, content
+
+        if not options['skip_report']:
+            response, rss, traced, sites = self.measure(
+                lambda: client.get('/api/report/pdf/', {'dataset_id': dataset_id}),
+                top=options['top']
+            )
+            if response.status_code != 200:
+                raise CommandError(f'Report for {rows} rows failed with {response.status_code}')
+            self.print_result('generate_pdf_report', rows, rss, traced, budget)
+            self.print_sites(sites)
+            if rss > budget:
+                violations.append(f'generate_pdf_report with {rows} rows: {rss / MB:.1f} MB > {budget / MB:.1f} MB')
+        return violations
+
+    def warm_up(self, client):
+        # One upload per CSV engine, so neither engine's first imports are charged to a measurement
+        for engine in ('csv', 'pandas'):
+            with override_settings(CSV_ENGINE=engine):
+                response = upload(client, csv_bytes(100), filename=f'warmup_{engine}.csv')
+            if response.status_code != 200:
+                raise CommandError(f'Warm-up upload failed: {response.content[:200]!r}')
+        client.get('/api/report/pdf/', {'dataset_id': response.json()['dataset_id']})
+
+    def measure(self, operation, top=0):
+        """Run ``operation`` returning (result, peak RSS growth, tracemalloc peak, top sites)"""
+        gc.collect()
+        reset_peak_rss()
+        tracemalloc.reset_peak()
+        baseline_rss = current_rss_bytes()
+        baseline_traced = tracemalloc.get_traced_memory()[0]
+        before = tracemalloc.take_snapshot() if top else None
+
+        result = operation()
+
+        traced = tracemalloc.get_traced_memory()[1] - baseline_traced
+        rss = peak_rss_bytes() - baseline_rss
+        sites = []
+        if top:
+            diff = tracemalloc.take_snapshot().compare_to(before, 'lineno')
+            sites = [stat for stat in diff if stat.size_diff > 0][:top]
+        return result, rss, traced, sites
+
+    def print_result(self, name, rows, rss, traced, budget):
+        status = self.style.SUCCESS('ok') if rss <= budget else self.style.ERROR('OVER BUDGET')
+        self.stdout.write(
+            f"{name:<20} {rows:>9} rows  peak RSS +{rss / MB:8.1f} MB  "
+            f"traced peak {traced / MB:8.1f} MB  budget {budget / MB:8.1f} MB  {status}"
+        )
+
+    def print_sites(self, sites):
+        for stat in sites:
+            frame = stat.traceback[0]
+            self.stdout.write(f"        {stat.size_diff / MB:8.2f} MB  {frame.filename}:{frame.lineno}")
@@ -0,0 +1,150 @@
+"""
+Parse time and peak memory of the pandas upload path on large files.
+
+Compares the previous ``read_csv`` with default type inference (object
+columns for the names and types, a per-row ``apply`` for the base types)
+with the typed read of ``parsing.read_typed`` on the C parser and, when
+pyarrow is installed, on pyarrow. Each measurement runs in a freshly forked
+process, so the peak RSS growth it reports is not hidden by memory an
+earlier run left with the allocator:
+
+* read: ``read_csv`` alone; "frame MB" is the DataFrame's deep memory usage
+* upload: the whole parse into a ``PreparedDataset``, validation included
+
+With ``--processes N`` it also times the sharded parse of the upload stored
+in a file (``equipment_api.sharding``) with a pool of N processes. That runs
+in this process, as the pool cannot be started from a forked child, so only
+its time is reported; run it with 1, 2, 4, ... to see how it scales with
+cores:
+
+    python manage.py parsebench --sizes 100000,1000000 --repeat 3
+    python manage.py parsebench --sizes 5000000 --processes 4
+"""
+
+import gc
+import io
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from equipment_api.parsing import VALID_TYPES, VALUE_RANGES, extract_base_type, parse_with_pandas, read_typed
+from equipment_api.sharding import parse_sharded
+from equipment_api.synthetic import csv_bytes
+
+from .memory_budget import MB, current_rss_bytes, peak_rss_bytes, reset_peak_rss
+
+# Set by handle before each measurement forks, so the child inherits it
+_content = None
+
+
+def _read_inferred(content):
+    import pandas as pd
+
+    return pd.read_csv(io.StringIO(content))
+
+
+def _upload_inferred(content):
+    """The pandas upload path as it was before dtypes were declared"""
+    df = _read_inferred(content)
+    df['BaseType'] = df['Type'].apply(extract_base_type)
+    df[~df['BaseType'].isin(VALID_TYPES)]['Type'].unique()
+    for column, _, _, _ in VALUE_RANGES:
+        df[column].min(), df[column].max(), df[column].mean()
+    df['Type'].value_counts().to_dict()
+    return list(zip(df['Equipment Name'].tolist(), df['BaseType'].tolist(), df['Flowrate'].astype(float).tolist(),
+                    df['Pressure'].astype(float).tolist(), df['Temperature'].astype(float).tolist()))
+
+
+def _measure(args):
+    """One run in a forked child: (seconds, peak RSS growth, DataFrame bytes or None)"""
+    config, step = args
+    if step == 'read':
+        run = _read_inferred if config == 'inferred' else lambda content: read_typed(content.encode('utf-8'), config)
+    elif config == 'inferred':
+        run = _upload_inferred
+    else:
+        run = lambda content: parse_with_pandas('bench.csv', content, engine=config)
+
+    gc.collect()
+    reset_peak_rss()
+    baseline = current_rss_bytes()
+    started = time.perf_counter()
+    result = run(_content)
+    seconds = time.perf_counter() - started
+    growth = peak_rss_bytes() - baseline
+    frame_bytes = int(result.memory_usage(deep=True).sum()) if step == 'read' else None
+    return seconds, growth, frame_bytes
+
+
+class Command(BaseCommand):
+    help = 'Measure parse time and peak memory of inferred and typed read_csv on large uploads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='100000,1000000', help='Comma-separated upload sizes in rows')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per configuration, step and size')
+        parser.add_argument('--processes', type=int, default=0,
+                            help='Also time the sharded parse with this many pool processes (at least 2)')
+
+    def handle(self, *args, **options):
+        global _content
+        try:
+            sizes = [int(s) for s in options['sizes'].split(',') if s]
+        except ValueError:
+            raise CommandError('--sizes must be a comma-separated list of integers')
+
+        import pandas  # noqa: F401  imported before forking so no run pays for it
+        configs = ['inferred', 'c']
+        try:
+            import pyarrow.csv  # noqa: F401
+            configs.append('pyarrow')
+        except ImportError:
+            self.stdout.write('pyarrow is not installed; skipping the pyarrow engine')
+
+        context = multiprocessing.get_context('fork')
+        self.stdout.write(
+            f"{'rows':>9}  {'read_csv':<10}{'read ms':>10}{'read MB':>10}{'frame MB':>10}"
+            f"{'upload ms':>11}{'upload MB':>11}  (MB: peak RSS growth)"
+        )
+        for rows in sizes:
+            _content = csv_bytes(rows, seed=rows).decode('utf-8')
+            for config in configs:
+                results = {}
+                for step in ('read', 'upload'):
+                    runs = []
+                    for _ in range(options['repeat']):
+                        with context.Pool(1) as pool:
+                            runs.append(pool.apply(_measure, ((config, step),)))
+                    results[step] = runs
+                read, upload = results['read'], results['upload']
+                self.stdout.write(
+                    f"{rows:>9}  {config:<10}"
+                    f"{statistics.median(r[0] for r in read) * 1000:>10.0f}"
+                    f"{statistics.median(r[1] for r in read) / MB:>10.1f}"
+                    f"{read[0][2] / MB:>10.1f}"
+                    f"{statistics.median(r[0] for r in upload) * 1000:>11.0f}"
+                    f"{statistics.median(r[1] for r in upload) / MB:>11.1f}"
+                )
+            if options['processes'] > 1:
+                self.time_sharded(rows, _content, options)
+        _content = None
+
+    def time_sharded(self, rows, content, options):
+        with tempfile.TemporaryDirectory() as directory, \
+                override_settings(CSV_PARSE_PROCESSES=options['processes'], CSV_SHARD_MIN_BYTES=0):
+            path = os.path.join(directory, 'bench.csv')
+            with open(path, 'w', encoding='utf-8', newline='') as f:
+                f.write(content)
+            parse_sharded('bench.csv', path)  # starts the pool processes
+            runs = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                parse_sharded('bench.csv', path)
+                runs.append(time.perf_counter() - started)
+        label = f"sharded/{options['processes']}"
+        self.stdout.write(f"{rows:>9}  {label:<10}{'-':>10}{'-':>10}{'-':>10}"
+                          f"{statistics.median(runs) * 1000:>11.0f}{'-':>11}")
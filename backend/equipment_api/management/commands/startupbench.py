@@ -0,0 +1,143 @@
+"""
+Cold-start time and per-worker memory of the API processes.
+
+Cold start: each run starts a fresh interpreter that sets up Django, loads
+the WSGI application and resolves the URLconf (what a gunicorn worker does
+before its first request), and reports the time taken and its RSS.
+"eager" also imports the heavy upload and report modules at startup, as the
+views used to; "lazy" is the current behaviour.
+
+Worker memory: a master process forks ``--workers`` workers, each of which
+then imports the heavy modules as its first upload or report would, and the
+RSS, PSS and private memory of every process are read from
+``/proc/<pid>/smaps_rollup`` while all of them are alive. "fork" loads
+nothing before forking (each worker imports its own copy); "preload" loads
+the application and the heavy modules in the master and freezes the GC
+heap, as ``GUNICORN_PRELOAD=True`` does:
+
+    python manage.py startupbench --repeat 5 --workers 4
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+MB = 1024 * 1024
+
+COLD_START_SCRIPT = '''
+import json, sys, time
+started = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+from django.urls import get_resolver
+get_wsgi_application()
+get_resolver().url_patterns
+if sys.argv[1] == 'eager':
+    from equipment_api.preload import import_heavy_modules
+    import_heavy_modules()
+seconds = time.perf_counter() - started
+with open('/proc/self/status') as f:
+    rss = next(int(line.split()[1]) * 1024 for line in f if line.startswith('VmRSS:'))
+print(json.dumps({'seconds': seconds, 'rss': rss}))
+'''
+
+WORKERS_SCRIPT = '''
+import json, os, sys
+from django.core.wsgi import get_wsgi_application
+from django.urls import get_resolver
+from equipment_api.preload import freeze_heap, import_heavy_modules
+
+def load():
+    get_wsgi_application()
+    get_resolver().url_patterns
+
+def memory(pid):
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            key, _, rest = line.partition(':')
+            if key in ('Rss', 'Pss', 'Private_Clean', 'Private_Dirty'):
+                values[key] = int(rest.split()[0]) * 1024
+    return {'rss': values['Rss'], 'pss': values['Pss'],
+            'private': values['Private_Clean'] + values['Private_Dirty']}
+
+mode, workers = sys.argv[1], int(sys.argv[2])
+if mode == 'preload':
+    load()
+    import_heavy_modules()
+    freeze_heap()
+
+release_read, release_write = os.pipe()
+pids = []
+for _ in range(workers):
+    ready_read, ready_write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(release_write)
+        if mode == 'fork':
+            load()
+        import_heavy_modules()
+        os.write(ready_write, b'1')
+        os.read(release_read, 1)  # stay alive until the master has measured everyone
+        os._exit(0)
+    os.read(ready_read, 1)
+    os.close(ready_read)
+    os.close(ready_write)
+    pids.append(pid)
+
+result = {'master': memory(os.getpid()), 'workers': [memory(pid) for pid in pids]}
+os.close(release_write)
+for pid in pids:
+    os.waitpid(pid, 0)
+print(json.dumps(result))
+'''
+
+
+class Command(BaseCommand):
+    help = 'Measure cold-start time and per-worker memory with lazy imports and with gunicorn preload'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5, help='Cold starts per mode')
+        parser.add_argument('--workers', type=int, default=4, help='Workers forked per memory run')
+
+    def handle(self, *args, **options):
+        if not os.path.exists('/proc/self/smaps_rollup'):
+            raise CommandError('startupbench reads /proc/<pid>/smaps_rollup and only runs on Linux')
+
+        self.stdout.write(f"{'cold start':<12}{'median ms':>12}{'RSS MB':>10}")
+        for mode in ('eager', 'lazy'):
+            runs = [self.run_script(COLD_START_SCRIPT, mode) for _ in range(options['repeat'])]
+            self.stdout.write(
+                f"{mode:<12}{statistics.median(r['seconds'] for r in runs) * 1000:>12.0f}"
+                f"{statistics.median(r['rss'] for r in runs) / MB:>10.1f}"
+            )
+
+        self.stdout.write(
+            f"\n{'workers':<12}{'master RSS':>12}{'worker RSS':>12}{'worker PSS':>12}"
+            f"{'private':>10}{'total PSS':>11}  (MB, per-worker averages)"
+        )
+        for mode in ('fork', 'preload'):
+            result = self.run_script(WORKERS_SCRIPT, mode, str(options['workers']))
+            workers = result['workers']
+            total_pss = result['master']['pss'] + sum(w['pss'] for w in workers)
+            self.stdout.write(
+                f"{mode:<12}{result['master']['rss'] / MB:>12.1f}"
+                f"{statistics.fmean(w['rss'] for w in workers) / MB:>12.1f}"
+                f"{statistics.fmean(w['pss'] for w in workers) / MB:>12.1f}"
+                f"{statistics.fmean(w['private'] for w in workers) / MB:>10.1f}"
+                f"{total_pss / MB:>11.1f}"
+            )
+
+    def run_script(self, script, *args):
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'config.settings')}
+        completed = subprocess.run(
+            [sys.executable, '-c', script, *args],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True
+        )
+        if completed.returncode != 0:
+            raise CommandError(f'Benchmark process failed:\n{completed.stderr}')
+        return json.loads(completed.stdout.strip().splitlines()[-1])
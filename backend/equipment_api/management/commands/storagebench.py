@@ -0,0 +1,153 @@
+"""
+Storage size and scan speed of the compact equipment schema.
+
+Fills a scratch database with ``--rows`` equipment rows, then copies them
+into a table with the previous layout (type and name stored as strings on
+every row, with the same indexes) and compares the two: on-disk size of each
+table and its indexes (from SQLite's ``dbstat``), a full-table aggregate scan,
+and a per-dataset fetch of complete rows as the API issues it (the compact
+rows carry ids that are decoded from the in-process lookup caches):
+
+    python manage.py storagebench --rows 1000000 --repeat 5
+"""
+
+import random
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection
+
+from equipment_api.benchmarking import scratch_database
+from equipment_api.ingest import PreparedDataset, write_datasets
+from equipment_api.models import DatasetUpload, Equipment
+from equipment_api.synthetic import TYPE_VARIANTS, generate_rows
+
+BASE_TYPES = dict(TYPE_VARIANTS)
+MB = 1024 * 1024
+
+LEGACY_TABLE = 'bench_legacy_equipment'
+
+# Layout of equipment_api_equipment before the lookup tables (migration 0004)
+LEGACY_SCHEMA = [
+    f'''CREATE TABLE {LEGACY_TABLE} (
+        "id" integer NOT NULL PRIMARY KEY AUTOINCREMENT,
+        "equipment_name" varchar(200) NOT NULL,
+        "type" varchar(100) NOT NULL,
+        "flowrate" real NOT NULL,
+        "pressure" real NOT NULL,
+        "temperature" real NOT NULL,
+        "created_at" datetime NOT NULL,
+        "dataset_id" bigint NOT NULL
+    )''',
+    f'''INSERT INTO {LEGACY_TABLE}
+        SELECT e.id, n.name, t.name, e.flowrate, e.pressure, e.temperature, e.created_at, e.dataset_id
+        FROM equipment_api_equipment e
+        JOIN equipment_api_equipmentname n ON n.id = e.name_id
+        JOIN equipment_api_equipmenttype t ON t.id = e.type_id''',
+    f'CREATE INDEX bench_legacy_dataset_created ON {LEGACY_TABLE} ("dataset_id", "created_at")',
+    f'CREATE INDEX bench_legacy_dataset_type ON {LEGACY_TABLE} ("dataset_id", "type")',
+]
+
+
+class Command(BaseCommand):
+    help = 'Compare table/index size and scan speed of the compact equipment schema with the string layout'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000, help='Total equipment rows')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per query')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            self.fill(options['rows'], options['seed'])
+            with connection.cursor() as cursor:
+                for statement in LEGACY_SCHEMA:
+                    cursor.execute(statement)
+                cursor.execute('ANALYZE')
+            self.report_sizes()
+            self.report_scans(options['repeat'])
+
+    def fill(self, rows, seed):
+        started = time.perf_counter()
+        rng = random.Random(seed)
+        datasets = settings.DATASET_RETENTION
+        per_dataset = -(-rows // datasets)
+        remaining = rows
+        for index in range(datasets):
+            count = min(per_dataset, remaining)
+            remaining -= count
+            batch = [
+                (name, BASE_TYPES[type_value], flowrate, pressure, temperature)
+                for name, type_value, flowrate, pressure, temperature in generate_rows(count, seed=rng.random())
+            ]
+            write_datasets([PreparedDataset(
+                filename=f'storagebench_{index}.csv',
+                total_count=count,
+                avg_flowrate=statistics.fmean(row[2] for row in batch),
+                avg_pressure=statistics.fmean(row[3] for row in batch),
+                avg_temperature=statistics.fmean(row[4] for row in batch),
+                type_distribution={},
+                rows=batch,
+            )])
+        self.stdout.write(f'Inserted {rows} equipment rows in {time.perf_counter() - started:.1f}s')
+
+    def report_sizes(self):
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT tbl_name, name FROM sqlite_master WHERE type IN (\'table\', \'index\')')
+                owners = dict((name, table) for table, name in cursor.fetchall())
+                cursor.execute('SELECT name, SUM(pgsize) FROM dbstat GROUP BY name')
+                sizes = cursor.fetchall()
+        except OperationalError:
+            self.stdout.write('Table sizes unavailable (SQLite built without dbstat)')
+            return
+
+        totals = {}
+        for name, size in sizes:
+            table = owners.get(name, name)
+            kind = 'table' if name == table else 'indexes'
+            totals.setdefault(table, {'table': 0, 'indexes': 0})[kind] += size
+
+        compact_tables = [Equipment._meta.db_table, 'equipment_api_equipmentname', 'equipment_api_equipmenttype']
+        self.stdout.write(f"\n{'layout':<10}{'table':<32}{'data MB':>10}{'index MB':>10}")
+        for label, tables in (('string', [LEGACY_TABLE]), ('compact', compact_tables)):
+            data = indexes = 0
+            for table in tables:
+                data += totals[table]['table']
+                indexes += totals[table]['indexes']
+                self.stdout.write(
+                    f"{label:<10}{table:<32}{totals[table]['table'] / MB:>10.1f}{totals[table]['indexes'] / MB:>10.1f}"
+                )
+            self.stdout.write(f"{label:<10}{'total':<32}{data / MB:>10.1f}{indexes / MB:>10.1f}")
+
+    def report_scans(self, repeat):
+        dataset_id = DatasetUpload.objects.order_by('-upload_timestamp').values_list('id', flat=True).first()
+        compact_fetch, fetch_params = Equipment.objects.filter(dataset_id=dataset_id).query.sql_with_params()
+        queries = [
+            ('aggregate scan', 'string',
+             f'SELECT type, COUNT(*), AVG(flowrate), AVG(pressure), AVG(temperature) FROM {LEGACY_TABLE} GROUP BY type',
+             ()),
+            ('aggregate scan', 'compact',
+             'SELECT type_id, COUNT(*), AVG(flowrate), AVG(pressure), AVG(temperature) '
+             f'FROM {Equipment._meta.db_table} GROUP BY type_id',
+             ()),
+            ('dataset fetch', 'string',
+             f'SELECT * FROM {LEGACY_TABLE} WHERE dataset_id = %s ORDER BY created_at DESC',
+             (dataset_id,)),
+            ('dataset fetch', 'compact', compact_fetch, fetch_params),
+        ]
+
+        self.stdout.write(f"\n{'query':<18}{'layout':<10}{'median ms':>12}")
+        with connection.cursor() as cursor:
+            for name, layout, sql, params in queries:
+                cursor.execute(sql, params)  # warm the page cache
+                cursor.fetchall()
+                timings = []
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    cursor.execute(sql, params)
+                    cursor.fetchall()
+                    timings.append((time.perf_counter() - started) * 1000)
+                self.stdout.write(f'{name:<18}{layout:<10}{statistics.median(timings):>12.2f}')
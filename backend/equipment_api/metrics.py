@@ -0,0 +1,301 @@
+"""
+Request and upload-pipeline metrics exposed in Prometheus text format.
+
+Each process accumulates counters and fixed-bucket histograms in memory
+(a dict update under a lock per observation) and periodically writes a
+snapshot to ``METRICS_DIR/<pid>.json``. The ``/api/metrics/`` endpoint
+merges the snapshots of every live worker, so no external collector or
+shared memory is needed; snapshots of exited workers are removed.
+
+Database queries are counted per request by a wrapper installed on every
+connection, which adds to the ``QueryTimer`` of the current context. The
+context follows the request into ``sync_to_async`` threads, and the ingest
+writer thread counts a batch's queries for the request that submitted it.
+"""
+
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+HISTOGRAMS = {
+    'api_request_duration_seconds': ('Request latency by URL name', LATENCY_BUCKETS),
+    'api_response_size_bytes': ('Response body size by URL name', SIZE_BUCKETS),
+    'api_db_queries_per_request': ('Database queries issued per request', QUERY_COUNT_BUCKETS),
+    'upload_stage_duration_seconds': ('Upload pipeline stage latency', LATENCY_BUCKETS),
+}
+COUNTERS = {
+    'api_requests_total': 'Requests by URL name, method and status code',
+    'api_db_queries_total': 'Database queries issued by URL name',
+    'api_db_query_seconds_total': 'Time spent in database queries by URL name',
+    'upload_csv_engine_total': ('Uploads parsed by CSV engine (pandas_fallback: handed over by the csv engine), '
+                                'or as parquet or arrow files'),
+    'upload_admission_total': 'Upload admission decisions (admitted, or denied for process, bytes or host capacity)',
+}
+
+
+class MetricsRegistry:
+    """In-process counters and histograms keyed by (metric name, label tuple)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.last_flush = 0.0
+
+    def inc(self, name, labels, amount=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, labels, value):
+        buckets = HISTOGRAMS[name][1]
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [[0] * len(buckets), 0.0, 0]
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram[0][i] += 1
+                    break
+            histogram[1] += value
+            histogram[2] += 1
+
+    def snapshot(self):
+        """JSON-serialisable copy of every series; bucket counts are non-cumulative"""
+        with self.lock:
+            return {
+                'counters': [[name, list(labels), value] for (name, labels), value in self.counters.items()],
+                'histograms': [[name, list(labels), list(h[0]), h[1], h[2]]
+                               for (name, labels), h in self.histograms.items()],
+            }
+
+    def flush(self, force=False):
+        """Write this process's snapshot for the endpoint to merge, at most every flush interval"""
+        now = time.monotonic()
+        if not force and now - self.last_flush < settings.METRICS_FLUSH_INTERVAL:
+            return
+        self.last_flush = now
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        path = os.path.join(settings.METRICS_DIR, f'{os.getpid()}.json')
+        with open(f'{path}.tmp', 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(f'{path}.tmp', path)
+
+
+registry = MetricsRegistry()
+
+# Callables invoked as listener(stage_name, 'start' | 'end'); used by profiling tools
+stage_listeners = []
+
+
+@contextmanager
+def stage(name):
+    """Time one upload pipeline stage (decode, parse, validate, derive, insert, evict)"""
+    for listener in stage_listeners:
+        listener(name, 'start')
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if settings.METRICS_ENABLED:
+            registry.observe('upload_stage_duration_seconds', {'stage': name}, time.perf_counter() - started)
+        for listener in stage_listeners:
+            listener(name, 'end')
+
+
+class QueryTimer:
+    """Number and duration of the queries run while it is active (see ``count_queries``)"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+
+# The timers the queries of the current context are added to
+_active_timers = contextvars.ContextVar('active_query_timers', default=())
+
+
+def _time_query(execute, sql, params, many, context):
+    timers = _active_timers.get()
+    if not timers:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        for timer in timers:
+            timer.count += 1
+            timer.seconds += elapsed
+
+
+def _install_query_timer(sender, connection, **kwargs):
+    # Sent again whenever the wrapper reconnects
+    if _time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_time_query)
+
+
+connection_created.connect(_install_query_timer)
+
+
+@contextmanager
+def count_queries(*timers):
+    """Add the queries run in this context, on any connection, to ``timers`` (replacing the active ones)"""
+    token = _active_timers.set(tuple(timer for timer in timers if timer is not None))
+    try:
+        yield
+    finally:
+        _active_timers.reset(token)
+
+
+def active_query_timers():
+    """The timers counting the current context's queries, to hand over to another thread"""
+    return _active_timers.get()
+
+
+class MetricsMiddleware:
+    """Record latency, size, status and DB usage for every routed request, sync or async"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+
+        timer = QueryTimer()
+        started = time.perf_counter()
+        with count_queries(timer):
+            response = self.get_response(request)
+        self.record(request, response, timer, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        if not settings.METRICS_ENABLED:
+            return await self.get_response(request)
+
+        timer = QueryTimer()
+        started = time.perf_counter()
+        with count_queries(timer):
+            response = await self.get_response(request)
+        self.record(request, response, timer, time.perf_counter() - started)
+        return response
+
+    @staticmethod
+    def record(request, response, timer, elapsed):
+        match = getattr(request, 'resolver_match', None)
+        view = match.url_name if match and match.url_name else 'unmatched'
+        labels = {'view': view}
+        registry.inc('api_requests_total', {'view': view, 'method': request.method,
+                                            'status': str(response.status_code)})
+        registry.observe('api_request_duration_seconds', labels, elapsed)
+        if not response.streaming:
+            registry.observe('api_response_size_bytes', labels, len(response.content))
+        registry.observe('api_db_queries_per_request', labels, timer.count)
+        registry.inc('api_db_queries_total', labels, timer.count)
+        registry.inc('api_db_query_seconds_total', labels, timer.seconds)
+        registry.flush()
+
+
+def _process_exited(pid):
+    if os.name == 'nt':  # os.kill(pid, 0) would send CTRL_C_EVENT; development servers run a single process
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        pass
+    return False
+
+
+def collect():
+    """Merge the snapshots written by every live worker process, deleting those of exited ones"""
+    registry.flush(force=True)
+    counters, histograms = {}, {}
+    try:
+        names = os.listdir(settings.METRICS_DIR)
+    except FileNotFoundError:
+        names = []
+    for filename in names:
+        if not filename.endswith('.json'):
+            continue
+        pid = filename[:-len('.json')]
+        if pid.isdigit() and _process_exited(int(pid)):
+            # A recycled worker's counters restart in its successor, as a counter reset
+            try:
+                os.remove(os.path.join(settings.METRICS_DIR, filename))
+            except OSError:
+                pass
+            continue
+        try:
+            with open(os.path.join(settings.METRICS_DIR, filename)) as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            continue
+        for name, labels, value in snapshot['counters']:
+            key = (name, tuple(tuple(pair) for pair in labels))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, buckets, total, count in snapshot['histograms']:
+            key = (name, tuple(tuple(pair) for pair in labels))
+            merged = histograms.setdefault(key, [[0] * len(buckets), 0.0, 0])
+            merged[0] = [a + b for a, b in zip(merged[0], buckets)]
+            merged[1] += total
+            merged[2] += count
+    return counters, histograms
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels, extra=None):
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+
+def render_prometheus():
+    """Render the merged metrics in the Prometheus text exposition format"""
+    counters, histograms = collect()
+    lines = []
+    for name, help_text in COUNTERS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} counter')
+        for (metric, labels), value in sorted(counters.items()):
+            if metric == name:
+                lines.append(f'{name}{_format_labels(labels)} {value}')
+    for name, (help_text, bounds) in HISTOGRAMS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} histogram')
+        for (metric, labels), (buckets, total, count) in sorted(histograms.items()):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, bucket in zip(bounds, buckets):
+                cumulative += bucket
+                lines.append(f'{name}_bucket{_format_labels(labels, ("le", bound))} {cumulative}')
+            lines.append(f'{name}_bucket{_format_labels(labels, ("le", "+Inf"))} {count}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {total}')
+            lines.append(f'{name}_count{_format_labels(labels)} {count}')
+    return '\n'.join(lines) + '\n'
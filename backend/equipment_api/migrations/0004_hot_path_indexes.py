@@ -0,0 +1,40 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment_api', '0003_report_job'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='equipment',
+            name='dataset',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='equipment', to='equipment_api.datasetupload'),
+        ),
+        migrations.AlterField(
+            model_name='reportjob',
+            name='dataset',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='report_jobs', to='equipment_api.datasetupload'),
+        ),
+        migrations.AddIndex(
+            model_name='datasetupload',
+            index=models.Index(fields=['upload_timestamp'], name='dataset_uploaded_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='equipment',
+            index=models.Index(fields=['dataset', 'created_at'], name='equipment_dataset_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='equipment',
+            index=models.Index(fields=['dataset', 'type'], name='equipment_dataset_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reportjob',
+            index=models.Index(fields=['dataset', 'created_at'], name='reportjob_dataset_created_idx'),
+        ),
+    ]
@@ -0,0 +1,121 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:41
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+
+
+BASE_TYPES = ['Reactor', 'Pump', 'Heat Exchanger', 'HeatExchanger', 'Compressor', 'Valve', 'Condenser']
+
+
+def encode_equipment(apps, schema_editor):
+    """Fill the lookup tables and point every equipment row at its type code and interned name"""
+    Equipment = apps.get_model('equipment_api', 'Equipment')
+    EquipmentType = apps.get_model('equipment_api', 'EquipmentType')
+    EquipmentName = apps.get_model('equipment_api', 'EquipmentName')
+
+    existing_types = Equipment.objects.order_by().values_list('type', flat=True).distinct()
+    types = BASE_TYPES + sorted(set(existing_types) - set(BASE_TYPES))
+    EquipmentType.objects.bulk_create([EquipmentType(name=name) for name in types])
+
+    names = Equipment.objects.order_by().values_list('equipment_name', flat=True).distinct()
+    EquipmentName.objects.bulk_create([EquipmentName(name=name) for name in names.iterator()], batch_size=5000)
+
+    Equipment.objects.update(
+        type_code=Subquery(EquipmentType.objects.filter(name=OuterRef('type')).values('id')[:1]),
+        name_ref=Subquery(EquipmentName.objects.filter(name=OuterRef('equipment_name')).values('id')[:1]),
+    )
+
+
+def decode_equipment(apps, schema_editor):
+    """Copy the type and name strings back onto the equipment rows"""
+    Equipment = apps.get_model('equipment_api', 'Equipment')
+    EquipmentType = apps.get_model('equipment_api', 'EquipmentType')
+    EquipmentName = apps.get_model('equipment_api', 'EquipmentName')
+
+    Equipment.objects.update(
+        type=Subquery(EquipmentType.objects.filter(id=OuterRef('type_code')).values('name')[:1]),
+        equipment_name=Subquery(EquipmentName.objects.filter(id=OuterRef('name_ref')).values('name')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment_api', '0004_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EquipmentName',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='EquipmentType',
+            fields=[
+                ('id', models.SmallAutoField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=100, unique=True)),
+            ],
+        ),
+        migrations.RemoveIndex(
+            model_name='equipment',
+            name='equipment_dataset_type_idx',
+        ),
+        # Nullable while both representations exist, so the migration can also be reversed
+        migrations.AlterField(
+            model_name='equipment',
+            name='equipment_name',
+            field=models.CharField(max_length=200, null=True),
+        ),
+        migrations.AlterField(
+            model_name='equipment',
+            name='type',
+            field=models.CharField(choices=[('Reactor', 'Reactor'), ('Pump', 'Pump'), ('Heat Exchanger', 'Heat Exchanger'), ('HeatExchanger', 'Heat Exchanger'), ('Compressor', 'Compressor'), ('Valve', 'Valve'), ('Condenser', 'Condenser')], max_length=100, null=True),
+        ),
+        migrations.AddField(
+            model_name='equipment',
+            name='name_ref',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, to='equipment_api.equipmentname'),
+        ),
+        migrations.AddField(
+            model_name='equipment',
+            name='type_code',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, to='equipment_api.equipmenttype'),
+        ),
+        migrations.RunPython(encode_equipment, decode_equipment),
+        migrations.RemoveField(
+            model_name='equipment',
+            name='equipment_name',
+        ),
+        migrations.RemoveField(
+            model_name='equipment',
+            name='type',
+        ),
+        migrations.RenameField(
+            model_name='equipment',
+            old_name='name_ref',
+            new_name='name',
+        ),
+        migrations.RenameField(
+            model_name='equipment',
+            old_name='type_code',
+            new_name='type',
+        ),
+        migrations.AlterField(
+            model_name='equipment',
+            name='name',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='equipment', to='equipment_api.equipmentname'),
+        ),
+        migrations.AlterField(
+            model_name='equipment',
+            name='type',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='equipment', to='equipment_api.equipmenttype'),
+        ),
+        migrations.AddIndex(
+            model_name='equipment',
+            index=models.Index(fields=['dataset', 'type'], name='equipment_dataset_type_idx'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 4.2.7 on 2026-10-19 01:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment_api', '0006_upload_session'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='equipment',
+            name='flowrate_type_deviation',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='equipment',
+            name='flowrate_zscore',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='equipment',
+            name='pressure_ratio',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='equipment',
+            name='pressure_type_deviation',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='equipment',
+            name='pressure_zscore',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='equipment',
+            name='temperature_ratio',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='equipment',
+            name='temperature_type_deviation',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='equipment',
+            name='temperature_zscore',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.7 on 2026-10-19 02:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment_api', '0007_equipment_derived_metrics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='equipment',
+            name='anomaly_reasons',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='equipment',
+            name='anomaly_score',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='equipment',
+            index=models.Index(condition=models.Q(('anomaly_score__isnull', False)), fields=['dataset', '-anomaly_score'], name='equipment_dataset_anomaly_idx'),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 4.2.7 on 2026-10-19 02:11
+
+from django.db import migrations, models
+from django.db.models import Avg, Count, Max, Min
+import django.db.models.deletion
+
+
+READING_COLUMNS = ['flowrate', 'pressure', 'temperature']
+
+
+def build_rollups(apps, schema_editor):
+    """Aggregate the equipment of every stored dataset into rollups, one dataset at a time"""
+    DatasetUpload = apps.get_model('equipment_api', 'DatasetUpload')
+    Equipment = apps.get_model('equipment_api', 'Equipment')
+    EquipmentRollup = apps.get_model('equipment_api', 'EquipmentRollup')
+
+    aggregates = {'row_count': Count('id')}
+    for column in READING_COLUMNS:
+        aggregates.update({
+            f'{column}_avg': Avg(column),
+            f'{column}_min': Min(column),
+            f'{column}_max': Max(column),
+        })
+    for dataset_id, uploaded_at in DatasetUpload.objects.order_by('id').values_list('id', 'upload_timestamp'):
+        groups = Equipment.objects.filter(dataset_id=dataset_id).order_by().values('name_id').annotate(**aggregates)
+        EquipmentRollup.objects.bulk_create([
+            EquipmentRollup(dataset_id=dataset_id, uploaded_at=uploaded_at, **group) for group in groups
+        ], batch_size=5000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment_api', '0009_alert_rules'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EquipmentRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('uploaded_at', models.DateTimeField()),
+                ('row_count', models.IntegerField()),
+                ('flowrate_avg', models.FloatField()),
+                ('flowrate_min', models.FloatField()),
+                ('flowrate_max', models.FloatField()),
+                ('pressure_avg', models.FloatField()),
+                ('pressure_min', models.FloatField()),
+                ('pressure_max', models.FloatField()),
+                ('temperature_avg', models.FloatField()),
+                ('temperature_min', models.FloatField()),
+                ('temperature_max', models.FloatField()),
+                ('dataset', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='equipment_api.datasetupload')),
+                ('name', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='rollups', to='equipment_api.equipmentname')),
+            ],
+            options={
+                'ordering': ['uploaded_at', 'id'],
+                'indexes': [models.Index(fields=['name', 'uploaded_at'], name='rollup_name_uploaded_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='equipmentrollup',
+            constraint=models.UniqueConstraint(fields=('dataset', 'name'), name='rollup_dataset_name_uniq'),
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7 on 2026-10-19 02:13
+
+from django.db import migrations
+
+
+# External-content FTS5 index over the interned tags (see equipment_api.search);
+# prefix indexes serve the one- and two-character fragments of tags like "B-2"
+CREATE_INDEX = """
+CREATE VIRTUAL TABLE equipment_api_equipmentname_fts USING fts5(
+    name, content='equipment_api_equipmentname', content_rowid='id', prefix='1 2'
+);
+CREATE TRIGGER equipment_api_equipmentname_fts_insert AFTER INSERT ON equipment_api_equipmentname BEGIN
+    INSERT INTO equipment_api_equipmentname_fts(rowid, name) VALUES (new.id, new.name);
+END;
+CREATE TRIGGER equipment_api_equipmentname_fts_delete AFTER DELETE ON equipment_api_equipmentname BEGIN
+    INSERT INTO equipment_api_equipmentname_fts(equipment_api_equipmentname_fts, rowid, name)
+    VALUES ('delete', old.id, old.name);
+END;
+CREATE TRIGGER equipment_api_equipmentname_fts_update AFTER UPDATE ON equipment_api_equipmentname BEGIN
+    INSERT INTO equipment_api_equipmentname_fts(equipment_api_equipmentname_fts, rowid, name)
+    VALUES ('delete', old.id, old.name);
+    INSERT INTO equipment_api_equipmentname_fts(rowid, name) VALUES (new.id, new.name);
+END;
+INSERT INTO equipment_api_equipmentname_fts(equipment_api_equipmentname_fts) VALUES ('rebuild');
+"""
+
+DROP_INDEX = """
+DROP TRIGGER equipment_api_equipmentname_fts_update;
+DROP TRIGGER equipment_api_equipmentname_fts_delete;
+DROP TRIGGER equipment_api_equipmentname_fts_insert;
+DROP TABLE equipment_api_equipmentname_fts;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment_api', '0010_equipment_rollups'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_INDEX, DROP_INDEX),
+    ]
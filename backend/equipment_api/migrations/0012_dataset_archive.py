@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-19 02:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment_api', '0011_equipment_name_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='datasetupload',
+            name='accessed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='datasetupload',
+            name='archive_file',
+            field=models.CharField(blank=True, max_length=500),
+        ),
+        migrations.AddField(
+            model_name='datasetupload',
+            name='storage',
+            field=models.CharField(choices=[('hot', 'Hot'), ('archived', 'Archived'), ('rehydrated', 'Rehydrated')], default='hot', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='datasetupload',
+            index=models.Index(fields=['storage', 'upload_timestamp'], name='dataset_storage_uploaded_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='datasetupload',
+            index=models.Index(fields=['storage', 'accessed_at'], name='dataset_storage_accessed_idx'),
+        ),
+    ]
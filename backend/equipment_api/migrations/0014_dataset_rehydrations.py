@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 02:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment_api', '0013_events'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='datasetupload',
+            name='rehydrations',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -1,8 +1,26 @@
-from django.db import models
+import itertools
+import math
+import threading
+import uuid
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connections, models, transaction
 from django.utils import timezone
 
 
 class DatasetUpload(models.Model):
+    STORAGE_HOT = 'hot'
+    STORAGE_ARCHIVED = 'archived'
+    STORAGE_REHYDRATED = 'rehydrated'
+    STORAGE_CHOICES = [
+        (STORAGE_HOT, 'Hot'),
+        (STORAGE_ARCHIVED, 'Archived'),
+        (STORAGE_REHYDRATED, 'Rehydrated'),
+    ]
+
     filename = models.CharField(max_length=255)
     upload_timestamp = models.DateTimeField(auto_now_add=True)
     total_count = models.IntegerField()
@@ -10,35 +28,437 @@ class DatasetUpload(models.Model):
     avg_pressure = models.FloatField()
     avg_temperature = models.FloatField()
     type_distribution = models.JSONField(default=dict)
+    # Where the equipment rows live (see archive.py); archived datasets keep only this row
+    storage = models.CharField(max_length=20, choices=STORAGE_CHOICES, default=STORAGE_HOT)
+    archive_file = models.CharField(max_length=500, blank=True)
+    # Last read of a rehydrated dataset; the least recently read leave the cache first
+    accessed_at = models.DateTimeField(null=True, blank=True)
+    # Times the rows were rehydrated; unchanged across a read, they stayed in place (see archive.read_hot)
+    rehydrations = models.PositiveIntegerField(default=0, editable=False)
 
     class Meta:
         ordering = ['-upload_timestamp']
+        indexes = [
+            # "Latest dataset", history and retention all walk uploads newest first
+            models.Index(fields=['upload_timestamp'], name='dataset_uploaded_idx'),
+            # Retention walks the hot uploads only, however many are archived
+            models.Index(fields=['storage', 'upload_timestamp'], name='dataset_storage_uploaded_idx'),
+            # Rehydrated datasets by last read, for the cache bound
+            models.Index(fields=['storage', 'accessed_at'], name='dataset_storage_accessed_idx'),
+        ]
 
     def __str__(self):
         return f"{self.filename} ({self.upload_timestamp.strftime('%Y-%m-%d %H:%M')})"
 
 
-class Equipment(models.Model):
-    EQUIPMENT_TYPES = [
-        ('Reactor', 'Reactor'),
-        ('Pump', 'Pump'),
-        ('Heat Exchanger', 'Heat Exchanger'),
-        ('HeatExchanger', 'Heat Exchanger'),
-        ('Compressor', 'Compressor'),
-        ('Valve', 'Valve'),
-        ('Condenser', 'Condenser'),
-    ]
+# Per process: (model label, database name) -> LookupCache
+_lookup_cache = {}
+
+
+class LookupCache:
+    """Rows of one lookup table in both directions, evicting the least recently used beyond ``LOOKUP_CACHE_SIZE``"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.names = OrderedDict()
+        self.ids = {}
+
+    def get_names(self, pks):
+        """(name by id, missing ids) for ``pks``; the ids found become the most recently used"""
+        found = {}
+        with self.lock:
+            for pk in pks:
+                if pk in self.names:
+                    self.names.move_to_end(pk)
+                    found[pk] = self.names[pk]
+        return found, [pk for pk in pks if pk not in found]
+
+    def get_ids(self, names):
+        """(id by name, missing names) for ``names``; the rows found become the most recently used"""
+        found = {}
+        with self.lock:
+            for name in names:
+                pk = self.ids.get(name)
+                if pk is not None:
+                    self.names.move_to_end(pk)
+                    found[name] = pk
+        return found, [name for name in names if name not in found]
+
+    def add(self, rows):
+        """Remember (id, name) rows"""
+        with self.lock:
+            for pk, name in rows:
+                self.names[pk] = name
+                self.names.move_to_end(pk)
+                self.ids[name] = pk
+            while len(self.names) > settings.LOOKUP_CACHE_SIZE:
+                _, name = self.names.popitem(last=False)
+                del self.ids[name]
+
+
+class LookupManager(models.Manager):
+    """Manager for lookup tables whose rows never change once created.
+
+    Each process caches the rows it has used per database in both
+    directions, so equipment rows are decoded without joins and uploads
+    resolve known names without queries. Misses are fetched by key, which
+    also picks up rows that other processes created since; decode many rows
+    at once with ``names_for`` (see ``prime_lookups``) rather than one query
+    per row.
+    """
+
+    # Stay well below SQLite's limit on bound parameters per statement
+    LOOKUP_CHUNK = 900
+
+    def _cache(self):
+        key = (self.model._meta.label, connections[self.db].settings_dict['NAME'])
+        cache = _lookup_cache.get(key)
+        if cache is None:
+            cache = _lookup_cache.setdefault(key, LookupCache())
+        return cache
+
+    def _fetch(self, field, values):
+        """(id, name) of the rows whose ``field`` is in ``values``"""
+        rows = []
+        for start in range(0, len(values), self.LOOKUP_CHUNK):
+            rows.extend(self.filter(**{f'{field}__in': values[start:start + self.LOOKUP_CHUNK]}).values_list('id', 'name'))
+        return rows
+
+    def names_for(self, pks):
+        """Map ids to names, fetching the ones not cached in one query; unknown ids are left out"""
+        cache = self._cache()
+        names, missing = cache.get_names(list(set(pks)))
+        if missing:
+            rows = self._fetch('id', missing)
+            cache.add(rows)
+            names.update(rows)
+        return names
+
+    def name_for(self, pk):
+        """Name of a row, without touching the database once cached; ``KeyError`` for an unknown id"""
+        return self.names_for([pk])[pk]
+
+    def id_for(self, name):
+        """Id of a name, or None if no row has it; never inserts"""
+        return self._ids([name]).get(name)
+
+    def _ids(self, names):
+        cache = self._cache()
+        ids, missing = cache.get_ids(list(names))
+        if missing:
+            rows = self._fetch('name', missing)
+            cache.add(rows)
+            ids.update((name, pk) for pk, name in rows)
+        return ids
+
+    def ids_for(self, names):
+        """Map names to ids, inserting rows for names not seen before"""
+        names = set(names)
+        result = self._ids(names)
+        missing = names - result.keys()
+        if not missing:
+            return result
+
+        # Dataset writes are serialized (see ingest.py), so no other writer inserts concurrently
+        created = self.bulk_create([self.model(name=name) for name in missing])
+        result.update((obj.name, obj.id) for obj in created if obj.id is not None)
+        # Backends that cannot return ids from bulk inserts need one more lookup
+        pending = list(names - result.keys())
+        result.update((name, pk) for pk, name in self._fetch('name', pending))
+
+        # Only cache rows once they are known to exist
+        cache = self._cache()
+        transaction.on_commit(lambda: cache.add((result[name], name) for name in missing), using=self.db)
+        return result
+
 
-    equipment_name = models.CharField(max_length=200)
-    type = models.CharField(max_length=100, choices=EQUIPMENT_TYPES)
+class EquipmentType(models.Model):
+    """Equipment base types, referenced by a small-integer code"""
+    id = models.SmallAutoField(primary_key=True)
+    name = models.CharField(max_length=100, unique=True)
+
+    objects = LookupManager()
+
+    def __str__(self):
+        return self.name
+
+
+class EquipmentName(models.Model):
+    """Interned equipment tags; the same tags repeat in every upload"""
+    name = models.CharField(max_length=200, unique=True)
+
+    objects = LookupManager()
+
+    def __str__(self):
+        return self.name
+
+
+class Equipment(models.Model):
+    # Decoded through the lookup caches: see equipment_name and type_name
+    name = models.ForeignKey(EquipmentName, on_delete=models.PROTECT, related_name='equipment', db_index=False)
+    type = models.ForeignKey(EquipmentType, on_delete=models.PROTECT, related_name='equipment', db_index=False)
     flowrate = models.FloatField()
     pressure = models.FloatField()
     temperature = models.FloatField()
-    dataset = models.ForeignKey(DatasetUpload, on_delete=models.CASCADE, related_name='equipment')
+    # Indexed through the composite indexes below, which lead with the dataset
+    dataset = models.ForeignKey(DatasetUpload, on_delete=models.CASCADE, related_name='equipment', db_index=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Derived metrics computed at ingest (see derived.DERIVED_METRICS); NULL where undefined
+    flowrate_zscore = models.FloatField(null=True, blank=True)
+    pressure_zscore = models.FloatField(null=True, blank=True)
+    temperature_zscore = models.FloatField(null=True, blank=True)
+    pressure_ratio = models.FloatField(null=True, blank=True)
+    temperature_ratio = models.FloatField(null=True, blank=True)
+    flowrate_type_deviation = models.FloatField(null=True, blank=True)
+    pressure_type_deviation = models.FloatField(null=True, blank=True)
+    temperature_type_deviation = models.FloatField(null=True, blank=True)
+    # Set on rows flagged at ingest (see anomalies.py): highest rating, and the failed <column>:<test> pairs
+    anomaly_score = models.FloatField(null=True, blank=True)
+    anomaly_reasons = models.CharField(max_length=255, blank=True, default='')
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # Per-dataset fetches in the default order, without a sort
+            models.Index(fields=['dataset', 'created_at'], name='equipment_dataset_created_idx'),
+            # Per-dataset type breakdowns and filters
+            models.Index(fields=['dataset', 'type'], name='equipment_dataset_type_idx'),
+            # Flagged rows of a dataset, worst first; unflagged rows are not indexed
+            models.Index(fields=['dataset', '-anomaly_score'], name='equipment_dataset_anomaly_idx',
+                         condition=models.Q(anomaly_score__isnull=False)),
+        ]
+
+    # (name, type name) set by prime_lookups; decoded through the lookup caches while None
+    decoded = None
+
+    @property
+    def equipment_name(self):
+        if self.decoded is not None:
+            return self.decoded[0]
+        return EquipmentName.objects.name_for(self.name_id)
+
+    @property
+    def type_name(self):
+        if self.decoded is not None:
+            return self.decoded[1]
+        return EquipmentType.objects.name_for(self.type_id)
+
+    def __str__(self):
+        return f"{self.equipment_name} - {self.type_name}"
+
+
+def prime_lookups(equipment):
+    """Decode the names and types of equipment rows with one query per table at most.
+
+    Each row keeps its own names, so decoding it later never queries, however
+    small ``LOOKUP_CACHE_SIZE`` is or whatever other threads evict meanwhile.
+    """
+    equipment = [eq for eq in equipment if eq.decoded is None]
+    if not equipment:
+        return
+    names = EquipmentName.objects.names_for({eq.name_id for eq in equipment})
+    types = EquipmentType.objects.names_for({eq.type_id for eq in equipment})
+    for eq in equipment:
+        eq.decoded = (names[eq.name_id], types[eq.type_id])
+
+
+async def aprime_lookups(equipment):
+    """``prime_lookups`` for async code, which cannot query lazily while it serializes rows"""
+    await sync_to_async(prime_lookups)(equipment)
+
+
+def primed(equipment, chunk_size=LookupManager.LOOKUP_CHUNK):
+    """Iterate equipment rows, priming the lookups of each chunk before it is decoded"""
+    rows = iter(equipment)
+    for chunk in iter(lambda: list(itertools.islice(rows, chunk_size)), []):
+        prime_lookups(chunk)
+        yield from chunk
+
+
+class ReportJob(models.Model):
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+    ACTIVE_STATUSES = [STATUS_QUEUED, STATUS_RUNNING]
+
+    dataset = models.ForeignKey(DatasetUpload, on_delete=models.CASCADE, related_name='report_jobs', db_index=False)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    rows_total = models.IntegerField(default=0)
+    rows_processed = models.IntegerField(default=0)
+    pages_rendered = models.IntegerField(default=0)
+    file_path = models.CharField(max_length=500, blank=True)
+    error = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['dataset', 'created_at'], name='reportjob_dataset_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Report #{self.id} for dataset {self.dataset_id} ({self.status})"
+
+
+class UploadSession(models.Model):
+    """A resumable upload whose chunks wait on disk until it is finalized"""
+    STATUS_OPEN = 'open'
+    STATUS_FINALIZING = 'finalizing'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_OPEN, 'Open'),
+        (STATUS_FINALIZING, 'Finalizing'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='upload_sessions')
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    chunk_size = models.IntegerField()
+    sha256 = models.CharField(max_length=64, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_OPEN)
+    # Not a foreign key: retention evicts datasets without touching sessions
+    dataset_id = models.BigIntegerField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # Expiry of abandoned sessions
+            models.Index(fields=['updated_at'], name='uploadsession_updated_idx'),
+        ]
+
+    @property
+    def chunk_count(self):
+        return math.ceil(self.size / self.chunk_size)
+
+    def chunk_length(self, index):
+        """Size in bytes of chunk ``index``; only the last one may be shorter"""
+        return min(self.chunk_size, self.size - index * self.chunk_size)
+
+    def __str__(self):
+        return f"Upload session {self.id} for {self.filename} ({self.status})"
+
+
+class AlertRule(models.Model):
+    """A site operating limit on one parameter, for one equipment type or all of them (see alerts.py)"""
+    PARAMETER_CHOICES = [
+        ('flowrate', 'Flowrate'),
+        ('pressure', 'Pressure'),
+        ('temperature', 'Temperature'),
+    ]
+    SEVERITY_WARNING = 'warning'
+    SEVERITY_CRITICAL = 'critical'
+    SEVERITY_CHOICES = [
+        (SEVERITY_WARNING, 'Warning'),
+        (SEVERITY_CRITICAL, 'Critical'),
+    ]
+
+    name = models.CharField(max_length=200)
+    # A base type as stored for equipment (e.g. 'Pump'); blank applies to every type
+    equipment_type = models.CharField(max_length=100, blank=True)
+    parameter = models.CharField(max_length=20, choices=PARAMETER_CHOICES)
+    min_value = models.FloatField(null=True, blank=True)
+    max_value = models.FloatField(null=True, blank=True)
+    severity = models.CharField(max_length=20, choices=SEVERITY_CHOICES, default=SEVERITY_WARNING)
+    enabled = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return f"{self.name} ({self.equipment_type or 'all types'} {self.parameter})"
+
+
+class Alert(models.Model):
+    """A reading of an uploaded row outside the limit of an ``AlertRule``, found at ingest"""
+    BOUND_MIN = 'min'
+    BOUND_MAX = 'max'
+    BOUND_CHOICES = [
+        (BOUND_MIN, 'Below minimum'),
+        (BOUND_MAX, 'Above maximum'),
+    ]
+
+    dataset = models.ForeignKey(DatasetUpload, on_delete=models.CASCADE, related_name='alerts', db_index=False)
+    # No constraint or cascade: retention deletes a dataset's equipment in one statement
+    # without collecting it, and its alerts go with the dataset
+    equipment = models.ForeignKey(Equipment, on_delete=models.DO_NOTHING, db_constraint=False,
+                                  related_name='alerts', db_index=False)
+    rule = models.ForeignKey(AlertRule, on_delete=models.CASCADE, related_name='alerts')
+    value = models.FloatField()
+    # The rule's bound when the dataset was evaluated; rules may change later
+    limit = models.FloatField()
+    bound = models.CharField(max_length=3, choices=BOUND_CHOICES)
+
+    class Meta:
+        ordering = ['equipment_id', 'id']
+        indexes = [
+            # A dataset's alerts in row order, in one index walk
+            models.Index(fields=['dataset', 'equipment'], name='alert_dataset_equipment_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.rule.name}: {self.value} ({self.get_bound_display().lower()} {self.limit})"
+
+
+class EquipmentRollup(models.Model):
+    """Readings of one piece of equipment in one dataset, aggregated at ingest (see trends.py)"""
+    # The interned tag is the equipment's identity across uploads
+    name = models.ForeignKey(EquipmentName, on_delete=models.PROTECT, related_name='rollups', db_index=False)
+    # Indexed through the unique constraint below, which leads with the dataset
+    dataset = models.ForeignKey(DatasetUpload, on_delete=models.CASCADE, related_name='rollups', db_index=False)
+    # The dataset's upload time, copied so a trend is read without a join
+    uploaded_at = models.DateTimeField()
+    row_count = models.IntegerField()
+    flowrate_avg = models.FloatField()
+    flowrate_min = models.FloatField()
+    flowrate_max = models.FloatField()
+    pressure_avg = models.FloatField()
+    pressure_min = models.FloatField()
+    pressure_max = models.FloatField()
+    temperature_avg = models.FloatField()
+    temperature_min = models.FloatField()
+    temperature_max = models.FloatField()
+
+    class Meta:
+        ordering = ['uploaded_at', 'id']
+        constraints = [
+            models.UniqueConstraint(fields=['dataset', 'name'], name='rollup_dataset_name_uniq'),
+        ]
+        indexes = [
+            # One equipment's history oldest first, in one index walk
+            models.Index(fields=['name', 'uploaded_at'], name='rollup_name_uploaded_idx'),
+        ]
+
+    def __str__(self):
+        return f"{EquipmentName.objects.name_for(self.name_id)} in dataset {self.dataset_id}"
+
+
+class Event(models.Model):
+    """A change pushed to clients over the server-sent events stream (see events.py)"""
+    kind = models.CharField(max_length=40)
+    data = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        # The id is the stream position a client resumes from
+        ordering = ['id']
 
     def __str__(self):
-        return f"{self.equipment_name} - {self.type}"
+        return f"{self.kind} #{self.id}"
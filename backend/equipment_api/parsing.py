@@ -0,0 +1,381 @@
+"""
+CSV upload parsing and validation.
+
+Two engines turn a decoded upload into a ``PreparedDataset`` with the same
+column, type and range validation, base type extraction and summary values:
+
+* ``pandas``: ``read_csv`` of the required columns only, with declared
+  dtypes (``READ_CSV_DTYPES``) instead of type inference, on pyarrow when
+  it is installed and the C parser otherwise; reads anything pandas can.
+* ``csv``: the stdlib ``csv`` module into plain lists, with NumPy only for
+  the means. It skips the pandas import and the DataFrame overhead that
+  dominate small uploads. Input that pandas would read differently from
+  plain text and numbers (missing values, ragged rows, numbers with more
+  than 15 digits or an exponent, ...) is handed to the pandas engine, so
+  both always produce the same result.
+
+``parse_upload`` uses the csv engine for uploads of up to
+``CSV_FAST_PATH_MAX_ROWS`` lines and pandas above that; ``CSV_ENGINE`` forces
+one. ``parse_upload_stream`` does the same for uploads read from a stream
+(compressed ones), handing large ones to ``read_csv`` without first reading
+them whole. ``manage.py check_csv_engines`` checks that the engines agree.
+"""
+
+import csv
+import functools
+import importlib.util
+import io
+import re
+from collections import Counter
+
+from django.conf import settings
+
+from .ingest import PreparedDataset
+from .metrics import registry, stage
+
+REQUIRED_COLUMNS = ['Equipment Name', 'Type', 'Flowrate', 'Pressure', 'Temperature']
+VALID_TYPES = ['Reactor', 'Pump', 'Heat Exchanger', 'HeatExchanger', 'Compressor', 'Valve', 'Condenser']
+
+# (column, lowest, highest, error message), checked in this order
+VALUE_RANGES = [
+    ('Flowrate', 10.5, 500.0, 'Flowrate values must be between 10.5 and 500.0 L/min'),
+    ('Pressure', 1.0, 150.0, 'Pressure values must be between 1.0 and 150.0 bar'),
+    ('Temperature', 20.0, 350.0, 'Temperature values must be between 20.0 and 350.0 °C'),
+]
+
+# Declared so read_csv skips type inference: names as str, each distinct Type
+# stored once as a category, and the readings as float64. float32 would halve
+# the numeric columns but change stored values (45.2 reads as 45.20000076).
+READ_CSV_DTYPES = {
+    'Equipment Name': str,
+    'Type': 'category',
+    'Flowrate': 'float64',
+    'Pressure': 'float64',
+    'Temperature': 'float64',
+}
+
+ENGINES = ('auto', 'csv', 'pandas')
+
+# Text read_csv turns into NaN (pandas' default na_values)
+PANDAS_NA_VALUES = frozenset([
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null',
+])
+
+# A column of plain decimals, one per line. With at most 15 characters (so at
+# most 15 digits) pandas' float parser and float() agree to the last bit.
+_PLAIN_NUMBERS = re.compile(r'(?:[+-]?(?:\d+\.?\d*|\.\d+)\n)*[+-]?(?:\d+\.?\d*|\.\d+)')
+MAX_PLAIN_NUMBER_LENGTH = 15
+STREAM_BLOCK_SIZE = 64 * 1024
+
+
+class UploadRejected(ValueError):
+    """The upload failed validation; the message is returned to the client as-is"""
+
+
+class UnsupportedByCsvEngine(Exception):
+    """The csv engine cannot guarantee pandas' reading of this upload"""
+
+
+def extract_base_type(equipment_type):
+    """Extract base equipment type by removing common suffixes"""
+    for valid_type in VALID_TYPES:
+        if equipment_type.startswith(valid_type):
+            return valid_type
+        # Also check for no-space version
+        if valid_type == 'Heat Exchanger' and equipment_type.startswith('HeatExchanger'):
+            return 'HeatExchanger'
+    return equipment_type
+
+
+def _invalid_types_error(invalid_types):
+    return (f'Invalid equipment types: {", ".join(invalid_types)}. '
+            f'Valid base types: {", ".join(VALID_TYPES)}')
+
+
+def _read_header(data):
+    """Column names as read_csv sees them: the first non-blank record, without a byte order mark"""
+    lines = io.TextIOWrapper(io.BytesIO(data), encoding='utf-8', newline='')
+    header = next((row for row in csv.reader(lines) if row), [])
+    if header:
+        header[0] = header[0].removeprefix('\ufeff')
+    return header
+
+
+@functools.lru_cache(maxsize=None)
+def _pyarrow_installed():
+    return importlib.util.find_spec('pyarrow') is not None
+
+
+def pandas_csv_engine():
+    """``read_csv`` engine: pyarrow (multi-threaded) when installed, else the C parser"""
+    if settings.CSV_PANDAS_ENGINE != 'auto':
+        return settings.CSV_PANDAS_ENGINE
+    return 'pyarrow' if _pyarrow_installed() else 'c'
+
+
+def _read_pyarrow(stream):
+    """pyarrow's CSV reader with the column types and missing values of ``READ_CSV_DTYPES``.
+
+    Called directly rather than through ``read_csv(engine='pyarrow')``, which
+    infers types first and only casts afterwards (so a name like ``007``
+    would come back as ``7``).
+    """
+    from pyarrow import csv as pa_csv
+
+    table = pa_csv.read_csv(
+        stream,
+        parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=REQUIRED_COLUMNS,
+            column_types=arrow_column_types(),
+            null_values=sorted(PANDAS_NA_VALUES),
+            strings_can_be_null=True,
+        ),
+    )
+    return arrow_to_frame(table)
+
+
+def arrow_column_types():
+    """Arrow types of the required columns, matching ``READ_CSV_DTYPES``"""
+    import pyarrow as pa
+
+    return {
+        'Equipment Name': pa.string(),
+        'Type': pa.dictionary(pa.int32(), pa.string()),
+        'Flowrate': pa.float64(),
+        'Pressure': pa.float64(),
+        'Temperature': pa.float64(),
+    }
+
+
+def arrow_to_frame(table):
+    """DataFrame of an Arrow table of ``arrow_column_types()``, as the C parser would have read it"""
+    has_missing_names = table.column('Equipment Name').null_count > 0
+    # Releases each Arrow column once converted, instead of holding both copies
+    df = table.to_pandas(split_blocks=True, self_destruct=True)
+    del table
+    if has_missing_names:  # None, where the C parser gives NaN
+        names = df['Equipment Name']
+        df['Equipment Name'] = names.where(names.notna(), float('nan'))
+    return df
+
+
+def read_typed(data, engine):
+    """DataFrame of the required columns of a UTF-8 upload, read with their dtypes declared up front.
+
+    ``data`` is the upload's bytes, or a callable returning a new binary
+    stream of them (read from the start again if pyarrow gives up).
+    """
+    import pandas as pd
+
+    source = data if callable(data) else lambda: io.BytesIO(data)
+    if engine == 'pyarrow':
+        try:
+            return _read_pyarrow(source())
+        except UploadRejected:
+            raise
+        except Exception:
+            # Input pyarrow rejects, e.g. ragged rows or padded numbers: the C parser reads it or reports the error
+            pass
+    return pd.read_csv(source(), engine='c', usecols=REQUIRED_COLUMNS, dtype=READ_CSV_DTYPES)
+
+
+def parse_with_pandas(filename, content, engine=None):
+    """Parse and validate an upload with ``pandas.read_csv``"""
+    return _parse_pandas(filename, content, engine)
+
+
+def _parse_pandas(filename, content, engine=None, open_stream=None, head=b''):
+    """``parse_with_pandas`` of ``content``, or of the binary stream ``open_stream()`` whose first bytes are ``head``"""
+    with stage('parse'):
+        if open_stream is None:
+            # Bytes: a StringIO would hold the text as four bytes per character
+            data = head = content.encode('utf-8')
+        else:
+            data = open_stream
+        missing_columns = [col for col in REQUIRED_COLUMNS if col not in _read_header(head)]
+        if missing_columns:
+            raise UploadRejected(f'Missing required columns: {", ".join(missing_columns)}')
+        df = read_typed(data, engine or pandas_csv_engine())
+        del data, head
+
+    return prepare_frame(filename, df)
+
+
+def prepare_frame(filename, df):
+    """Validate a DataFrame of the required columns as ``read_typed`` returns it and prepare its dataset"""
+    import numpy as np
+    import pandas as pd
+
+    with stage('validate'):
+        types = df['Type'].array
+        # Base types per distinct Type, spread over the rows by category code
+        base_types = pd.Categorical(types.categories.map(extract_base_type)).take(types.codes, allow_fill=True)
+        invalid_types = types[~base_types.isin(VALID_TYPES)].unique()
+        if len(invalid_types) > 0:
+            raise UploadRejected(_invalid_types_error(invalid_types))
+
+        for column, low, high, message in VALUE_RANGES:
+            if df[column].min() < low or df[column].max() > high:
+                raise UploadRejected(message)
+
+    codes = types.codes[types.codes >= 0]
+    first_seen = pd.unique(codes)
+    return PreparedDataset(
+        filename=filename,
+        total_count=len(df),
+        avg_flowrate=float(df['Flowrate'].mean()),
+        avg_pressure=float(df['Pressure'].mean()),
+        avg_temperature=float(df['Temperature'].mean()),
+        type_distribution=_pandas_value_counts(
+            types.categories[first_seen].tolist(), np.bincount(codes)[first_seen]
+        ),
+        rows=list(zip(df['Equipment Name'].tolist(), base_types.tolist(), df['Flowrate'].tolist(),
+                      df['Pressure'].tolist(), df['Temperature'].tolist())),
+    )
+
+
+def _text_column(values):
+    """Check a required text column has no value read_csv turns into a missing value"""
+    if not PANDAS_NA_VALUES.isdisjoint(values):
+        raise UnsupportedByCsvEngine('text')
+    return values
+
+
+def _number_column(values):
+    """Convert a required numeric column to the floats read_csv would produce"""
+    joined = '\n'.join(values)
+    if (joined.count('\n') != len(values) - 1 or not _PLAIN_NUMBERS.fullmatch(joined)
+            or max(map(len, values)) > MAX_PLAIN_NUMBER_LENGTH):
+        raise UnsupportedByCsvEngine('number')
+    return list(map(float, values))
+
+
+def _pandas_mean(numbers):
+    """``Series.mean()`` of the float64 column pandas would build, to the last bit"""
+    import numpy as np
+
+    return float(np.array(numbers, dtype=np.float64).sum() / np.float64(len(numbers)))
+
+
+def _pandas_value_counts(keys, totals):
+    """``Series.value_counts().to_dict()`` order for keys listed in first-occurrence order"""
+    import numpy as np
+
+    totals = np.asarray(totals)
+    positions = np.arange(len(keys))[::-1]
+    order = positions[totals[::-1].argsort(kind='quicksort')][::-1]
+    return {keys[i]: int(totals[i]) for i in order}
+
+
+def parse_with_csv(filename, content):
+    """Parse and validate an upload with the stdlib ``csv`` module.
+
+    Raises ``UnsupportedByCsvEngine`` for input whose pandas reading it does
+    not reproduce; ``parse_upload`` then retries with pandas.
+    """
+    with stage('parse'):
+        reader = csv.reader(io.StringIO(content, newline=''))
+        try:
+            header = next(reader, None)
+            rows = [row for row in reader if row]  # pandas skips blank lines
+        except csv.Error as e:  # e.g. a field over csv.field_size_limit()
+            raise UnsupportedByCsvEngine(str(e))
+        if not header or header[0].startswith('\ufeff') or len(set(header)) != len(header):
+            raise UnsupportedByCsvEngine('header')
+        width = len(header)
+        if not rows or any(len(row) != width for row in rows):
+            raise UnsupportedByCsvEngine('shape')
+
+        missing_columns = [col for col in REQUIRED_COLUMNS if col not in header]
+        if not missing_columns:
+            by_name = dict(zip(header, zip(*rows)))
+            names = _text_column(by_name['Equipment Name'])
+            types = _text_column(by_name['Type'])
+            columns = {column: _number_column(by_name[column]) for column, _, _, _ in VALUE_RANGES}
+
+    with stage('validate'):
+        if missing_columns:
+            raise UploadRejected(f'Missing required columns: {", ".join(missing_columns)}')
+
+        type_counts = Counter(types)  # first-occurrence order, like pandas' unique()
+        base_type_of = {value: extract_base_type(value) for value in type_counts}
+        invalid_types = [value for value, base_type in base_type_of.items() if base_type not in VALID_TYPES]
+        if invalid_types:
+            raise UploadRejected(_invalid_types_error(invalid_types))
+
+        for column, low, high, message in VALUE_RANGES:
+            numbers = columns[column]
+            if min(numbers) < low or max(numbers) > high:
+                raise UploadRejected(message)
+
+    return PreparedDataset(
+        filename=filename,
+        total_count=len(rows),
+        avg_flowrate=_pandas_mean(columns['Flowrate']),
+        avg_pressure=_pandas_mean(columns['Pressure']),
+        avg_temperature=_pandas_mean(columns['Temperature']),
+        type_distribution=_pandas_value_counts(list(type_counts), list(type_counts.values())),
+        rows=list(zip(names, map(base_type_of.__getitem__, types), columns['Flowrate'],
+                      columns['Pressure'], columns['Temperature'])),
+    )
+
+
+def choose_engine(content):
+    """Engine ``parse_upload`` starts with for this upload"""
+    if settings.CSV_ENGINE != 'auto':
+        return settings.CSV_ENGINE
+    return 'csv' if content.count('\n') <= settings.CSV_FAST_PATH_MAX_ROWS else 'pandas'
+
+
+def parse_upload(filename, content):
+    """Parse and validate a decoded CSV upload into a ``PreparedDataset``.
+
+    Raises ``UploadRejected`` when validation fails; anything else raised
+    means the CSV could not be parsed at all.
+    """
+    engine = choose_engine(content)
+    try:
+        if engine == 'csv':
+            try:
+                return parse_with_csv(filename, content)
+            except UnsupportedByCsvEngine:
+                engine = 'pandas_fallback'
+        return parse_with_pandas(filename, content)
+    finally:
+        if settings.METRICS_ENABLED:
+            registry.inc('upload_csv_engine_total', {'engine': engine})
+
+
+def parse_upload_stream(filename, open_stream):
+    """``parse_upload`` of an upload read from a binary stream, e.g. a decompressing one.
+
+    ``open_stream()`` returns a new stream of the upload from its start.
+    Uploads of up to ``CSV_FAST_PATH_MAX_ROWS`` lines are read whole and go
+    through ``parse_upload``; larger ones are streamed into ``read_csv``, so
+    their text is never held in memory in one piece.
+    """
+    max_lines = {'csv': None, 'pandas': 0}.get(settings.CSV_ENGINE, settings.CSV_FAST_PATH_MAX_ROWS)
+    with stage('decode'):
+        stream = open_stream()
+        blocks = []
+        lines = 0
+        while block := stream.read(STREAM_BLOCK_SIZE):
+            blocks.append(block)
+            lines += block.count(b'\n')
+            if max_lines is not None and lines > max_lines:
+                break
+        stream.close()
+        head = b''.join(blocks)
+        del blocks
+        if not block:
+            content = head.decode('utf-8')
+
+    if not block:
+        return parse_upload(filename, content)
+    try:
+        return _parse_pandas(filename, None, open_stream=open_stream, head=head)
+    finally:
+        if settings.METRICS_ENABLED:
+            registry.inc('upload_csv_engine_total', {'engine': 'pandas'})
@@ -0,0 +1,37 @@
+"""
+Heavy dependencies of the upload and report paths.
+
+The views and the report renderer import these on first use, so a worker
+that only serves logins, history or summaries never loads them. With
+``GUNICORN_PRELOAD=True`` (see ``gunicorn.conf.py``) the master imports them
+once before forking instead, and every worker shares those pages
+copy-on-write rather than importing its own copy on its first upload or
+report.
+"""
+
+import gc
+import importlib
+
+HEAVY_MODULES = (
+    'pandas',
+    'reportlab.lib.colors',
+    'reportlab.lib.pagesizes',
+    'reportlab.lib.styles',
+    'reportlab.platypus',
+)
+
+
+def import_heavy_modules():
+    """Import every module in ``HEAVY_MODULES``"""
+    for name in HEAVY_MODULES:
+        importlib.import_module(name)
+
+
+def freeze_heap():
+    """Move every live object to the permanent GC generation before forking.
+
+    Collections in the workers then skip the objects inherited from the
+    master, instead of writing to their headers and un-sharing the pages.
+    """
+    gc.collect()
+    gc.freeze()
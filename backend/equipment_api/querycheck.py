@@ -0,0 +1,114 @@
+"""
+Query-count and query-plan guards for the API endpoints.
+
+An ``EndpointCheck`` sends one request through the Django test client,
+captures every SQL statement it runs and compares the number of statements
+with a pinned expectation. Expectations may be computed from the request context (the
+dataset size, the upload about to be sent), so an N+1 shows up as a count that grows with the data rather than as a slightly
+slower request. Each captured statement is also run through SQLite's
+``EXPLAIN QUERY PLAN``, and full-table scans and temporary B-tree sorts are
+reported as plan issues. The endpoint suite lives in ``manage.py check_queries``.
+"""
+
+import math
+import re
+
+from asgiref.sync import async_to_sync
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+# Statements that have a query plan worth inspecting
+EXPLAINABLE = ('SELECT', 'UPDATE', 'DELETE', 'WITH')
+
+_TABLE = re.compile(r'(?:FROM|UPDATE)\s+"(\w+)"')
+
+
+async def _consume_async(iterator):
+    return b''.join([chunk async for chunk in iterator])
+
+
+def bulk_insert_queries(model, rows, with_pk=False):
+    """Number of INSERT statements ``bulk_create`` issues for ``rows`` new objects (``with_pk``: ids set)"""
+    fields = [field for field in model._meta.concrete_fields if with_pk or not field.primary_key]
+    batch_size = max(connection.ops.bulk_batch_size(fields, [None] * rows), 1)
+    return math.ceil(rows / batch_size)
+
+
+def plan_issues(sql):
+    """Full-table scans and temporary B-tree sorts in the query plan of ``sql``"""
+    if not sql.lstrip().upper().startswith(EXPLAINABLE):
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        details = [row[-1] for row in cursor.fetchall()]
+
+    # Temp B-tree details do not name a table; attribute them to the statement's main table
+    table = _TABLE.search(sql)
+    issues = []
+    for detail in details:
+        if detail.startswith('USE TEMP B-TREE'):
+            issues.append(f'{detail} ON {table.group(1)}' if table else detail)
+        # "SCAN t USING [COVERING] INDEX i" walks an index in order, and "SCAN t VIRTUAL TABLE INDEX n:M..."
+        # is a full-text MATCH lookup; a bare "SCAN t" reads the whole table
+        elif (detail.startswith('SCAN ') and ' USING ' not in detail and ' VIRTUAL TABLE INDEX ' not in detail
+              and not detail.startswith(('SCAN CONSTANT', 'SCAN ('))):
+            issues.append(detail)
+    return issues
+
+
+class CheckResult:
+    """Outcome of one ``EndpointCheck`` run"""
+
+    def __init__(self, check, rows, status_code, queries, expected, issues):
+        self.check = check
+        self.rows = rows
+        self.status_code = status_code
+        self.queries = queries
+        self.expected = expected
+        self.issues = issues
+
+    @property
+    def count_ok(self):
+        return len(self.queries) == self.expected
+
+    @property
+    def status_ok(self):
+        return self.status_code == self.check.status
+
+
+class EndpointCheck:
+    """Pinned query count for one request to one endpoint.
+
+    ``request`` is called as ``request(client, context)`` and returns the
+    response; ``queries`` is an int or a callable taking the context, which
+    is evaluated before the request is sent.
+    """
+
+    def __init__(self, url_name, request, queries, label=None, status=200):
+        self.url_name = url_name
+        self.request = request
+        self.queries = queries
+        self.label = label or url_name
+        self.status = status
+
+    def expected_queries(self, context):
+        return self.queries(context) if callable(self.queries) else self.queries
+
+    def run(self, client, context):
+        expected = self.expected_queries(context)
+        with CaptureQueriesContext(connection) as captured:
+            response = self.request(client, context)
+            # Streaming bodies query while they are consumed
+            if response.streaming:
+                if response.is_async:
+                    async_to_sync(_consume_async)(response.streaming_content)
+                else:
+                    b''.join(response.streaming_content)
+        queries = [query['sql'] for query in captured.captured_queries]
+
+        issues = []
+        for sql in queries:
+            for issue in plan_issues(sql):
+                if issue not in issues:
+                    issues.append(issue)
+        return CheckResult(self, context['rows'], response.status_code, queries, expected, issues)
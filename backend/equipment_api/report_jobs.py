@@ -0,0 +1,180 @@
+"""
+Background report generation with a local worker pool.
+
+Report requests are recorded as ``ReportJob`` rows and rendered by a thread
+pool inside the worker process that accepted them. Progress lives in the
+database, so any worker can answer status and download requests, and a
+request for a dataset that already has a queued or running job is coalesced
+onto that job instead of rendering the same document twice.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .archive import read_hot
+from .db import retry_on_locked
+from .events import REPORT_FAILED, REPORT_READY, publish
+from .models import Equipment, ReportJob
+from .reports import build_equipment_report
+
+# Persist row progress every N rows rather than on every row
+PROGRESS_ROW_STEP = 250
+
+_executor = None
+_executor_lock = threading.Lock()
+_submit_lock = threading.Lock()
+
+
+def get_executor():
+    """Return the process-wide report worker pool, creating it on first use"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.REPORT_WORKERS,
+                thread_name_prefix='report-worker'
+            )
+        return _executor
+
+
+def report_file_path(job):
+    """Location of the rendered PDF for a job"""
+    return os.path.join(settings.REPORTS_ROOT, f"equipment_report_{job.dataset_id}_{job.id}.pdf")
+
+
+STALE_JOB_ERROR = 'Report worker stopped responding'
+
+
+def _stale_cutoff():
+    return timezone.now() - timedelta(seconds=settings.REPORT_JOB_STALE_SECONDS)
+
+
+def _expire_stale_jobs(dataset):
+    """Fail active jobs whose worker stopped reporting progress (e.g. a killed process)"""
+    ReportJob.objects.filter(
+        dataset=dataset,
+        status__in=ReportJob.ACTIVE_STATUSES,
+        updated_at__lt=_stale_cutoff()
+    ).update(status=ReportJob.STATUS_FAILED, error=STALE_JOB_ERROR, finished_at=timezone.now())
+
+
+def expire_if_stale(job):
+    """Fail ``job`` in place if it is active but its worker stopped reporting progress.
+
+    Costs no query unless the job looks stale, so status polling stays cheap.
+    """
+    cutoff = _stale_cutoff()
+    if job.status not in ReportJob.ACTIVE_STATUSES or job.updated_at >= cutoff:
+        return
+    now = timezone.now()
+    # The worker may have reported progress since the job was read
+    if ReportJob.objects.filter(
+        id=job.id,
+        status__in=ReportJob.ACTIVE_STATUSES,
+        updated_at__lt=cutoff
+    ).update(status=ReportJob.STATUS_FAILED, error=STALE_JOB_ERROR, finished_at=now):
+        job.status, job.error, job.finished_at = ReportJob.STATUS_FAILED, STALE_JOB_ERROR, now
+    else:
+        job.refresh_from_db()
+
+
+@retry_on_locked
+def submit_report(dataset):
+    """Queue a report for a dataset, returning (job, created).
+
+    If a job for the same dataset is already queued or running it is returned
+    unchanged and nothing new is scheduled.
+    """
+    with _submit_lock, transaction.atomic():
+        _expire_stale_jobs(dataset)
+        job = ReportJob.objects.filter(
+            dataset=dataset,
+            status__in=ReportJob.ACTIVE_STATUSES
+        ).order_by('created_at').first()
+        if job:
+            return job, False
+
+        job = ReportJob.objects.create(
+            dataset=dataset,
+            rows_total=dataset.total_count
+        )
+        transaction.on_commit(lambda: get_executor().submit(run_report_job, job.id))
+        return job, True
+
+
+def run_report_job(job_id):
+    """Render a queued report, recording progress on the job row"""
+    close_old_connections()
+    try:
+        # Claim the job only while it is still queued; it may have been expired as stale meanwhile
+        if not ReportJob.objects.filter(id=job_id, status=ReportJob.STATUS_QUEUED).update(
+            status=ReportJob.STATUS_RUNNING, updated_at=timezone.now()
+        ):
+            return
+        job = ReportJob.objects.select_related('dataset').get(id=job_id)
+
+        def on_row(rows_processed):
+            if rows_processed % PROGRESS_ROW_STEP == 0 or rows_processed == job.rows_total:
+                ReportJob.objects.filter(id=job.id).update(rows_processed=rows_processed, updated_at=timezone.now())
+
+        def on_page(pages_rendered):
+            ReportJob.objects.filter(id=job.id).update(pages_rendered=pages_rendered, updated_at=timezone.now())
+
+        os.makedirs(settings.REPORTS_ROOT, exist_ok=True)
+        path = report_file_path(job)
+        partial_path = f"{path}.part"
+
+        def render():
+            equipment = Equipment.objects.filter(dataset=job.dataset).iterator()
+            with open(partial_path, 'wb') as output:
+                build_equipment_report(job.dataset, equipment, output, on_row=on_row, on_page=on_page)
+
+        read_hot(job.dataset, render)
+        os.replace(partial_path, path)
+
+        done = ReportJob.objects.filter(id=job.id, status=ReportJob.STATUS_RUNNING).update(
+            status=ReportJob.STATUS_DONE,
+            file_path=path,
+            finished_at=timezone.now(),
+            updated_at=timezone.now()
+        )
+        if not done:
+            # Expired as stale while rendering; the job that replaced it owns the report
+            os.remove(path)
+            return
+        publish(REPORT_READY, job_id=job.id, dataset_id=job.dataset_id)
+    except Exception as e:
+        failed = ReportJob.objects.filter(id=job_id, status__in=ReportJob.ACTIVE_STATUSES).update(
+            status=ReportJob.STATUS_FAILED,
+            error=str(e),
+            finished_at=timezone.now(),
+            updated_at=timezone.now()
+        )
+        if failed:
+            dataset_id = ReportJob.objects.filter(id=job_id).values_list('dataset_id', flat=True).first()
+            publish(REPORT_FAILED, job_id=job_id, dataset_id=dataset_id, error=str(e))
+    finally:
+        close_old_connections()
+
+
+def _remove_files(paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def discard_reports(dataset):
+    """Remove rendered report files for a dataset that is about to be deleted, once the deletion commits"""
+    paths = list(
+        ReportJob.objects.filter(dataset=dataset).exclude(file_path='').order_by().values_list('file_path', flat=True)
+    )
+    if paths:
+        transaction.on_commit(lambda: _remove_files(paths))
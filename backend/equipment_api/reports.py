@@ -0,0 +1,144 @@
+"""
+PDF report rendering shared by the synchronous download and the report job queue.
+
+ReportLab is imported when the first report is rendered, not when this
+module is imported by the views and the report queue.
+"""
+
+from datetime import datetime
+
+from .models import primed
+
+# Background of anomalous cells (light red)
+ANOMALY_COLOR = '#f8d7da'
+
+
+def build_equipment_report(dataset, equipment, output, on_row=None, on_page=None):
+    """Render the equipment report for a dataset into a file-like output.
+
+    ``on_row(rows_processed)`` is called while the equipment table is being
+    assembled and ``on_page(pages_rendered)`` after each page is laid out, so
+    callers can report progress without knowing about ReportLab internals.
+    """
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib import colors
+
+    doc = SimpleDocTemplate(output, pagesize=A4)
+    story = []
+    styles = getSampleStyleSheet()
+
+    # Title
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=18,
+        spaceAfter=30,
+        alignment=1  # Center
+    )
+    story.append(Paragraph("Chemical Equipment Analysis Report", title_style))
+    story.append(Spacer(1, 12))
+
+    # Metadata section
+    metadata_style = styles['Normal']
+    story.append(Paragraph(f"<b>Report Generated:</b> {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", metadata_style))
+    story.append(Paragraph(f"<b>Dataset Filename:</b> {dataset.filename}", metadata_style))
+    story.append(Paragraph(f"<b>Upload Timestamp:</b> {dataset.upload_timestamp.strftime('%Y-%m-%d %H:%M:%S')}", metadata_style))
+    story.append(Spacer(1, 20))
+
+    # Summary Statistics Table
+    story.append(Paragraph("Summary Statistics", styles['Heading2']))
+    summary_data = [
+        ['Metric', 'Value'],
+        ['Total Equipment Count', str(dataset.total_count)],
+        ['Average Flowrate', f"{dataset.avg_flowrate:.2f} L/min"],
+        ['Average Pressure', f"{dataset.avg_pressure:.2f} bar"],
+        ['Average Temperature', f"{dataset.avg_temperature:.2f} °C"],
+    ]
+
+    summary_table = Table(summary_data)
+    summary_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 12),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ]))
+    story.append(summary_table)
+    story.append(Spacer(1, 20))
+
+    # Equipment Type Distribution
+    story.append(Paragraph("Equipment Type Distribution", styles['Heading2']))
+    type_data = [['Equipment Type', 'Count']]
+    for eq_type, count in dataset.type_distribution.items():
+        type_data.append([eq_type, str(count)])
+
+    type_table = Table(type_data)
+    type_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 12),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ]))
+    story.append(type_table)
+    story.append(Spacer(1, 20))
+
+    # Complete Equipment List
+    story.append(Paragraph("Complete Equipment List", styles['Heading2']))
+    equipment_data = [['Name', 'Type', 'Flowrate (L/min)', 'Pressure (bar)', 'Temperature (°C)']]
+    reading_cells = {'flowrate': 2, 'pressure': 3, 'temperature': 4}
+    # Rows flagged at ingest (see anomalies.py): the name and each failed reading are highlighted
+    anomaly_color = colors.HexColor(ANOMALY_COLOR)
+    anomaly_styles = []
+    flagged_rows = 0
+
+    for rows_processed, eq in enumerate(primed(equipment), start=1):
+        if eq.anomaly_score is not None:
+            flagged_rows += 1
+            cells = [0] + [reading_cells[reason.split(':')[0]] for reason in eq.anomaly_reasons.split(',') if reason]
+            for cell in set(cells):
+                anomaly_styles.append(('BACKGROUND', (cell, rows_processed), (cell, rows_processed), anomaly_color))
+        equipment_data.append([
+            eq.equipment_name,
+            eq.type_name,
+            f"{eq.flowrate:.1f}",
+            f"{eq.pressure:.1f}",
+            f"{eq.temperature:.1f}"
+        ])
+        if on_row:
+            on_row(rows_processed)
+
+    equipment_table = Table(equipment_data)
+    equipment_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('FONTSIZE', (0, 1), (-1, -1), 8)
+    ] + anomaly_styles))
+    if flagged_rows:
+        story.append(Paragraph(
+            f"{flagged_rows} row(s) flagged as anomalous are highlighted, with the readings that failed.",
+            metadata_style
+        ))
+        story.append(Spacer(1, 8))
+    story.append(equipment_table)
+
+    def page_done(canvas, doc):
+        if on_page:
+            on_page(canvas.getPageNumber())
+
+    # Build PDF
+    doc.build(story, onFirstPage=page_done, onLaterPages=page_done)
@@ -0,0 +1,75 @@
+"""
+Full-text search over equipment tags.
+
+Tags are interned in ``EquipmentName``, so the index covers each distinct tag
+once rather than every uploaded row. ``equipment_api_equipmentname_fts`` is an
+SQLite FTS5 index over the tag table, kept in step with it by triggers (see
+migration 0011): new tags are indexed in the same transaction that interns
+them at ingest. Tags are split into words on spaces and punctuation, so
+``Pump B-205`` is indexed as ``pump``, ``b``, ``205``.
+
+A search term matches consecutive words by prefix: ``B-2`` (or ``B-2*``)
+finds ``b`` followed by a word starting with ``2``, and ``reactor A`` finds
+tags with a word starting with ``reactor`` and one starting with ``a``. Only
+tags with rows in a retained dataset match: the trend rollups (see
+trends.py) list the datasets each tag appears in, and they are deleted with
+evicted datasets.
+"""
+
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'equipment_api_equipmentname_fts'
+ROLLUP_TABLE = 'equipment_api_equipmentrollup'
+SEARCH_PARAM = 'q'
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Words as the FTS5 unicode61 tokenizer splits them; underscores separate words too
+_WORD = re.compile(r'[^\W_]+')
+
+
+class InvalidSearch(ValueError):
+    """A search without any letter or digit to look for"""
+
+
+def match_expression(text):
+    """FTS5 query for user search text: one prefix phrase per whitespace-separated term, all required"""
+    phrases = []
+    for term in text.split():
+        words = _WORD.findall(term.lower())
+        if words:
+            phrases.append('"{}"*'.format(' '.join(words)))
+    if not phrases:
+        raise InvalidSearch('Search for at least one letter or digit')
+    return ' AND '.join(phrases)
+
+
+def matching_name_ids(expression):
+    """Subquery of the ``EquipmentName`` ids matching an FTS5 expression, for ``id__in`` filters"""
+    return RawSQL(f'SELECT rowid FROM "{FTS_TABLE}" WHERE "{FTS_TABLE}" MATCH %s', [expression])
+
+
+def search_names(expression, offset, limit):
+    """Retained tags matching an FTS5 expression, best match first.
+
+    Returns (total matches, [(name id, tag)] for the requested page).
+    """
+    where = (
+        f'WHERE "{FTS_TABLE}" MATCH %s AND EXISTS '
+        f'(SELECT 1 FROM "{ROLLUP_TABLE}" WHERE "{ROLLUP_TABLE}"."name_id" = "{FTS_TABLE}"."rowid")'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT COUNT(*) FROM "{FTS_TABLE}" {where}', [expression])
+        total = cursor.fetchone()[0]
+        if not total or offset >= total:
+            return total, []
+        # bm25 rank; the id keeps equally ranked tags in a stable order across pages
+        cursor.execute(
+            f'SELECT "{FTS_TABLE}"."rowid", "{FTS_TABLE}"."name" FROM "{FTS_TABLE}" {where} '
+            f'ORDER BY "{FTS_TABLE}"."rank", "{FTS_TABLE}"."rowid" LIMIT %s OFFSET %s',
+            [expression, limit, offset]
+        )
+        return total, cursor.fetchall()
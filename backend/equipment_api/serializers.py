@@ -1,18 +1,47 @@
+from django.db import models
+from django.urls import reverse
 from rest_framework import serializers
-from .models import Equipment, DatasetUpload
+from .derived import DERIVED_METRIC_NAMES
+from .models import Alert, AlertRule, Equipment, DatasetUpload, ReportJob, UploadSession, prime_lookups
+from .parsing import VALID_TYPES
+from .upload_sessions import received_chunks, received_ranges
+
+
+class PrimedListSerializer(serializers.ListSerializer):
+    """Primes the lookups of all rows (see models.prime_lookups) before serializing them one by one"""
+
+    def to_representation(self, data):
+        items = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        prime_lookups([self.child.equipment_of(item) for item in items])
+        return super().to_representation(items)
 
 
 class EquipmentSerializer(serializers.ModelSerializer):
+    equipment_name = serializers.CharField()
+    type = serializers.CharField(source='type_name')
+    # Stable across uploads; keys the equipment's trend
+    equipment_identity = serializers.IntegerField(source='name_id', read_only=True)
+    anomaly_reasons = serializers.SerializerMethodField()
+
     class Meta:
         model = Equipment
-        fields = ['id', 'equipment_name', 'type', 'flowrate', 'pressure', 'temperature']
+        fields = (['id', 'equipment_name', 'equipment_identity', 'type', 'flowrate', 'pressure', 'temperature']
+                  + DERIVED_METRIC_NAMES + ['anomaly_score', 'anomaly_reasons'])
+        list_serializer_class = PrimedListSerializer
+
+    @staticmethod
+    def equipment_of(equipment):
+        return equipment
+
+    def get_anomaly_reasons(self, equipment):
+        return equipment.anomaly_reasons.split(',') if equipment.anomaly_reasons else []
 
 
 class DatasetUploadSerializer(serializers.ModelSerializer):
     class Meta:
         model = DatasetUpload
         fields = ['id', 'filename', 'upload_timestamp', 'total_count', 'avg_flowrate', 
-                 'avg_pressure', 'avg_temperature', 'type_distribution']
+                 'avg_pressure', 'avg_temperature', 'type_distribution', 'storage']
 
 
 class LoginSerializer(serializers.Serializer):
@@ -26,3 +55,96 @@ class LogoutSerializer(serializers.Serializer):
 
 class FileUploadSerializer(serializers.Serializer):
     file = serializers.FileField()
+
+
+class ReportJobSerializer(serializers.ModelSerializer):
+    status_url = serializers.SerializerMethodField()
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ReportJob
+        fields = ['id', 'dataset', 'status', 'rows_total', 'rows_processed', 'pages_rendered',
+                 'error', 'created_at', 'finished_at', 'status_url', 'download_url']
+
+    def _absolute_url(self, name, job):
+        url = reverse(name, args=[job.id])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+    def get_status_url(self, job):
+        return self._absolute_url('report_job_status', job)
+
+    def get_download_url(self, job):
+        if job.status != ReportJob.STATUS_DONE:
+            return None
+        return self._absolute_url('report_job_download', job)
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    chunk_count = serializers.IntegerField(read_only=True)
+    received = serializers.SerializerMethodField()
+    missing_chunks = serializers.SerializerMethodField()
+    status_url = serializers.SerializerMethodField()
+    finalize_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'filename', 'size', 'chunk_size', 'chunk_count', 'sha256', 'status', 'dataset_id',
+                  'error', 'received', 'missing_chunks', 'created_at', 'updated_at', 'status_url', 'finalize_url']
+
+    def _absolute_url(self, name, session):
+        url = reverse(name, args=[session.id])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+    def get_received(self, session):
+        return received_ranges(session)
+
+    def get_missing_chunks(self, session):
+        return sorted(set(range(session.chunk_count)) - set(received_chunks(session)))
+
+    def get_status_url(self, session):
+        return self._absolute_url('upload_session_status', session)
+
+    def get_finalize_url(self, session):
+        return self._absolute_url('upload_session_finalize', session)
+
+
+class AlertRuleSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AlertRule
+        fields = ['id', 'name', 'equipment_type', 'parameter', 'min_value', 'max_value', 'severity', 'enabled',
+                  'created_at', 'updated_at']
+        read_only_fields = ['created_at', 'updated_at']
+
+    def validate_equipment_type(self, value):
+        if value and value not in VALID_TYPES:
+            raise serializers.ValidationError(f"Must be blank (every type) or one of: {', '.join(VALID_TYPES)}")
+        return value
+
+    def validate(self, data):
+        min_value = data.get('min_value', self.instance.min_value if self.instance else None)
+        max_value = data.get('max_value', self.instance.max_value if self.instance else None)
+        if min_value is None and max_value is None:
+            raise serializers.ValidationError('A rule needs a min_value, a max_value or both')
+        if min_value is not None and max_value is not None and min_value > max_value:
+            raise serializers.ValidationError('min_value must not be greater than max_value')
+        return data
+
+
+class AlertSerializer(serializers.ModelSerializer):
+    equipment_name = serializers.CharField(source='equipment.equipment_name')
+    type = serializers.CharField(source='equipment.type_name')
+    rule_name = serializers.CharField(source='rule.name')
+    parameter = serializers.CharField(source='rule.parameter')
+    severity = serializers.CharField(source='rule.severity')
+
+    class Meta:
+        model = Alert
+        fields = ['id', 'equipment', 'equipment_name', 'type', 'rule', 'rule_name', 'parameter', 'severity',
+                  'value', 'limit', 'bound']
+        list_serializer_class = PrimedListSerializer
+
+    @staticmethod
+    def equipment_of(alert):
+        return alert.equipment
@@ -0,0 +1,214 @@
+"""
+Sharded parsing of very large CSV uploads in a process pool.
+
+One core running ``read_csv``, base type extraction and validation is the
+bottleneck for multi-hundred-MB files. With ``CSV_PARSE_PROCESSES`` > 1, an
+upload stored on disk that is at least ``CSV_SHARD_MIN_BYTES`` is split into
+newline-aligned byte ranges, one or more per pool process. Each process reads
+its range with the header line in front, parses it with ``read_typed`` and
+returns its rows' columns together with the shard's aggregates: row count,
+type counts, invalid types and per-column min/max.
+
+The aggregates merge exactly: counts add up, min/max are taken across
+shards, and types and invalid types keep their order of first occurrence,
+so validation fails with the same error as a single-process parse. The
+averages are not merged from per-shard sums, which would round differently
+from pandas' summation over the whole column; they are computed over the
+concatenated columns, so the summary matches ``parse_with_pandas`` bit for
+bit. Rows are handed to the writer in file order.
+
+Files with a double quote anywhere are parsed in one piece, as a quoted
+field may contain a newline and a byte range cannot tell.
+"""
+
+import itertools
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import django
+from django.conf import settings
+
+from .ingest import PreparedDataset
+from .metrics import registry, stage
+from .parsing import (
+    REQUIRED_COLUMNS, VALID_TYPES, VALUE_RANGES, UploadRejected, _invalid_types_error, _pandas_value_counts,
+    _read_header, extract_base_type, pandas_csv_engine, read_typed,
+)
+
+SCAN_BLOCK_SIZE = 16 * 1024 * 1024
+# Shards per pool process, so one slow shard does not leave the other processes idle
+SHARDS_PER_PROCESS = 2
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_parse_pool():
+    """Return the process-wide parse pool, creating it on first use.
+
+    Its processes come from a forkserver, not forked from this (threaded)
+    worker, and set up Django once when they start (before this module,
+    which imports the models, is loaded there).
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.CSV_PARSE_PROCESSES,
+                mp_context=multiprocessing.get_context('forkserver'),
+                initializer=django.setup
+            )
+        return _pool
+
+
+def _discard_pool(pool):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False)
+
+
+def should_shard(path):
+    """Whether the stored upload at ``path`` is parsed in shards"""
+    return settings.CSV_PARSE_PROCESSES > 1 and os.path.getsize(path) >= settings.CSV_SHARD_MIN_BYTES
+
+
+def _scan(path):
+    """(header line, offset of the first data line), or None when the file cannot be split by newlines"""
+    with open(path, 'rb') as f:
+        while block := f.read(SCAN_BLOCK_SIZE):
+            if b'"' in block:
+                return None
+        f.seek(0)
+        while line := f.readline():
+            if line.strip(b'\r\n'):  # read_csv skips blank lines before the header
+                return line, f.tell()
+    return None
+
+
+def _shard_ranges(path, start, shards):
+    """Split ``[start, file size)`` into about ``shards`` byte ranges that each end after a newline"""
+    size = os.path.getsize(path)
+    bounds = [start]
+    with open(path, 'rb') as f:
+        for shard in range(1, shards):
+            f.seek(max(start + (size - start) * shard // shards - 1, bounds[-1]))
+            f.readline()
+            if f.tell() >= size:
+                break
+            if f.tell() > bounds[-1]:
+                bounds.append(f.tell())
+    bounds.append(size)
+    return list(zip(bounds, bounds[1:]))
+
+
+def parse_shard(path, header, start, end, engine):
+    """Parse one byte range of ``path`` (run in a pool process): its columns and aggregates"""
+    import numpy as np
+    import pandas as pd
+
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = header + f.read(end - start)
+    df = read_typed(data, engine)
+    del data
+
+    types = df['Type'].array
+    base_types = pd.Categorical(types.categories.map(extract_base_type)).take(types.codes, allow_fill=True)
+    codes = types.codes[types.codes >= 0]
+    first_seen = pd.unique(codes)
+    return {
+        'count': len(df),
+        'names': df['Equipment Name'].tolist(),
+        'base_type_categories': base_types.categories.tolist(),
+        'base_type_codes': base_types.codes,
+        'type_keys': types.categories[first_seen].tolist(),
+        'type_totals': np.bincount(codes)[first_seen].tolist(),
+        'invalid_types': types[~base_types.isin(VALID_TYPES)].unique().tolist(),
+        'columns': {column: df[column].to_numpy() for column, _, _, _ in VALUE_RANGES},
+        'bounds': {column: (float(df[column].min()), float(df[column].max())) for column, _, _, _ in VALUE_RANGES},
+    }
+
+
+def _merge(filename, shards):
+    """One ``PreparedDataset`` from the shard results, in file order, validated as a whole"""
+    import numpy as np
+    import pandas as pd
+
+    with stage('validate'):
+        invalid_types = pd.unique(np.array(
+            [value for shard in shards for value in shard['invalid_types']], dtype=object
+        ))
+        if len(invalid_types) > 0:
+            raise UploadRejected(_invalid_types_error(invalid_types))
+
+        for column, low, high, message in VALUE_RANGES:
+            # NaN when the column has no values at all, as Series.min() gives; NaN fails neither comparison
+            minimum = min((shard['bounds'][column][0] for shard in shards
+                           if not math.isnan(shard['bounds'][column][0])), default=math.nan)
+            maximum = max((shard['bounds'][column][1] for shard in shards
+                           if not math.isnan(shard['bounds'][column][1])), default=math.nan)
+            if minimum < low or maximum > high:
+                raise UploadRejected(message)
+
+    type_totals = {}
+    for shard in shards:
+        for key, total in zip(shard['type_keys'], shard['type_totals']):
+            type_totals[key] = type_totals.get(key, 0) + total
+    columns = {
+        column: pd.Series(np.concatenate([shard['columns'][column] for shard in shards]))
+        for column, _, _, _ in VALUE_RANGES
+    }
+    names = list(itertools.chain.from_iterable(shard['names'] for shard in shards))
+    base_types = np.concatenate([
+        # Code -1 (a missing Type) picks the NaN at the end
+        np.array(shard['base_type_categories'] + [np.nan], dtype=object)[shard['base_type_codes']]
+        for shard in shards
+    ]).tolist()
+    return PreparedDataset(
+        filename=filename,
+        total_count=sum(shard['count'] for shard in shards),
+        avg_flowrate=float(columns['Flowrate'].mean()),
+        avg_pressure=float(columns['Pressure'].mean()),
+        avg_temperature=float(columns['Temperature'].mean()),
+        type_distribution=_pandas_value_counts(list(type_totals), list(type_totals.values())),
+        rows=list(zip(names, base_types, columns['Flowrate'].tolist(),
+                      columns['Pressure'].tolist(), columns['Temperature'].tolist())),
+    )
+
+
+def parse_sharded(filename, path):
+    """Parse and validate the stored CSV upload at ``path`` in the process pool.
+
+    Returns None when the file cannot be split safely; the caller then
+    parses it in one piece.
+    """
+    with stage('parse'):
+        scanned = _scan(path)
+        if scanned is None:
+            return None
+        header, start = scanned
+        missing_columns = [col for col in REQUIRED_COLUMNS if col not in _read_header(header)]
+        if missing_columns:
+            raise UploadRejected(f'Missing required columns: {", ".join(missing_columns)}')
+
+        pool = get_parse_pool()
+        engine = pandas_csv_engine()
+        ranges = _shard_ranges(path, start, settings.CSV_PARSE_PROCESSES * SHARDS_PER_PROCESS)
+        try:
+            futures = [pool.submit(parse_shard, path, header, shard_start, shard_end, engine)
+                       for shard_start, shard_end in ranges]
+            shards = [future.result() for future in futures]
+        except BrokenProcessPool:
+            # A pool process died (e.g. killed for memory); start a new pool next time
+            _discard_pool(pool)
+            raise
+
+    if settings.METRICS_ENABLED:
+        registry.inc('upload_csv_engine_total', {'engine': 'sharded'})
+    return _merge(filename, shards)
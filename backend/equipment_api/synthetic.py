@@ -0,0 +1,78 @@
+"""
+Deterministic synthetic equipment data for benchmarks.
+
+Rows cover every base type ``upload_csv`` accepts (with and without the
+suffixes it strips) and every value range it validates, including the exact
+range bounds. The same seed always yields the same bytes, and equipment
+names are drawn from a fixed pool so they repeat across generated uploads
+the way real plant tags do.
+"""
+
+import csv
+import io
+import random
+
+# (Type column value, name prefix); suffixed values exercise base type extraction
+TYPE_VARIANTS = [
+    ('Reactor', 'Reactor'),
+    ('Reactor-CSTR', 'Reactor'),
+    ('Pump', 'Pump'),
+    ('Pump Centrifugal', 'Pump'),
+    ('Heat Exchanger', 'Heat Exchanger'),
+    ('HeatExchanger', 'HeatExchanger'),
+    ('Heat Exchanger Shell', 'Heat Exchanger'),
+    ('Compressor', 'Compressor'),
+    ('Valve', 'Valve'),
+    ('Valve-Gate', 'Valve'),
+    ('Condenser', 'Condenser'),
+]
+
+FLOWRATE_RANGE = (10.5, 500.0)
+PRESSURE_RANGE = (1.0, 150.0)
+TEMPERATURE_RANGE = (20.0, 350.0)
+
+HEADER = ['Equipment Name', 'Type', 'Flowrate', 'Pressure', 'Temperature']
+
+# Distinct tags per type prefix; names repeat once a dataset exceeds the pool
+NAME_POOL_SIZE = 5000
+
+
+def _value(rng, bounds):
+    """Uniform value in range rounded to 0.1, hitting the exact bounds now and then"""
+    low, high = bounds
+    roll = rng.random()
+    if roll < 0.001:
+        return low
+    if roll < 0.002:
+        return high
+    return round(rng.uniform(low, high), 1)
+
+
+def generate_rows(count, seed=0):
+    """Yield ``count`` valid rows as (name, type, flowrate, pressure, temperature)"""
+    rng = random.Random(seed)
+    for _ in range(count):
+        type_value, prefix = rng.choice(TYPE_VARIANTS)
+        tag = rng.randrange(NAME_POOL_SIZE)
+        name = f"{prefix} {chr(ord('A') + tag % 26)}-{100 + tag // 26}"
+        yield (
+            name,
+            type_value,
+            _value(rng, FLOWRATE_RANGE),
+            _value(rng, PRESSURE_RANGE),
+            _value(rng, TEMPERATURE_RANGE),
+        )
+
+
+def write_csv(output, count, seed=0):
+    """Write a CSV upload with ``count`` rows to a text file object"""
+    writer = csv.writer(output, lineterminator='\n')
+    writer.writerow(HEADER)
+    writer.writerows(generate_rows(count, seed))
+
+
+def csv_bytes(count, seed=0):
+    """Return a CSV upload with ``count`` rows as UTF-8 bytes"""
+    output = io.StringIO()
+    write_csv(output, count, seed)
+    return output.getvalue().encode('utf-8')
@@ -0,0 +1,179 @@
+"""
+Alert rules (see alerts.py): validation of the rule endpoints, evaluation of
+minimum and maximum bounds at ingest and the per-dataset ``/api/alerts/``
+listing.
+"""
+
+from django.test import TransactionTestCase, override_settings
+
+from equipment_api import models
+from equipment_api.benchmarking import api_client, upload
+from equipment_api.models import Alert, AlertRule
+from equipment_api.synthetic import HEADER
+
+# name, type, flowrate, pressure, temperature
+ROWS = [
+    ('Pump P-101', 'Pump', 100.0, 40.0, 80.0),
+    ('Pump P-102', 'Pump Centrifugal', 100.0, 75.5, 80.0),
+    ('Pump P-103', 'Pump', 100.0, 60.0, 80.0),
+    ('Valve V-201', 'Valve', 100.0, 90.0, 25.0),
+    ('Reactor R-301', 'Reactor', 100.0, 20.0, 30.0),
+    ('Reactor R-302', 'Reactor', 100.0, 20.0, 300.0),
+]
+
+
+def _csv(rows=ROWS):
+    lines = [','.join(HEADER)] + [','.join(str(value) for value in row) for row in rows]
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+def _rule(**fields):
+    return AlertRule.objects.create(**{'name': 'Rule', 'parameter': 'pressure', **fields})
+
+
+@override_settings(INGEST_COORDINATOR=False, UPLOAD_RATE_LIMIT=None)
+class AlertTestCase(TransactionTestCase):
+
+    def setUp(self):
+        models._lookup_cache.clear()
+        self.client = api_client()
+
+    def _upload(self, rows=ROWS):
+        response = upload(self.client, _csv(rows))
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()['dataset_id']
+
+    def _alerts(self, **params):
+        response = self.client.get('/api/alerts/', params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+
+class AlertRuleApiTests(AlertTestCase):
+
+    def _create(self, **fields):
+        return self.client.post('/api/alerts/rules/', {'name': 'Rule', 'parameter': 'pressure', **fields},
+                                content_type='application/json')
+
+    def test_create_and_list(self):
+        response = self._create(equipment_type='Pump', max_value=60, severity='critical')
+        self.assertEqual(response.status_code, 201, response.content)
+        rule = response.json()
+        self.assertEqual((rule['equipment_type'], rule['max_value'], rule['min_value']), ('Pump', 60.0, None))
+        self.assertTrue(rule['enabled'])
+
+        listed = self.client.get('/api/alerts/rules/').json()
+        self.assertEqual([item['id'] for item in listed], [rule['id']])
+        self.assertEqual(self.client.get(f"/api/alerts/rules/{rule['id']}/").json()['name'], 'Rule')
+
+    def test_create_rejects_invalid_rules(self):
+        for fields in (
+            {},
+            {'min_value': 10, 'max_value': 5},
+            {'max_value': 5, 'equipment_type': 'Turbine'},
+            {'max_value': 5, 'parameter': 'humidity'},
+            {'max_value': 5, 'severity': 'fatal'},
+        ):
+            with self.subTest(fields=fields):
+                response = self._create(**fields)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
+        self.assertFalse(AlertRule.objects.exists())
+
+    def test_update_is_validated_against_the_stored_bounds(self):
+        rule = _rule(min_value=10, max_value=50)
+        url = f'/api/alerts/rules/{rule.id}/'
+
+        response = self.client.patch(url, {'min_value': 60}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.patch(url, {'min_value': None, 'max_value': None}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.patch(url, {'max_value': 80}, content_type='application/json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual((response.json()['min_value'], response.json()['max_value']), (10.0, 80.0))
+
+        response = self.client.put(url, {
+            'name': 'Cold', 'parameter': 'temperature', 'min_value': 5, 'max_value': None,
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 200, response.content)
+        rule.refresh_from_db()
+        self.assertEqual((rule.parameter, rule.min_value, rule.max_value), ('temperature', 5.0, None))
+
+    def test_delete_removes_the_alerts(self):
+        rule = _rule(max_value=50)
+        self._upload()
+        self.assertTrue(Alert.objects.filter(rule=rule).exists())
+
+        response = self.client.delete(f'/api/alerts/rules/{rule.id}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Alert.objects.exists())
+        self.assertEqual(self.client.get(f'/api/alerts/rules/{rule.id}/').status_code, 404)
+        self.assertEqual(self.client.delete(f'/api/alerts/rules/{rule.id}/').status_code, 404)
+
+
+class AlertEvaluationTests(AlertTestCase):
+
+    def test_bounds_at_ingest(self):
+        pumps = _rule(name='Pump pressure', equipment_type='Pump', max_value=60, severity='critical')
+        band = _rule(name='Temperature band', parameter='temperature', min_value=28, max_value=250)
+        _rule(name='Disabled', max_value=1, enabled=False)
+        self._upload()
+
+        alerts = self._alerts()
+        found = [
+            (alert['equipment_name'], alert['rule'], alert['value'], alert['limit'], alert['bound'])
+            for alert in alerts['results']
+        ]
+        # Bounds are inclusive: P-103 at exactly 60 bar is within the limit
+        self.assertEqual(found, [
+            ('Pump P-102', pumps.id, 75.5, 60.0, 'max'),
+            ('Valve V-201', band.id, 25.0, 28.0, 'min'),
+            ('Reactor R-302', band.id, 300.0, 250.0, 'max'),
+        ])
+        self.assertEqual(alerts['count'], 3)
+        self.assertEqual(alerts['results'][0]['severity'], 'critical')
+        self.assertEqual(alerts['results'][0]['type'], 'Pump')
+
+    def test_rule_for_a_type_absent_from_the_dataset(self):
+        _rule(equipment_type='Compressor', max_value=1)
+        self._upload()
+        self.assertEqual(self._alerts()['count'], 0)
+
+    def test_rules_apply_to_later_uploads_only(self):
+        first = self._upload()
+        _rule(max_value=50)
+        second = self._upload()
+        self.assertEqual(self._alerts(dataset_id=first)['count'], 0)
+        self.assertEqual(self._alerts(dataset_id=second)['count'], 3)
+
+
+class AlertListTests(AlertTestCase):
+
+    def test_filters_by_dataset(self):
+        _rule(max_value=50)
+        first = self._upload()
+        second = self._upload(ROWS[:2])
+
+        latest = self._alerts()
+        self.assertEqual(latest['dataset_id'], second)
+        self.assertEqual([alert['equipment_name'] for alert in latest['results']], ['Pump P-102'])
+
+        selected = self._alerts(dataset_id=first)
+        self.assertEqual(selected['dataset_id'], first)
+        self.assertEqual(
+            [alert['equipment_name'] for alert in selected['results']], ['Pump P-102', 'Pump P-103', 'Valve V-201']
+        )
+        self.assertEqual(
+            set(Alert.objects.filter(id__in=[alert['id'] for alert in selected['results']]).values_list(
+                'dataset_id', flat=True
+            )),
+            {first}
+        )
+
+    def test_unknown_dataset(self):
+        response = self.client.get('/api/alerts/', {'dataset_id': 999999})
+        self.assertEqual(response.status_code, 404)
+
+    def test_no_datasets(self):
+        self.assertEqual(self._alerts(), {'dataset_id': None, 'count': 0, 'results': []})
@@ -0,0 +1,201 @@
+"""
+Tiered storage (see archive.py): datasets beyond ``DATASET_RETENTION`` are
+archived, stay listed in the history and are rehydrated when read, under
+their original ids; at most ``ARCHIVE_CACHE_DATASETS`` stay rehydrated, and a
+read that loses its rows to a concurrent eviction is retried.
+"""
+
+import shutil
+import tempfile
+
+from django.test import TransactionTestCase, override_settings
+
+from equipment_api import models
+from equipment_api.archive import READ_ATTEMPTS, DatasetUnavailable, ensure_hot, evict_rehydrated, read_hot
+from equipment_api.benchmarking import api_client, upload
+from equipment_api.models import Alert, AlertRule, DatasetUpload, Equipment
+from equipment_api.synthetic import csv_bytes
+
+ROWS = 20
+
+
+class ArchiveTestCase(TransactionTestCase):
+    """Uploads ``UPLOADS`` datasets with archiving on, oldest first, into ``self.datasets``.
+
+    ``self.rows`` holds each dataset's equipment list as served before anything was archived.
+    """
+
+    UPLOADS = 3
+
+    def setUp(self):
+        models._lookup_cache.clear()
+        archive_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, archive_root, ignore_errors=True)
+        settings = override_settings(
+            DATASET_ARCHIVE=True, DATASET_RETENTION=2, ARCHIVE_CACHE_DATASETS=1, ARCHIVE_ROOT=archive_root,
+            INGEST_COORDINATOR=False, UPLOAD_RATE_LIMIT=None,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.client = api_client()
+        self.datasets = []
+        self.rows = {}
+        for seed in range(self.UPLOADS):
+            response = upload(self.client, csv_bytes(ROWS, seed=seed), filename=f'upload-{seed}.csv')
+            self.assertEqual(response.status_code, 200, response.content)
+            dataset_id = response.json()['dataset_id']
+            self.datasets.append(dataset_id)
+            if len(self.datasets) <= 2:
+                self.rows[dataset_id] = self._equipment(dataset_id)
+
+    def _equipment(self, dataset_id):
+        response = self.client.get('/api/equipment/', {'dataset_id': dataset_id})
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def _storage(self, dataset_id):
+        dataset = DatasetUpload.objects.get(id=dataset_id)
+        return dataset.storage, Equipment.objects.filter(dataset_id=dataset_id).count()
+
+
+class HistoryTests(ArchiveTestCase):
+
+    def _pages(self, path):
+        """Follow the history's ``next`` links from its first page"""
+        pages = []
+        response = self.client.get(path, {'page_size': 2})
+        while True:
+            self.assertEqual(response.status_code, 200, response.content)
+            pages.append(response.json())
+            if not pages[-1]['next']:
+                return pages
+            response = self.client.get(pages[-1]['next'])
+
+    def _check(self, path):
+        pages = self._pages(path)
+        self.assertEqual([page['count'] for page in pages], [3, 3])
+        self.assertIsNone(pages[0]['previous'])
+        self.assertIsNotNone(pages[1]['previous'])
+        listed = [(item['id'], item['storage']) for page in pages for item in page['results']]
+        self.assertEqual(listed, [
+            (self.datasets[2], 'hot'), (self.datasets[1], 'hot'), (self.datasets[0], 'archived'),
+        ])
+
+    def test_history_lists_archived_datasets(self):
+        self._check('/api/history/')
+
+    def test_async_history_lists_archived_datasets(self):
+        self._check('/api/async/history/')
+
+    def test_default_page_size(self):
+        response = self.client.get('/api/history/')
+        self.assertEqual(len(response.json()['results']), 3)
+        self.assertIsNone(response.json()['next'])
+
+
+class RehydrationTests(ArchiveTestCase):
+
+    def test_archived_rows_are_rehydrated_under_their_original_ids(self):
+        archived = self.datasets[0]
+        self.assertEqual(self._storage(archived), ('archived', 0))
+
+        self.assertEqual(self._equipment(archived), self.rows[archived])
+        self.assertEqual(self._storage(archived), ('rehydrated', ROWS))
+        # Served from the rehydrated rows from now on
+        self.assertEqual(self._equipment(archived), self.rows[archived])
+        self.assertEqual(DatasetUpload.objects.get(id=archived).rehydrations, 1)
+
+    def test_hot_datasets_are_untouched(self):
+        for dataset_id in self.datasets[1:]:
+            self.assertEqual(self._storage(dataset_id), ('hot', ROWS))
+
+
+class RehydratedCacheTests(ArchiveTestCase):
+
+    # Two archived datasets and room for one rehydrated
+    UPLOADS = 4
+
+    def test_least_recently_read_leaves_first(self):
+        first, second = self.datasets[:2]
+        self._equipment(first)
+        self.assertEqual(self._storage(first), ('rehydrated', ROWS))
+
+        self.assertEqual(self._equipment(second), self.rows[second])
+        self.assertEqual(self._storage(second), ('rehydrated', ROWS))
+        self.assertEqual(self._storage(first), ('archived', 0))
+
+        # Read again, the evicted one comes back and evicts the other
+        self.assertEqual(self._equipment(first), self.rows[first])
+        self.assertEqual(self._storage(first), ('rehydrated', ROWS))
+        self.assertEqual(self._storage(second), ('archived', 0))
+        self.assertEqual(DatasetUpload.objects.get(id=first).rehydrations, 2)
+
+    def test_every_read_counts_as_recent(self):
+        first, second = self.datasets[:2]
+        with override_settings(ARCHIVE_CACHE_DATASETS=2):
+            self._equipment(first)
+            self._equipment(second)
+            # Read again, the first dataset becomes the most recently read
+            self._equipment(first)
+        evict_rehydrated()
+        self.assertEqual(self._storage(first), ('rehydrated', ROWS))
+        self.assertEqual(self._storage(second), ('archived', 0))
+
+    def test_eviction_during_a_read_is_retried(self):
+        first, second = self.datasets[:2]
+        dataset = DatasetUpload.objects.get(id=first)
+        reads = []
+
+        def read():
+            ids = list(Equipment.objects.filter(dataset_id=first).order_by('id').values_list('id', flat=True))
+            reads.append(ids)
+            if len(reads) == 1:
+                # Another request rehydrates the other dataset, evicting this one mid-read
+                ensure_hot(DatasetUpload.objects.get(id=second))
+            return ids
+
+        ids = read_hot(dataset, read)
+        self.assertEqual(len(reads), 2)
+        self.assertEqual(ids, sorted(row['id'] for row in self.rows[first]))
+        self.assertEqual(self._storage(first), ('rehydrated', ROWS))
+        self.assertEqual(self._storage(second), ('archived', 0))
+        self.assertEqual(dataset.rehydrations, 2)
+
+    def test_reads_evicted_every_time_give_up(self):
+        first, second = self.datasets[:2]
+        reads = []
+
+        def read():
+            reads.append(None)
+            ensure_hot(DatasetUpload.objects.get(id=second))
+
+        with self.assertRaises(DatasetUnavailable):
+            read_hot(DatasetUpload.objects.get(id=first), read)
+        self.assertEqual(len(reads), READ_ATTEMPTS)
+
+
+class RehydratedAlertTests(ArchiveTestCase):
+
+    def setUp(self):
+        AlertRule.objects.create(name='High pressure', parameter='pressure', max_value=100)
+        super().setUp()
+
+    def _alerts(self, dataset_id):
+        response = self.client.get('/api/alerts/', {'dataset_id': dataset_id})
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()['results']
+
+    def test_alerts_point_at_the_rehydrated_rows(self):
+        archived = self.datasets[0]
+        stored = list(Alert.objects.filter(dataset_id=archived).values_list('equipment_id', flat=True))
+        self.assertTrue(stored)
+
+        alerts = self._alerts(archived)
+        self.assertEqual(self._storage(archived), ('rehydrated', ROWS))
+        self.assertEqual([alert['equipment'] for alert in alerts], stored)
+        rows = {row['id']: row for row in self.rows[archived]}
+        for alert in alerts:
+            row = rows[alert['equipment']]
+            self.assertEqual((alert['equipment_name'], alert['value']), (row['equipment_name'], row['pressure']))
+        self.assertEqual(Equipment.objects.filter(id__in=stored, dataset_id=archived).count(), len(set(stored)))
@@ -0,0 +1,42 @@
+"""
+The CSV upload engines agree on every case of ``check_csv_engines``.
+
+The csv engine, the pandas engine (and the C parser when pandas reads with
+pyarrow), the streamed gzip parse and the sharded parse must give the same
+rows, bit-identical averages and the same type distribution, or the same
+error; each case must also be parsed by the engine it was written for.
+"""
+
+from django.test import SimpleTestCase
+
+from equipment_api.management.commands.check_csv_engines import (
+    CASES, csv_engine_outcome, outcome, parse_gzip_stream, parse_in_shards, parse_with_c_parser
+)
+from equipment_api.parsing import pandas_csv_engine, parse_with_pandas
+
+
+class CsvEngineParityTests(SimpleTestCase):
+
+    def test_csv_engine_matches_pandas(self):
+        for name, content, expected_engine in CASES:
+            with self.subTest(name):
+                actual, engine = csv_engine_outcome(content)
+                self.assertEqual(repr(actual), repr(outcome(parse_with_pandas, content)))
+                self.assertEqual(engine, expected_engine)
+
+    def test_c_parser_matches_pyarrow(self):
+        if pandas_csv_engine() == 'c':
+            self.skipTest('pyarrow is not installed, pandas already reads with the C parser')
+        for name, content, _ in CASES:
+            with self.subTest(name):
+                self.assertEqual(repr(outcome(parse_with_c_parser, content)), repr(outcome(parse_with_pandas, content)))
+
+    def test_streamed_gzip_matches_pandas(self):
+        for name, content, _ in CASES:
+            with self.subTest(name):
+                self.assertEqual(repr(outcome(parse_gzip_stream, content)), repr(outcome(parse_with_pandas, content)))
+
+    def test_sharded_parse_matches_pandas(self):
+        for name, content, _ in CASES:
+            with self.subTest(name):
+                self.assertEqual(repr(outcome(parse_in_shards, content)), repr(outcome(parse_with_pandas, content)))
@@ -0,0 +1,74 @@
+"""
+Equipment names and types decode correctly when the lookup caches are too
+small to hold a dataset's rows (``LOOKUP_CACHE_SIZE``), on the sync and the
+async endpoints alike.
+"""
+
+import json
+
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient, TransactionTestCase, override_settings
+
+from equipment_api import models
+from equipment_api.benchmarking import api_client, upload
+from equipment_api.synthetic import HEADER
+
+ROWS = [
+    ('Pump P-101', 'Pump'),
+    ('Pump P-102', 'Pump'),
+    ('Valve V-201', 'Valve'),
+    ('Reactor R-301', 'Reactor'),
+    ('Compressor C-401', 'Compressor'),
+    ('Condenser D-501', 'Condenser'),
+]
+EXPECTED = sorted(ROWS)
+
+
+def _csv():
+    lines = [','.join(HEADER)] + [f'{name},{type_name},100.5,50.5,200.5' for name, type_name in ROWS]
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+def _decoded(rows):
+    return sorted((row['equipment_name'], row['type']) for row in rows)
+
+
+@override_settings(LOOKUP_CACHE_SIZE=2, INGEST_COORDINATOR=False, UPLOAD_RATE_LIMIT=None)
+class SmallLookupCacheTests(TransactionTestCase):
+
+    def setUp(self):
+        # Rows cached by an earlier test were flushed with its database
+        models._lookup_cache.clear()
+        self.client = api_client()
+        response = upload(self.client, _csv())
+        self.assertEqual(response.status_code, 200)
+        # Nothing of the upload left cached: every read decodes from the database
+        models._lookup_cache.clear()
+
+    def test_equipment_list(self):
+        response = self.client.get('/api/equipment/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(_decoded(response.json()), EXPECTED)
+
+    def test_async_equipment_list(self):
+        response = self.client.get('/api/async/equipment/')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(_decoded(response.json()), EXPECTED)
+
+    def test_async_equipment_page(self):
+        response = self.client.get('/api/async/equipment/page/', {'page_size': 4})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 4)
+        response = self.client.get('/api/async/equipment/page/', {'page_size': 100})
+        self.assertEqual(_decoded(response.json()['results']), EXPECTED)
+
+    def test_async_equipment_stream(self):
+        headers = {'Authorization': self.client.defaults['HTTP_AUTHORIZATION']}
+
+        async def stream():
+            response = await AsyncClient().get('/api/async/equipment/stream/', headers=headers)
+            return response.status_code, b''.join([chunk async for chunk in response.streaming_content])
+
+        status_code, body = async_to_sync(stream)()
+        self.assertEqual(status_code, 200)
+        self.assertEqual(_decoded(json.loads(line) for line in body.splitlines()), EXPECTED)
@@ -0,0 +1,34 @@
+"""
+Every API endpoint passes the query checks of ``check_queries``.
+
+The pinned query counts and the query plan checks run against the test
+database at one small dataset size; ``check_queries`` itself also covers the
+larger ones.
+"""
+
+from importlib import import_module
+from io import StringIO
+
+from django.test import TransactionTestCase, override_settings
+
+from equipment_api import models
+from equipment_api.management.commands.check_queries import Command
+from equipment_api.models import EquipmentType
+
+
+@override_settings(UPLOAD_RATE_LIMIT=None)
+class QueryCheckTests(TransactionTestCase):
+
+    def setUp(self):
+        # The checks expect the equipment types migration 0005 creates, which flushing removes,
+        # and no rows cached from an earlier test's database
+        models._lookup_cache.clear()
+        base_types = import_module('equipment_api.migrations.0005_compact_equipment').BASE_TYPES
+        EquipmentType.objects.bulk_create([EquipmentType(name=name) for name in base_types], ignore_conflicts=True)
+        self.command = Command(stdout=StringIO())
+
+    def test_every_endpoint_is_checked(self):
+        self.assertEqual(self.command.uncovered_endpoints(), [])
+
+    def test_query_counts_and_plans(self):
+        self.assertEqual(self.command.run_checks([10], seed=42), [])
@@ -0,0 +1,54 @@
+"""
+Report jobs whose worker stopped reporting progress for
+``REPORT_JOB_STALE_SECONDS`` show as failed on the status and download
+endpoints, not as running forever.
+"""
+
+from datetime import timedelta
+
+from django.test import TransactionTestCase, override_settings
+from django.utils import timezone
+
+from equipment_api import models
+from equipment_api.benchmarking import api_client, upload
+from equipment_api.models import ReportJob
+from equipment_api.report_jobs import STALE_JOB_ERROR
+from equipment_api.synthetic import csv_bytes
+
+
+@override_settings(REPORT_JOB_STALE_SECONDS=60, INGEST_COORDINATOR=False, UPLOAD_RATE_LIMIT=None)
+class StaleReportJobTests(TransactionTestCase):
+
+    def setUp(self):
+        models._lookup_cache.clear()
+        self.client = api_client()
+        response = upload(self.client, csv_bytes(10))
+        self.assertEqual(response.status_code, 200, response.content)
+        # A job left running by a worker that died, as no worker picks it up here
+        self.job = ReportJob.objects.create(
+            dataset_id=response.json()['dataset_id'], status=ReportJob.STATUS_RUNNING, rows_total=10
+        )
+
+    def _last_progress(self, seconds_ago):
+        # update() leaves auto_now alone
+        ReportJob.objects.filter(id=self.job.id).update(updated_at=timezone.now() - timedelta(seconds=seconds_ago))
+
+    def test_status_of_a_stale_job(self):
+        self._last_progress(120)
+        response = self.client.get(f'/api/report/jobs/{self.job.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'failed')
+        self.assertEqual(response.json()['error'], STALE_JOB_ERROR)
+        self.assertEqual(ReportJob.objects.get(id=self.job.id).status, ReportJob.STATUS_FAILED)
+
+    def test_download_of_a_stale_job(self):
+        self._last_progress(120)
+        response = self.client.get(f'/api/report/jobs/{self.job.id}/download/')
+        self.assertEqual(response.status_code, 409)
+        self.assertIn('failed', response.json()['error'])
+
+    def test_job_still_reporting_progress(self):
+        self._last_progress(30)
+        response = self.client.get(f'/api/report/jobs/{self.job.id}/')
+        self.assertEqual(response.json()['status'], 'running')
+        self.assertEqual(ReportJob.objects.get(id=self.job.id).status, ReportJob.STATUS_RUNNING)
@@ -0,0 +1,156 @@
+"""
+Tag search (see search.py): the external-content FTS5 index follows inserts,
+renames and deletes of ``EquipmentName`` rows through the triggers of
+migration 0011, ``/api/equipment/search/`` lists only tags of retained
+datasets, and user text is escaped before it reaches ``MATCH``.
+"""
+
+import shutil
+import tempfile
+
+from django.test import TransactionTestCase, override_settings
+
+from equipment_api import models
+from equipment_api.benchmarking import api_client, upload
+from equipment_api.models import EquipmentName
+from equipment_api.search import match_expression, matching_name_ids
+from equipment_api.synthetic import HEADER
+
+FIRST_TAGS = ['Pump B-205', 'Valve B-201', 'Pump A-205', 'Reactor R-301']
+SECOND_TAGS = ['Pump A-205', 'Condenser "Q"-7']
+
+
+def _csv(tags):
+    lines = [','.join(HEADER)]
+    for tag in tags:
+        escaped = tag.replace('"', '""')
+        lines.append(f'"{escaped}",{tag.split()[0]},100.5,50.5,200.5')
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+def _indexed(text):
+    """Tags the FTS5 index matches for user search text, retained or not"""
+    return sorted(EquipmentName.objects.filter(id__in=matching_name_ids(match_expression(text))).values_list(
+        'name', flat=True
+    ))
+
+
+@override_settings(INGEST_COORDINATOR=False, UPLOAD_RATE_LIMIT=None)
+class SearchTestCase(TransactionTestCase):
+
+    def setUp(self):
+        models._lookup_cache.clear()
+        self.client = api_client()
+
+    def _search(self, q, **params):
+        response = self.client.get('/api/equipment/search/', {'q': q, **params})
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def _found(self, q):
+        return sorted(result['equipment_name'] for result in self._search(q)['results'])
+
+
+class SearchIndexTriggerTests(SearchTestCase):
+
+    def test_insert(self):
+        EquipmentName.objects.create(name='Pump Z-900')
+        self.assertEqual(_indexed('Z-9'), ['Pump Z-900'])
+
+    def test_rename(self):
+        name = EquipmentName.objects.create(name='Pump Z-900')
+        name.name = 'Valve Y-100'
+        name.save()
+        self.assertEqual(_indexed('Z-9'), [])
+        self.assertEqual(_indexed('pump'), [])
+        self.assertEqual(_indexed('Y-1'), ['Valve Y-100'])
+
+    def test_delete(self):
+        name = EquipmentName.objects.create(name='Pump Z-900')
+        name.delete()
+        self.assertEqual(_indexed('Z-9'), [])
+        # The index lost the row as well as its words: a new tag reusing them is found once
+        EquipmentName.objects.create(name='Pump Z-901')
+        self.assertEqual(_indexed('Z-9'), ['Pump Z-901'])
+
+    def test_bulk_insert_at_ingest(self):
+        self.assertEqual(upload(self.client, _csv(FIRST_TAGS)).status_code, 200)
+        self.assertEqual(_indexed('B-2'), ['Pump B-205', 'Valve B-201'])
+
+
+@override_settings(DATASET_RETENTION=1)
+class SearchEndpointTests(SearchTestCase):
+
+    def setUp(self):
+        super().setUp()
+        response = upload(self.client, _csv(FIRST_TAGS))
+        self.assertEqual(response.status_code, 200, response.content)
+        self.first = response.json()['dataset_id']
+
+    def test_fragment(self):
+        self.assertEqual(self._found('B-2'), ['Pump B-205', 'Valve B-201'])
+        self.assertEqual(self._found('pump 205'), ['Pump A-205', 'Pump B-205'])
+        self.assertEqual(self._found('PUMP b-20'), ['Pump B-205'])
+
+    def test_results_list_their_datasets(self):
+        results = self._search('R-301')['results']
+        self.assertEqual([result['equipment_name'] for result in results], ['Reactor R-301'])
+        self.assertEqual([dataset['dataset_id'] for dataset in results[0]['datasets']], [self.first])
+        self.assertEqual(results[0]['datasets'][0]['row_count'], 1)
+
+    def test_query_syntax_is_escaped(self):
+        upload(self.client, _csv(FIRST_TAGS + SECOND_TAGS))
+        for q, expected in (
+            ('"Q"', ['Condenser "Q"-7']),
+            ('"Q"-7', ['Condenser "Q"-7']),
+            # FTS5 operators are words to look for, not operators
+            ('B-2 OR', []),
+            ('NEAR(pump', []),
+            ('pump*', ['Pump A-205', 'Pump B-205']),
+            ('valve^ -b', ['Valve B-201']),
+        ):
+            with self.subTest(q=q):
+                self.assertEqual(self._found(q), expected)
+
+    def test_search_without_words(self):
+        for q in ('"', '""', '-', '*', '   ', ''):
+            with self.subTest(q=q):
+                response = self.client.get('/api/equipment/search/', {'q': q})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
+
+    def test_evicted_tags_are_not_found(self):
+        # Retention keeps one dataset: the second upload evicts the first
+        response = upload(self.client, _csv(SECOND_TAGS))
+        self.assertEqual(response.status_code, 200, response.content)
+        second = response.json()['dataset_id']
+
+        self.assertEqual(self._found('B-2'), [])
+        # Still interned and indexed, but without rows in a retained dataset
+        self.assertEqual(_indexed('B-2'), ['Pump B-205', 'Valve B-201'])
+        results = self._search('A-205')['results']
+        self.assertEqual([dataset['dataset_id'] for dataset in results[0]['datasets']], [second])
+
+    def test_paging(self):
+        page = self._search('b', page_size=1)
+        self.assertEqual(page['count'], 2)
+        self.assertIsNone(page['previous'])
+        following = self.client.get(page['next']).json()
+        self.assertIsNone(following['next'])
+        self.assertEqual(
+            sorted(result['equipment_name'] for result in page['results'] + following['results']),
+            ['Pump B-205', 'Valve B-201']
+        )
+
+
+class ArchivedSearchTests(SearchTestCase):
+
+    def test_archived_tags_are_still_found(self):
+        archive_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, archive_root, ignore_errors=True)
+        with override_settings(DATASET_ARCHIVE=True, ARCHIVE_ROOT=archive_root, DATASET_RETENTION=1):
+            first = upload(self.client, _csv(FIRST_TAGS)).json()['dataset_id']
+            upload(self.client, _csv(SECOND_TAGS))
+            results = self._search('B-205')['results']
+        self.assertEqual([result['equipment_name'] for result in results], ['Pump B-205'])
+        self.assertEqual([dataset['dataset_id'] for dataset in results[0]['datasets']], [first])
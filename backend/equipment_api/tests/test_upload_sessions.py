@@ -0,0 +1,84 @@
+"""
+Resumable uploads (see upload_sessions.py): finalizing a session whose
+assembled file misses its SHA-256 fails it for good, while a session missing
+chunks stays open for them.
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+
+from django.test import TransactionTestCase, override_settings
+
+from equipment_api import models
+from equipment_api.benchmarking import api_client
+from equipment_api.synthetic import csv_bytes
+
+CHUNK_SIZE = 1024
+
+
+class UploadSessionTests(TransactionTestCase):
+
+    def setUp(self):
+        models._lookup_cache.clear()
+        self.sessions_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.sessions_root, ignore_errors=True)
+        settings = override_settings(
+            UPLOAD_SESSIONS_ROOT=self.sessions_root, INGEST_COORDINATOR=False, UPLOAD_RATE_LIMIT=None
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.client = api_client()
+        self.content = csv_bytes(50)
+
+    def _open(self, sha256):
+        response = self.client.post('/api/uploads/', {
+            'filename': 'resumable.csv', 'size': len(self.content), 'chunk_size': CHUNK_SIZE, 'sha256': sha256,
+        })
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.json()
+
+    def _send(self, session, indexes):
+        for index in indexes:
+            chunk = self.content[index * CHUNK_SIZE:(index + 1) * CHUNK_SIZE]
+            response = self.client.put(
+                f"/api/uploads/{session['id']}/chunks/{index}/", chunk, content_type='application/octet-stream',
+                HTTP_X_CHUNK_SHA256=hashlib.sha256(chunk).hexdigest(),
+            )
+            self.assertEqual(response.status_code, 200, response.content)
+
+    def _status(self, session):
+        return self.client.get(f"/api/uploads/{session['id']}/").json()
+
+    def test_checksum_mismatch_fails_the_session(self):
+        session = self._open(hashlib.sha256(b'something else').hexdigest())
+        self._send(session, range(session['chunk_count']))
+
+        response = self.client.post(f"/api/uploads/{session['id']}/finalize/")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('SHA-256', response.json()['error'])
+
+        current = self._status(session)
+        self.assertEqual(current['status'], 'failed')
+        self.assertIn('SHA-256', current['error'])
+        self.assertFalse(os.path.exists(os.path.join(self.sessions_root, session['id'])))
+        # Nothing more is accepted; the client has to open a new session
+        response = self.client.post(f"/api/uploads/{session['id']}/finalize/")
+        self.assertEqual(response.status_code, 409)
+
+    def test_missing_chunks_keep_the_session_open(self):
+        session = self._open(hashlib.sha256(self.content).hexdigest())
+        self._send(session, range(1, session['chunk_count']))
+
+        response = self.client.post(f"/api/uploads/{session['id']}/finalize/")
+        self.assertEqual(response.status_code, 400)
+        current = self._status(session)
+        self.assertEqual(current['status'], 'open')
+        self.assertEqual(current['missing_chunks'], [0])
+
+        self._send(session, [0])
+        response = self.client.post(f"/api/uploads/{session['id']}/finalize/")
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['summary']['total_count'], 50)
+        self.assertEqual(self._status(session)['status'], 'done')
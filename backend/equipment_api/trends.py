@@ -0,0 +1,65 @@
+"""
+Per-equipment trends across uploads.
+
+An equipment's identity is its interned tag (``EquipmentName``): ``Pump
+B-205`` maps to the same id in every upload. At ingest each dataset is grouped
+by identity and one ``EquipmentRollup`` row per identity holds its row count
+and the mean, minimum and maximum of each reading. Rollups are inserted with
+the dataset and cascade away with it when retention evicts it, so they always
+cover exactly the stored datasets.
+
+A trend reads one identity's rollups oldest first over the (name, upload
+time) index: one row per dataset the equipment appears in, however large the
+datasets are.
+"""
+
+from .derived import READING_COLUMNS
+
+ROLLUP_STATS = ('avg', 'min', 'max')
+# Rollup fields per reading column, e.g. 'pressure' -> ['pressure_avg', 'pressure_min', 'pressure_max']
+ROLLUP_FIELDS = {column: [f'{column}_{stat}' for stat in ROLLUP_STATS] for column in READING_COLUMNS}
+PARAMETER_PARAM = 'parameter'
+
+
+class InvalidTrendQuery(ValueError):
+    """An unknown equipment or parameter in a trend request"""
+
+
+def compute_rollups(arrays):
+    """Per-identity aggregates of a dataset's ``DatasetArrays``.
+
+    Returns (name, row count, {rollup field: value}) tuples in order of first
+    occurrence. Uploaded rows always carry every reading.
+    """
+    import numpy as np
+
+    if not len(arrays.name_codes):
+        return []
+    # Group the rows of each name together, then reduce each group in one pass per column
+    order = np.argsort(arrays.name_codes, kind='stable')
+    codes = arrays.name_codes[order]
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    counts = np.diff(np.r_[starts, len(codes)])
+
+    columns = {}
+    for column, (avg_field, min_field, max_field) in ROLLUP_FIELDS.items():
+        values = arrays.readings[column][order]
+        columns[avg_field] = (np.add.reduceat(values, starts) / counts).tolist()
+        columns[min_field] = np.minimum.reduceat(values, starts).tolist()
+        columns[max_field] = np.maximum.reduceat(values, starts).tolist()
+
+    fields = list(columns)
+    return [
+        (arrays.names[code], count, dict(zip(fields, values)))
+        for code, count, values in zip(codes[starts].tolist(), counts.tolist(), zip(*columns.values()))
+    ]
+
+
+def trend_fields(params):
+    """Rollup fields for ``?parameter=<column>`` in ``params``, or for every column"""
+    parameter = params.get(PARAMETER_PARAM)
+    if not parameter:
+        return [field for fields in ROLLUP_FIELDS.values() for field in fields]
+    if parameter not in ROLLUP_FIELDS:
+        raise InvalidTrendQuery(f'Unknown parameter {parameter}; choose from {", ".join(ROLLUP_FIELDS)}')
+    return ROLLUP_FIELDS[parameter]
@@ -0,0 +1,150 @@
+"""
+Resumable chunked uploads.
+
+A client opens an ``UploadSession`` for a file of known size, PUTs it in
+numbered chunks (each with its SHA-256) in any order and as often as needed,
+asks which byte ranges have arrived, and finalizes. Chunks are written to
+``UPLOAD_SESSIONS_ROOT/<session id>/`` by whichever worker receives them, so
+an interrupted transfer only resends what is missing. Finalizing assembles
+the chunks into one file on local disk, checks the whole-file checksum when
+one was declared, and only then parses and ingests the CSV. Sessions left
+untouched for ``UPLOAD_SESSION_TTL`` seconds are deleted with their chunks.
+"""
+
+import hashlib
+import os
+import re
+import shutil
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .columnar import columnar_format
+from .compression import upload_compression
+from .models import UploadSession
+from .parsing import UploadRejected
+
+_CHUNK_FILE = re.compile(r'(\d{6})\.part')
+_SHA256 = re.compile(r'[0-9a-f]{64}')
+COPY_BUFFER_SIZE = 1024 * 1024
+
+
+class ChunkRejected(ValueError):
+    """The session or chunk request is invalid; the message is returned to the client as-is"""
+
+
+class ChecksumMismatch(ChunkRejected):
+    """The assembled file does not match the session's SHA-256; some stored chunk is wrong"""
+
+
+def session_dir(session):
+    return os.path.join(settings.UPLOAD_SESSIONS_ROOT, str(session.id))
+
+
+def chunk_path(session, index):
+    return os.path.join(session_dir(session), f'{index:06d}.part')
+
+
+def expire_stale_sessions():
+    """Delete sessions nobody has touched within ``UPLOAD_SESSION_TTL``, with their chunks"""
+    cutoff = timezone.now() - timedelta(seconds=settings.UPLOAD_SESSION_TTL)
+    stale = list(UploadSession.objects.filter(updated_at__lt=cutoff).order_by())
+    for session in stale:
+        discard_chunks(session)
+    if stale:
+        UploadSession.objects.filter(id__in=[session.id for session in stale]).delete()
+
+
+def create_session(user, filename, size, chunk_size=None, sha256=''):
+    """Open a session for a ``size``-byte file, validating the declared parameters"""
+    chunk_size = chunk_size or settings.UPLOAD_CHUNK_SIZE
+    sha256 = (sha256 or '').lower()
+    try:
+        columnar_format(filename) or upload_compression(filename)
+    except UploadRejected as e:
+        raise ChunkRejected(str(e))
+    # Finalizing admits the whole file at once (see admission.py)
+    max_size = min(settings.UPLOAD_SESSION_MAX_BYTES, settings.UPLOAD_MAX_INFLIGHT_BYTES)
+    if not 0 < size <= max_size:
+        raise ChunkRejected(f'size must be between 1 and {max_size} bytes')
+    if not 0 < chunk_size <= settings.UPLOAD_CHUNK_MAX_SIZE:
+        raise ChunkRejected(f'chunk_size must be between 1 and {settings.UPLOAD_CHUNK_MAX_SIZE} bytes')
+    if sha256 and not _SHA256.fullmatch(sha256):
+        raise ChunkRejected('sha256 must be a hex-encoded SHA-256 digest')
+
+    expire_stale_sessions()
+    session = UploadSession.objects.create(
+        user=user, filename=filename[:255], size=size, chunk_size=chunk_size, sha256=sha256
+    )
+    os.makedirs(session_dir(session), exist_ok=True)
+    return session
+
+
+def store_chunk(session, index, data, sha256):
+    """Verify one chunk against its length and checksum and write it atomically.
+
+    Storing a chunk again (a retry after a lost response) replaces it.
+    """
+    if not 0 <= index < session.chunk_count:
+        raise ChunkRejected(f'Chunk index must be between 0 and {session.chunk_count - 1}')
+    expected_length = session.chunk_length(index)
+    if len(data) != expected_length:
+        raise ChunkRejected(f'Chunk {index} must be {expected_length} bytes, got {len(data)}')
+    if hashlib.sha256(data).hexdigest() != (sha256 or '').lower():
+        raise ChunkRejected(f'Chunk {index} does not match its SHA-256 checksum')
+
+    path = chunk_path(session, index)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial_path = f'{path}.{os.getpid()}.tmp'
+    with open(partial_path, 'wb') as f:
+        f.write(data)
+    os.replace(partial_path, path)
+    UploadSession.objects.filter(id=session.id).update(updated_at=timezone.now())
+
+
+def received_chunks(session):
+    """Indexes of the chunks stored so far, in order"""
+    try:
+        names = os.listdir(session_dir(session))
+    except FileNotFoundError:
+        return []
+    return sorted(int(match.group(1)) for match in map(_CHUNK_FILE.fullmatch, names) if match)
+
+
+def received_ranges(session, chunks=None):
+    """Stored bytes as ``[start, end)`` ranges, adjacent chunks merged"""
+    ranges = []
+    for index in received_chunks(session) if chunks is None else chunks:
+        start = index * session.chunk_size
+        end = start + session.chunk_length(index)
+        if ranges and ranges[-1][1] == start:
+            ranges[-1][1] = end
+        else:
+            ranges.append([start, end])
+    return ranges
+
+
+def assemble(session):
+    """Concatenate every chunk into ``upload.csv`` in the session directory and return its path"""
+    missing = sorted(set(range(session.chunk_count)) - set(received_chunks(session)))
+    if missing:
+        raise ChunkRejected(f'{len(missing)} chunk(s) missing, first missing: {missing[0]}')
+
+    path = os.path.join(session_dir(session), 'upload.csv')
+    digest = hashlib.sha256()
+    with open(path, 'wb') as output:
+        for index in range(session.chunk_count):
+            with open(chunk_path(session, index), 'rb') as chunk:
+                while block := chunk.read(COPY_BUFFER_SIZE):
+                    digest.update(block)
+                    output.write(block)
+    if session.sha256 and digest.hexdigest() != session.sha256:
+        os.remove(path)
+        raise ChecksumMismatch('Assembled file does not match its SHA-256 checksum')
+    return path
+
+
+def discard_chunks(session):
+    """Remove a session's chunks and assembled file"""
+    shutil.rmtree(session_dir(session), ignore_errors=True)
@@ -5,8 +5,22 @@ urlpatterns = [
     path('auth/login/', views.login_view, name='login'),
     path('auth/logout/', views.logout_view, name='logout'),
     path('upload/', views.upload_csv, name='upload_csv'),
+    path('uploads/', views.upload_session_create, name='upload_session_create'),
+    path('uploads/<uuid:session_id>/', views.upload_session_status, name='upload_session_status'),
+    path('uploads/<uuid:session_id>/chunks/<int:index>/', views.upload_session_chunk, name='upload_session_chunk'),
+    path('uploads/<uuid:session_id>/finalize/', views.upload_session_finalize, name='upload_session_finalize'),
     path('equipment/', views.equipment_list, name='equipment_list'),
+    path('equipment/search/', views.equipment_search, name='equipment_search'),
+    path('equipment/trend/', views.equipment_trend, name='equipment_trend'),
+    path('anomalies/', views.anomaly_list, name='anomaly_list'),
+    path('alerts/', views.alert_list, name='alert_list'),
+    path('alerts/rules/', views.alert_rule_list, name='alert_rule_list'),
+    path('alerts/rules/<int:rule_id>/', views.alert_rule_detail, name='alert_rule_detail'),
     path('summary/', views.summary_view, name='summary'),
     path('history/', views.history_view, name='history'),
     path('report/pdf/', views.generate_pdf_report, name='generate_pdf_report'),
+    path('report/jobs/', views.report_job_create, name='report_job_create'),
+    path('report/jobs/<int:job_id>/', views.report_job_status, name='report_job_status'),
+    path('report/jobs/<int:job_id>/download/', views.report_job_download, name='report_job_download'),
+    path('metrics/', views.metrics_view, name='metrics'),
 ]
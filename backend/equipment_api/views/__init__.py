@@ -0,0 +1,14 @@
+"""
+API views, split by concern. Only the upload and report modules need the
+heavy dependencies, and they import them on first use.
+"""
+
+from .alerts import alert_rule_list, alert_rule_detail, alert_list
+from .auth import login_view, logout_view
+from .datasets import equipment_list, equipment_search, equipment_trend, anomaly_list, summary_view, history_view
+from .metrics import metrics_view
+from .reports import generate_pdf_report, report_job_create, report_job_status, report_job_download
+from .upload import upload_csv
+from .upload_sessions import (
+    upload_session_create, upload_session_status, upload_session_chunk, upload_session_finalize
+)
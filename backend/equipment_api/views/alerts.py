@@ -0,0 +1,101 @@
+"""
+Alert rules and the alerts they raised at ingest (see ``equipment_api.alerts``).
+
+Rules apply to datasets uploaded after they change; ``manage.py
+evaluate_alerts`` re-evaluates stored datasets.
+"""
+
+from rest_framework import status, permissions
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+
+from ..archive import DatasetUnavailable, read_hot
+from ..models import Alert, AlertRule, DatasetUpload
+from ..serializers import AlertRuleSerializer, AlertSerializer
+
+
+@api_view(['GET', 'POST'])
+@permission_classes([permissions.IsAuthenticated])
+def alert_rule_list(request):
+    """List the alert rules, or create one"""
+    if request.method == 'GET':
+        serializer = AlertRuleSerializer(AlertRule.objects.all(), many=True)
+        return Response(serializer.data)
+
+    serializer = AlertRuleSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(
+            {'error': serializer.errors},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    serializer.save()
+    return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+@api_view(['GET', 'PUT', 'PATCH', 'DELETE'])
+@permission_classes([permissions.IsAuthenticated])
+def alert_rule_detail(request, rule_id):
+    """Get, update or delete one alert rule; deleting it deletes its alerts"""
+    rule = AlertRule.objects.filter(id=rule_id).first()
+    if rule is None:
+        return Response(
+            {'error': 'Alert rule not found'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+    if request.method == 'GET':
+        return Response(AlertRuleSerializer(rule).data)
+    if request.method == 'DELETE':
+        rule.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    serializer = AlertRuleSerializer(rule, data=request.data, partial=request.method == 'PATCH')
+    if not serializer.is_valid():
+        return Response(
+            {'error': serializer.errors},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    serializer.save()
+    return Response(serializer.data)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def alert_list(request):
+    """Get the alerts raised for a specific dataset or latest dataset, in row order"""
+    try:
+        dataset_id = request.GET.get('dataset_id')
+
+        if dataset_id:
+            try:
+                dataset = DatasetUpload.objects.get(id=dataset_id)
+            except DatasetUpload.DoesNotExist:
+                return Response(
+                    {'error': 'Dataset not found'},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+        else:
+            # Get latest dataset
+            dataset = DatasetUpload.objects.order_by('-upload_timestamp').first()
+            if not dataset:
+                return Response({'dataset_id': None, 'count': 0, 'results': []})
+
+        # One query over the (dataset, equipment) index, rules and equipment joined in
+        alerts = Alert.objects.filter(dataset=dataset).select_related('rule', 'equipment')
+        results = read_hot(dataset, lambda: AlertSerializer(alerts.all(), many=True).data)
+        return Response({
+            'dataset_id': dataset.id,
+            'count': len(results),
+            'results': results
+        })
+
+    except DatasetUnavailable as e:
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+    except Exception as e:
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
@@ -0,0 +1,302 @@
+"""
+Equipment, summary and history reads
+"""
+
+from rest_framework import status, permissions
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+
+from ..archive import DatasetUnavailable, read_hot
+from ..derived import InvalidMetricQuery, filter_and_order
+from ..models import Equipment, EquipmentName, EquipmentRollup, DatasetUpload
+from ..search import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, SEARCH_PARAM, InvalidSearch, match_expression, search_names
+)
+from ..serializers import EquipmentSerializer, DatasetUploadSerializer
+from ..trends import InvalidTrendQuery, trend_fields
+
+HISTORY_PAGE_SIZE = 5
+
+
+def _int_param(request, name, default, minimum=1, maximum=None):
+    """Parse a positive integer query parameter, clamping it to ``maximum``"""
+    try:
+        value = max(int(request.GET.get(name, default)), minimum)
+    except (TypeError, ValueError):
+        value = default
+    return min(value, maximum) if maximum else value
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def equipment_list(request):
+    """Get equipment list for a specific dataset or latest dataset.
+
+    Readings and derived metrics take range filters (``?pressure_zscore__gte=2``)
+    and an ordering (``?order_by=-flowrate_type_deviation``).
+    """
+    try:
+        dataset_id = request.GET.get('dataset_id')
+        
+        if dataset_id:
+            try:
+                dataset = DatasetUpload.objects.get(id=dataset_id)
+            except DatasetUpload.DoesNotExist:
+                return Response(
+                    {'error': 'Dataset not found'}, 
+                    status=status.HTTP_404_NOT_FOUND
+                )
+        else:
+            # Get latest dataset
+            dataset = DatasetUpload.objects.order_by('-upload_timestamp').first()
+            if not dataset:
+                return Response([])
+        
+        try:
+            equipment = filter_and_order(Equipment.objects.filter(dataset=dataset), request.GET)
+        except InvalidMetricQuery as e:
+            return Response(
+                {'error': str(e)}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # all(): a read that runs again must not reuse the rows cached by the previous one
+        return Response(read_hot(dataset, lambda: EquipmentSerializer(equipment.all(), many=True).data))
+        
+    except DatasetUnavailable as e:
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+    except Exception as e:
+        return Response(
+            {'error': str(e)}, 
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def anomaly_list(request):
+    """Get the rows flagged at ingest (see anomalies.py) for a specific dataset or latest dataset, worst first"""
+    try:
+        dataset_id = request.GET.get('dataset_id')
+        
+        if dataset_id:
+            try:
+                dataset = DatasetUpload.objects.get(id=dataset_id)
+            except DatasetUpload.DoesNotExist:
+                return Response(
+                    {'error': 'Dataset not found'}, 
+                    status=status.HTTP_404_NOT_FOUND
+                )
+        else:
+            # Get latest dataset
+            dataset = DatasetUpload.objects.order_by('-upload_timestamp').first()
+            if not dataset:
+                return Response({'dataset_id': None, 'count': 0, 'results': []})
+        
+        # Served from the partial index over flagged rows
+        anomalies = Equipment.objects.filter(dataset=dataset, anomaly_score__isnull=False).order_by('-anomaly_score', 'id')
+        results = read_hot(dataset, lambda: EquipmentSerializer(anomalies.all(), many=True).data)
+        return Response({
+            'dataset_id': dataset.id,
+            'count': len(results),
+            'results': results
+        })
+        
+    except DatasetUnavailable as e:
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+    except Exception as e:
+        return Response(
+            {'error': str(e)}, 
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def summary_view(request):
+    """Get analytics summary for a specific dataset or latest dataset"""
+    try:
+        dataset_id = request.GET.get('dataset_id')
+        
+        if dataset_id:
+            try:
+                dataset = DatasetUpload.objects.get(id=dataset_id)
+            except DatasetUpload.DoesNotExist:
+                return Response(
+                    {'error': 'Dataset not found'}, 
+                    status=status.HTTP_404_NOT_FOUND
+                )
+        else:
+            # Get latest dataset
+            dataset = DatasetUpload.objects.order_by('-upload_timestamp').first()
+            if not dataset:
+                return Response({
+                    'total_count': 0,
+                    'avg_flowrate': 0.0,
+                    'avg_pressure': 0.0,
+                    'avg_temperature': 0.0,
+                    'type_distribution': {}
+                })
+        
+        response_data = {
+            'total_count': dataset.total_count,
+            'avg_flowrate': dataset.avg_flowrate,
+            'avg_pressure': dataset.avg_pressure,
+            'avg_temperature': dataset.avg_temperature,
+            'type_distribution': dataset.type_distribution
+        }
+        
+        return Response(response_data)
+        
+    except Exception as e:
+        return Response(
+            {'error': str(e)}, 
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def history_view(request):
+    """Get the upload records, newest first, 5 per page (``?page=``, ``?page_size=``).
+
+    Archived datasets are listed too; each record's ``storage`` tells them apart.
+    """
+    try:
+        page = _int_param(request, 'page', 1)
+        page_size = _int_param(request, 'page_size', HISTORY_PAGE_SIZE, maximum=MAX_PAGE_SIZE)
+        count = DatasetUpload.objects.count()
+        offset = (page - 1) * page_size
+        datasets = DatasetUpload.objects.order_by('-upload_timestamp')[offset:offset + page_size]
+
+        def page_url(number):
+            return request.build_absolute_uri(f"{request.path}?page={number}&page_size={page_size}")
+
+        return Response({
+            'count': count,
+            'next': page_url(page + 1) if page * page_size < count else None,
+            'previous': page_url(page - 1) if page > 1 else None,
+            'results': DatasetUploadSerializer(datasets, many=True).data
+        })
+        
+    except Exception as e:
+        return Response(
+            {'error': str(e)}, 
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def equipment_trend(request):
+    """Get one equipment's readings across the stored uploads, oldest first.
+
+    The equipment is chosen by tag (``?name=Pump B-205``) or by the
+    ``equipment_identity`` of its rows (``?identity=42``); ``?parameter=pressure``
+    limits the points to one reading. Served from the rollups written at ingest
+    (see trends.py).
+    """
+    try:
+        name = request.GET.get('name')
+        identity = request.GET.get('identity')
+        if not name and not identity:
+            return Response(
+                {'error': 'Pass the equipment as ?name= or ?identity='},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            fields = trend_fields(request.GET)
+        except InvalidTrendQuery as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if name:
+            identity = EquipmentName.objects.id_for(name)
+        else:
+            try:
+                name = EquipmentName.objects.name_for(int(identity))
+                identity = int(identity)
+            except (KeyError, ValueError):
+                identity = None
+        if identity is None:
+            return Response(
+                {'error': 'Equipment not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        points = list(
+            EquipmentRollup.objects.filter(name_id=identity)
+            .values('dataset_id', 'uploaded_at', 'row_count', *fields)
+        )
+        return Response({
+            'equipment_identity': identity,
+            'equipment_name': name,
+            'count': len(points),
+            'points': points
+        })
+
+    except Exception as e:
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def equipment_search(request):
+    """Find equipment by tag fragments (``?q=B-2``) across the retained datasets, best match first.
+
+    Paginated like the async equipment page (``?page=``, ``?page_size=``).
+    Each result lists the datasets the equipment appears in; see search.py.
+    """
+    try:
+        try:
+            expression = match_expression(request.GET.get(SEARCH_PARAM, ''))
+        except InvalidSearch as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        page = _int_param(request, 'page', 1)
+        page_size = _int_param(request, 'page_size', DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE)
+        count, names = search_names(expression, (page - 1) * page_size, page_size)
+
+        # One query over the (name, uploaded_at) index for the datasets of the whole page
+        datasets = {name_id: [] for name_id, _ in names}
+        rollups = EquipmentRollup.objects.filter(name_id__in=list(datasets)).values_list(
+            'name_id', 'dataset_id', 'uploaded_at', 'row_count'
+        ) if names else []
+        for name_id, dataset_id, uploaded_at, row_count in rollups:
+            datasets[name_id].append({'dataset_id': dataset_id, 'uploaded_at': uploaded_at, 'row_count': row_count})
+
+        extra = request.GET.copy()
+        for key in ('page', 'page_size'):
+            extra.pop(key, None)
+
+        def page_url(number):
+            return request.build_absolute_uri(f"{request.path}?{extra.urlencode()}&page={number}&page_size={page_size}")
+
+        return Response({
+            'count': count,
+            'next': page_url(page + 1) if page * page_size < count else None,
+            'previous': page_url(page - 1) if page > 1 else None,
+            'results': [
+                {'equipment_identity': name_id, 'equipment_name': name, 'datasets': datasets[name_id]}
+                for name_id, name in names
+            ]
+        })
+
+    except Exception as e:
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
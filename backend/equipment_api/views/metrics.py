@@ -0,0 +1,16 @@
+"""
+Prometheus metrics endpoint
+"""
+
+from django.http import HttpResponse
+from rest_framework import permissions
+from rest_framework.decorators import api_view, permission_classes
+
+from ..metrics import render_prometheus
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def metrics_view(request):
+    """Expose request and upload metrics from all workers in Prometheus text format"""
+    return HttpResponse(render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,147 @@
+"""
+PDF report download and the report job endpoints
+"""
+
+import os
+from django.http import HttpResponse, FileResponse
+from rest_framework import status, permissions
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+
+from ..archive import DatasetUnavailable, read_hot
+from ..models import Equipment, DatasetUpload, ReportJob
+from ..serializers import ReportJobSerializer
+from ..reports import build_equipment_report
+from ..report_jobs import expire_if_stale, submit_report
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def generate_pdf_report(request):
+    """Generate PDF report for a specific dataset or latest dataset"""
+    try:
+        dataset_id = request.GET.get('dataset_id')
+        
+        if dataset_id:
+            try:
+                dataset = DatasetUpload.objects.get(id=dataset_id)
+            except DatasetUpload.DoesNotExist:
+                return Response(
+                    {'error': 'Dataset not found'}, 
+                    status=status.HTTP_404_NOT_FOUND
+                )
+        else:
+            # Get latest dataset
+            dataset = DatasetUpload.objects.order_by('-upload_timestamp').first()
+            if not dataset:
+                return Response(
+                    {'error': 'No data available'}, 
+                    status=status.HTTP_404_NOT_FOUND
+                )
+        
+        def render():
+            # Create PDF response
+            response = HttpResponse(content_type='application/pdf')
+            response['Content-Disposition'] = f'attachment; filename="equipment_report_{dataset.id}.pdf"'
+            build_equipment_report(dataset, Equipment.objects.filter(dataset=dataset), response)
+            return response
+        
+        return read_hot(dataset, render)
+        
+    except DatasetUnavailable as e:
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+    except Exception as e:
+        return Response(
+            {'error': f'PDF generation failed: {str(e)}'}, 
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def report_job_create(request):
+    """Queue PDF report generation for a specific dataset or latest dataset"""
+    try:
+        dataset_id = request.data.get('dataset_id') or request.GET.get('dataset_id')
+        
+        if dataset_id:
+            try:
+                dataset = DatasetUpload.objects.get(id=dataset_id)
+            except DatasetUpload.DoesNotExist:
+                return Response(
+                    {'error': 'Dataset not found'}, 
+                    status=status.HTTP_404_NOT_FOUND
+                )
+        else:
+            dataset = DatasetUpload.objects.order_by('-upload_timestamp').first()
+            if not dataset:
+                return Response(
+                    {'error': 'No data available'}, 
+                    status=status.HTTP_404_NOT_FOUND
+                )
+        
+        job, created = submit_report(dataset)
+        serializer = ReportJobSerializer(job, context={'request': request})
+        return Response(
+            {**serializer.data, 'coalesced': not created},
+            status=status.HTTP_202_ACCEPTED
+        )
+        
+    except Exception as e:
+        return Response(
+            {'error': f'Report request failed: {str(e)}'}, 
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def report_job_status(request, job_id):
+    """Get progress of a queued report"""
+    try:
+        job = ReportJob.objects.get(id=job_id)
+    except ReportJob.DoesNotExist:
+        return Response(
+            {'error': 'Report job not found'}, 
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    expire_if_stale(job)
+    serializer = ReportJobSerializer(job, context={'request': request})
+    return Response(serializer.data)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def report_job_download(request, job_id):
+    """Download the PDF produced by a finished report job"""
+    try:
+        job = ReportJob.objects.get(id=job_id)
+    except ReportJob.DoesNotExist:
+        return Response(
+            {'error': 'Report job not found'}, 
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    expire_if_stale(job)
+    if job.status != ReportJob.STATUS_DONE:
+        return Response(
+            {'error': f'Report is not ready (status: {job.status})'}, 
+            status=status.HTTP_409_CONFLICT
+        )
+    
+    if not os.path.exists(job.file_path):
+        return Response(
+            {'error': 'Report file is no longer available'}, 
+            status=status.HTTP_410_GONE
+        )
+    
+    return FileResponse(
+        open(job.file_path, 'rb'),
+        as_attachment=True,
+        filename=f"equipment_report_{job.dataset_id}.pdf",
+        content_type='application/pdf'
+    )
@@ -0,0 +1,149 @@
+"""
+CSV upload endpoint. Parsing and validation live in ``equipment_api.parsing``;
+pandas is only imported for uploads the csv engine does not take. Gzip, bzip2
+and zstd compressed CSVs are accepted too, and so are Parquet and Arrow files. Uploads
+are admitted (``equipment_api.admission``) before their body is read.
+"""
+
+from django.core.files.uploadedfile import InMemoryUploadedFile, TemporaryUploadedFile
+from rest_framework import status, permissions
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
+from rest_framework.response import Response
+
+from ..admission import UploadAdmissionDenied, UploadRateThrottle, UploadTooLarge, admit_upload
+from ..columnar import columnar_format, parse_columnar
+from ..compression import open_decompressed, upload_compression
+from ..ingest import ingest
+from ..metrics import stage
+from ..parsing import UploadRejected, parse_upload, parse_upload_stream
+from ..sharding import parse_sharded, should_shard
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+@throttle_classes([UploadRateThrottle])
+def upload_csv(request):
+    """Upload CSV file and process equipment data"""
+    try:
+        ticket = admit_upload(int(request.META.get('CONTENT_LENGTH') or 0))
+    except UploadAdmissionDenied as e:
+        return admission_denied_response(e)
+    except UploadTooLarge as e:
+        return too_large_response(e)
+    with ticket:
+        return _process_upload(request)
+
+
+def admission_denied_response(error):
+    return Response(
+        {'error': str(error)},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers={'Retry-After': str(error.retry_after)}
+    )
+
+
+def too_large_response(error):
+    return Response(
+        {'error': str(error)},
+        status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    )
+
+
+def _process_upload(request):
+    try:
+        if 'file' not in request.FILES:
+            return Response(
+                {'error': 'No file provided'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        file = request.FILES['file']
+        
+        try:
+            columnar_format(file.name) or upload_compression(file.name)
+        except UploadRejected as e:
+            return Response(
+                {'error': str(e)}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        def read():
+            if isinstance(file, InMemoryUploadedFile):
+                file.seek(0)
+                data = file.read()
+                file.seek(0)
+                return data
+            return file.read()
+        
+        # Uploads over FILE_UPLOAD_MAX_MEMORY_SIZE are already on disk
+        path = file.temporary_file_path() if isinstance(file, TemporaryUploadedFile) else None
+        return process_csv_upload(file.name, read, path)
+        
+    except Exception as e:
+        return Response(
+            {'error': f'Upload failed: {str(e)}'}, 
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+def process_csv_upload(filename, read, path=None):
+    """Decode, parse, validate and ingest a CSV whose bytes ``read()`` returns.
+
+    Compressed uploads (``equipment_api.compression``) are decompressed as a
+    stream while they are parsed; Parquet and Arrow files
+    (``equipment_api.columnar``) are read as typed columns. A large plain CSV
+    stored on disk at ``path`` is parsed in shards by a process pool
+    (``equipment_api.sharding``) when that is enabled. Returns the
+    endpoint response: the dataset summary, or 400 when the upload cannot be
+    decompressed, decoded, parsed or validated. Ingest errors propagate.
+    """
+    # Read and validate CSV content
+    try:
+        file_format = columnar_format(filename)
+        codec = None if file_format else upload_compression(filename)
+        if file_format:
+            with stage('decode'):
+                data = read()
+            prepared = parse_columnar(filename, data, file_format)
+        elif codec:
+            data = read()
+            prepared = parse_upload_stream(filename, lambda: open_decompressed(data, codec))
+        else:
+            prepared = parse_sharded(filename, path) if path and should_shard(path) else None
+            if prepared is None:
+                # Read file content
+                with stage('decode'):
+                    content = read().decode('utf-8')
+                
+                # Parse and validate with the csv or the pandas engine
+                prepared = parse_upload(filename, content)
+        
+    except UploadRejected as e:
+        return Response(
+            {'error': str(e)}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    except Exception as e:
+        return Response(
+            {'error': f'Error parsing CSV: {str(e)}'}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    return dataset_summary_response(ingest(prepared))
+
+
+def dataset_summary_response(dataset):
+    # Return summary
+    summary = {
+        'total_count': dataset.total_count,
+        'avg_flowrate': dataset.avg_flowrate,
+        'avg_pressure': dataset.avg_pressure,
+        'avg_temperature': dataset.avg_temperature,
+        'type_distribution': dataset.type_distribution
+    }
+    
+    return Response({
+        'message': 'Upload successful',
+        'dataset_id': dataset.id,
+        'summary': summary
+    })
@@ -0,0 +1,204 @@
+"""
+Resumable chunked upload endpoints (see ``equipment_api.upload_sessions``).
+
+Chunks are PUT as the raw request body with their hex SHA-256 in the
+``X-Chunk-SHA256`` header. Finalizing runs the same admission, parsing and
+ingest as ``upload_csv`` and returns the same payload; finalizing a session
+that already completed returns its dataset again, so a client whose response
+was lost can simply retry.
+"""
+
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status, permissions
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
+from rest_framework.response import Response
+
+from ..admission import UploadAdmissionDenied, UploadRateThrottle, UploadTooLarge, admit_upload
+from ..events import INGEST_PROGRESS, publish
+from ..models import DatasetUpload, UploadSession
+from ..serializers import UploadSessionSerializer
+from ..upload_sessions import (
+    ChecksumMismatch, ChunkRejected, assemble, create_session, discard_chunks, received_chunks, store_chunk
+)
+from .upload import admission_denied_response, dataset_summary_response, process_csv_upload, too_large_response
+
+
+def _get_session(request, session_id):
+    """The caller's session, or None (other users' sessions are reported as not found)"""
+    return UploadSession.objects.filter(id=session_id, user=request.user).first()
+
+
+def _session_not_found():
+    return Response(
+        {'error': 'Upload session not found'},
+        status=status.HTTP_404_NOT_FOUND
+    )
+
+
+def _publish_progress(session, session_status, **fields):
+    publish(
+        INGEST_PROGRESS,
+        session_id=str(session.id),
+        status=session_status,
+        received_chunks=len(received_chunks(session)),
+        chunk_count=session.chunk_count,
+        **fields
+    )
+
+
+def _set_status(session, new_status, **fields):
+    # One write transaction for the status and its event
+    with transaction.atomic():
+        UploadSession.objects.filter(id=session.id).update(status=new_status, updated_at=timezone.now(), **fields)
+        _publish_progress(session, new_status, **fields)
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+@throttle_classes([UploadRateThrottle])
+def upload_session_create(request):
+    """Open a resumable upload for a CSV file of known size"""
+    try:
+        size = int(request.data.get('size'))
+        chunk_size = int(request.data['chunk_size']) if request.data.get('chunk_size') else None
+    except (TypeError, ValueError):
+        return Response(
+            {'error': 'size and chunk_size must be integers'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    try:
+        session = create_session(
+            request.user,
+            str(request.data.get('filename', '')),
+            size,
+            chunk_size,
+            str(request.data.get('sha256', ''))
+        )
+    except ChunkRejected as e:
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    serializer = UploadSessionSerializer(session, context={'request': request})
+    return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def upload_session_status(request, session_id):
+    """Get a resumable upload with the byte ranges received so far"""
+    session = _get_session(request, session_id)
+    if session is None:
+        return _session_not_found()
+
+    serializer = UploadSessionSerializer(session, context={'request': request})
+    return Response(serializer.data)
+
+
+@api_view(['PUT'])
+@permission_classes([permissions.IsAuthenticated])
+def upload_session_chunk(request, session_id, index):
+    """Store one numbered chunk of a resumable upload"""
+    session = _get_session(request, session_id)
+    if session is None:
+        return _session_not_found()
+    if session.status != UploadSession.STATUS_OPEN:
+        return Response(
+            {'error': f'Upload session is {session.status}'},
+            status=status.HTTP_409_CONFLICT
+        )
+
+    data = request.body
+    try:
+        store_chunk(session, index, data, request.headers.get('X-Chunk-SHA256'))
+    except ChunkRejected as e:
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    return Response({'index': index, 'size': len(data)})
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def upload_session_finalize(request, session_id):
+    """Assemble the chunks of a resumable upload, then parse and ingest it"""
+    session = _get_session(request, session_id)
+    if session is None:
+        return _session_not_found()
+
+    if session.status == UploadSession.STATUS_DONE:
+        dataset = DatasetUpload.objects.filter(id=session.dataset_id).first()
+        if dataset is None:
+            return Response(
+                {'error': 'The uploaded dataset has since been removed'},
+                status=status.HTTP_410_GONE
+            )
+        return dataset_summary_response(dataset)
+
+    # Only one request may finalize a session
+    with transaction.atomic():
+        claimed = UploadSession.objects.filter(id=session.id, status=UploadSession.STATUS_OPEN).update(
+            status=UploadSession.STATUS_FINALIZING, updated_at=timezone.now()
+        )
+        if claimed:
+            _publish_progress(session, UploadSession.STATUS_FINALIZING)
+    if not claimed:
+        return Response(
+            {'error': f'Upload session is {UploadSession.objects.get(id=session.id).status}'},
+            status=status.HTTP_409_CONFLICT
+        )
+
+    try:
+        ticket = admit_upload(session.size)
+    except UploadAdmissionDenied as e:
+        _set_status(session, UploadSession.STATUS_OPEN)
+        return admission_denied_response(e)
+    except UploadTooLarge as e:
+        # Admitted by create_session under a larger limit; it never fits now
+        _set_status(session, UploadSession.STATUS_FAILED, error=str(e))
+        discard_chunks(session)
+        return too_large_response(e)
+
+    with ticket:
+        try:
+            path = assemble(session)
+        except ChecksumMismatch as e:
+            # Each chunk matched its own checksum, so resending missing ones cannot fix it
+            _set_status(session, UploadSession.STATUS_FAILED, error=str(e))
+            discard_chunks(session)
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except ChunkRejected as e:
+            _set_status(session, UploadSession.STATUS_OPEN)
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        def read():
+            with open(path, 'rb') as f:
+                return f.read()
+
+        try:
+            response = process_csv_upload(session.filename, read, path)
+        except Exception as e:
+            # The chunks are kept, so finalizing can be retried
+            _set_status(session, UploadSession.STATUS_OPEN)
+            return Response(
+                {'error': f'Upload failed: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+    if response.status_code == status.HTTP_200_OK:
+        _set_status(session, UploadSession.STATUS_DONE, dataset_id=response.data['dataset_id'])
+    else:
+        _set_status(session, UploadSession.STATUS_FAILED, error=response.data['error'])
+    discard_chunks(session)
+    return response
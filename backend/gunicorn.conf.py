@@ -0,0 +1,22 @@
+"""
+gunicorn settings, read from the working directory (``backend/``).
+
+GUNICORN_PRELOAD=True loads the Django application and the heavy upload and
+report dependencies (``equipment_api.preload``) in the master before the
+workers are forked, so their pages are shared copy-on-write and workers
+start without importing anything. Code changes then need a full restart
+rather than a HUP, which only re-forks the workers.
+"""
+
+import os
+
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'False') == 'True'
+
+
+def when_ready(server):
+    if not server.cfg.preload_app:
+        return
+    from equipment_api.preload import freeze_heap, import_heavy_modules
+    import_heavy_modules()
+    freeze_heap()
+    server.log.info('Preloaded heavy modules in the master')
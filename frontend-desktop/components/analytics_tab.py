@@ -13,6 +13,8 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QFont
 
+from report_download import start_report_download
+
 class AnalyticsTab(QWidget):
     def __init__(self, api_client, parent=None):
         super().__init__(parent)
@@ -218,22 +220,4 @@ class AnalyticsTab(QWidget):
         )
         
         if file_path:
-            try:
-                # Show progress dialog
-                from PyQt5.QtWidgets import QProgressDialog
-                progress = QProgressDialog("Generating PDF report...", None, 0, 0, self)
-                progress.setWindowModality(Qt.WindowModal)
-                progress.show()
-                
-                # Download PDF
-                success, error = self.api_client.download_pdf(save_path=file_path)
-                
-                progress.close()
-                
-                if success:
-                    QMessageBox.information(self, "Success", f"PDF report saved to:\n{file_path}")
-                else:
-                    QMessageBox.critical(self, "Error", f"Failed to generate PDF:\n{error}")
-                    
-            except Exception as e:
-                QMessageBox.critical(self, "Error", f"An error occurred:\n{str(e)}")
+            self.report_thread = start_report_download(self, self.api_client, None, file_path)
@@ -2,9 +2,27 @@
 API Client for communicating with the Django backend
 """
 
+import bz2
+import gzip
+import hashlib
+import os
 import requests
 import json
-from typing import Dict, List, Optional, Tuple
+import shutil
+import socket
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+# compress argument of APIClient.upload_csv -> (filename suffix, file opener)
+COMPRESSED_SUFFIXES = {
+    'gzip': ('.gz', lambda f, mode: gzip.GzipFile(fileobj=f, mode=mode)),
+    'bz2': ('.bz2', bz2.BZ2File),
+}
+
 
 class APIClient:
     def __init__(self, base_url: str = "http://localhost:8000/api"):
@@ -55,23 +73,40 @@ class APIClient:
         except requests.exceptions.RequestException as e:
             return False, f"Network error: {str(e)}"
     
-    def upload_csv(self, file_path: str) -> Tuple[bool, Dict, str]:
-        """Upload CSV file and return (success, data, error_message)"""
+    def upload_csv(self, file_path: str, max_retries: int = 3,
+                   max_retry_wait: float = 60.0, compress: Optional[str] = None) -> Tuple[bool, Dict, str]:
+        """Upload CSV file and return (success, data, error_message).
+
+        When the server is busy or the upload rate limit is hit (429/503),
+        the upload is retried after the ``Retry-After`` delay it sends, up to
+        ``max_retries`` times and as long as a delay is at most ``max_retry_wait``.
+        ``compress`` ('gzip' or 'bz2') compresses the file before it is sent.
+        """
         try:
-            with open(file_path, 'rb') as f:
-                files = {'file': f}
-                # Remove Content-Type for file upload
-                headers = {'Authorization': f'Token {self.token}'}
-                response = requests.post(
-                    f"{self.base_url}/upload/",
-                    files=files,
-                    headers=headers
-                )
+            if compress is not None and compress not in COMPRESSED_SUFFIXES:
+                return False, {}, f"Unsupported compression: {compress}"
+            with self._upload_body(file_path, compress) as (filename, body):
+                for attempt in range(max_retries + 1):
+                    body.seek(0)
+                    files = {'file': (filename, body)}
+                    # Remove Content-Type for file upload
+                    headers = {'Authorization': f'Token {self.token}'}
+                    response = requests.post(
+                        f"{self.base_url}/upload/",
+                        files=files,
+                        headers=headers
+                    )
+                    
+                    delay = self._retry_after(response)
+                    if delay is None or delay > max_retry_wait or attempt == max_retries:
+                        break
+                    time.sleep(delay)
             
             if response.status_code == 200:
                 return True, response.json(), ""
             else:
-                error_msg = response.json().get('error', 'Upload failed')
+                data = response.json()
+                error_msg = data.get('error') or data.get('detail') or 'Upload failed'
                 return False, {}, error_msg
                 
         except requests.exceptions.RequestException as e:
@@ -79,6 +114,140 @@ class APIClient:
         except Exception as e:
             return False, {}, f"File error: {str(e)}"
     
+    @staticmethod
+    @contextmanager
+    def _upload_body(file_path: str, compress: Optional[str]):
+        """(filename, open file) to send: the file itself, or a compressed temporary copy"""
+        filename = os.path.basename(file_path)
+        if compress is None:
+            with open(file_path, 'rb') as f:
+                yield filename, f
+            return
+        suffix, opener = COMPRESSED_SUFFIXES[compress]
+        with open(file_path, 'rb') as f, tempfile.TemporaryFile() as body:
+            with opener(body, 'wb') as compressed:
+                shutil.copyfileobj(f, compressed, 1024 * 1024)
+            yield filename + suffix, body
+    
+    def upload_csv_resumable(self, file_path: str, chunk_size: int = 1024 * 1024,
+                             session_id: Optional[str] = None, max_network_errors: int = 5,
+                             retry_delay: float = 2.0,
+                             progress_callback: Optional[Callable[[int, int], None]] = None,
+                             max_retries: int = 3, max_retry_wait: float = 60.0
+                             ) -> Tuple[bool, Dict, str]:
+        """Upload a CSV file in checksummed chunks and return (success, data, error_message).
+
+        After a network error the server is asked which chunks it already has
+        and only the missing ones are sent again, up to ``max_network_errors``
+        times. If the upload still fails, ``data`` holds its ``session_id``,
+        which can be passed back in to resume it later. ``progress_callback``
+        receives (bytes stored, total bytes) after every chunk. A busy server
+        (429/503) at finalize is retried as in ``upload_csv``, with
+        ``max_retries`` and ``max_retry_wait``.
+        """
+        try:
+            size, file_digest = self._file_sha256(file_path)
+        except OSError as e:
+            return False, {}, f"File error: {str(e)}"
+        
+        headers = {'Authorization': f'Token {self.token}'}
+        network_errors = 0
+        while True:
+            try:
+                if session_id is None:
+                    response = requests.post(
+                        f"{self.base_url}/uploads/",
+                        json={
+                            'filename': os.path.basename(file_path),
+                            'size': size,
+                            'chunk_size': chunk_size,
+                            'sha256': file_digest
+                        },
+                        headers=headers
+                    )
+                    if response.status_code != 201:
+                        return False, {}, response.json().get('error', 'Upload failed')
+                    session = response.json()
+                    session_id = session['id']
+                else:
+                    response = requests.get(f"{self.base_url}/uploads/{session_id}/", headers=headers)
+                    if response.status_code != 200:
+                        return False, {}, response.json().get('error', 'Upload failed')
+                    session = response.json()
+                
+                if session['status'] == 'open':
+                    stored = sum(end - start for start, end in session['received'])
+                    with open(file_path, 'rb') as f:
+                        for index in session['missing_chunks']:
+                            f.seek(index * session['chunk_size'])
+                            chunk = f.read(session['chunk_size'])
+                            response = requests.put(
+                                f"{self.base_url}/uploads/{session_id}/chunks/{index}/",
+                                data=chunk,
+                                headers={
+                                    **headers,
+                                    'Content-Type': 'application/octet-stream',
+                                    'X-Chunk-SHA256': hashlib.sha256(chunk).hexdigest()
+                                }
+                            )
+                            if response.status_code != 200:
+                                return False, {'session_id': session_id}, response.json().get('error', 'Upload failed')
+                            stored += len(chunk)
+                            if progress_callback:
+                                progress_callback(stored, size)
+                
+                for attempt in range(max_retries + 1):
+                    response = requests.post(f"{self.base_url}/uploads/{session_id}/finalize/", headers=headers)
+                    delay = self._retry_after(response)
+                    if delay is None or delay > max_retry_wait or attempt == max_retries:
+                        break
+                    time.sleep(delay)
+                
+                if response.status_code == 200:
+                    return True, response.json(), ""
+                data = response.json()
+                error_msg = data.get('error') or data.get('detail') or 'Upload failed'
+                return False, {'session_id': session_id}, error_msg
+                
+            except requests.exceptions.RequestException as e:
+                network_errors += 1
+                if network_errors > max_network_errors:
+                    return False, {'session_id': session_id}, f"Network error: {str(e)}"
+                time.sleep(retry_delay * network_errors)
+            except OSError as e:
+                return False, {'session_id': session_id}, f"File error: {str(e)}"
+    
+    @staticmethod
+    def _file_sha256(file_path: str) -> Tuple[int, str]:
+        """(size, hex SHA-256) of a file, read in blocks"""
+        digest = hashlib.sha256()
+        size = 0
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+                size += len(block)
+        return size, digest.hexdigest()
+    
+    @staticmethod
+    def _retry_after(response) -> Optional[float]:
+        """Seconds to wait before retrying a 429/503 response, or None if it should not be retried"""
+        if response.status_code not in (429, 503):
+            return None
+        value = response.headers.get('Retry-After')
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:  # the HTTP-date form
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    
     def get_equipment(self, dataset_id: Optional[int] = None) -> Tuple[bool, List, str]:
         """Get equipment list and return (success, data, error_message)"""
         try:
@@ -100,6 +269,65 @@ class APIClient:
         except requests.exceptions.RequestException as e:
             return False, [], f"Network error: {str(e)}"
     
+    def get_anomalies(self, dataset_id: Optional[int] = None) -> Tuple[bool, Dict, str]:
+        """Get the rows flagged as anomalous at upload, worst first, and return (success, data, error_message)"""
+        try:
+            params = {}
+            if dataset_id:
+                params['dataset_id'] = dataset_id
+                
+            response = self.session.get(
+                f"{self.base_url}/anomalies/",
+                params=params
+            )
+            
+            if response.status_code == 200:
+                return True, response.json(), ""
+            else:
+                error_msg = response.json().get('error', 'Failed to get anomalies')
+                return False, {}, error_msg
+                
+        except requests.exceptions.RequestException as e:
+            return False, {}, f"Network error: {str(e)}"
+    
+    def search_equipment(self, query: str, page: int = 1) -> Tuple[bool, Dict, str]:
+        """Find equipment by tag fragments, best match first, and return (success, data, error_message)"""
+        try:
+            response = self.session.get(
+                f"{self.base_url}/equipment/search/",
+                params={'q': query, 'page': page}
+            )
+            
+            if response.status_code == 200:
+                return True, response.json(), ""
+            else:
+                error_msg = response.json().get('error', 'Failed to search equipment')
+                return False, {}, error_msg
+                
+        except requests.exceptions.RequestException as e:
+            return False, {}, f"Network error: {str(e)}"
+    
+    def get_equipment_trend(self, name: str, parameter: Optional[str] = None) -> Tuple[bool, Dict, str]:
+        """Get one equipment's readings across uploads, oldest first, and return (success, data, error_message)"""
+        try:
+            params = {'name': name}
+            if parameter:
+                params['parameter'] = parameter
+                
+            response = self.session.get(
+                f"{self.base_url}/equipment/trend/",
+                params=params
+            )
+            
+            if response.status_code == 200:
+                return True, response.json(), ""
+            else:
+                error_msg = response.json().get('error', 'Failed to get equipment trend')
+                return False, {}, error_msg
+                
+        except requests.exceptions.RequestException as e:
+            return False, {}, f"Network error: {str(e)}"
+    
     def get_summary(self, dataset_id: Optional[int] = None) -> Tuple[bool, Dict, str]:
         """Get summary statistics and return (success, data, error_message)"""
         try:
@@ -121,31 +349,136 @@ class APIClient:
         except requests.exceptions.RequestException as e:
             return False, {}, f"Network error: {str(e)}"
     
-    def get_history(self) -> Tuple[bool, List, str]:
-        """Get upload history and return (success, data, error_message)"""
+    def get_history(self, page: int = 1) -> Tuple[bool, Dict, str]:
+        """Get one page of the upload history and return (success, page, error_message)
+
+        The page has the datasets under 'results', newest first, and the total under 'count'.
+        """
         try:
-            response = self.session.get(f"{self.base_url}/history/")
+            response = self.session.get(f"{self.base_url}/history/", params={'page': page})
             
             if response.status_code == 200:
                 return True, response.json(), ""
             else:
                 error_msg = response.json().get('error', 'Failed to get history')
-                return False, [], error_msg
+                return False, {}, error_msg
                 
         except requests.exceptions.RequestException as e:
-            return False, [], f"Network error: {str(e)}"
+            return False, {}, f"Network error: {str(e)}"
     
-    def download_pdf(self, dataset_id: Optional[int] = None, save_path: str = "report.pdf") -> Tuple[bool, str]:
-        """Download PDF report and return (success, error_message)"""
+    def request_report(self, dataset_id: Optional[int] = None) -> Tuple[bool, Dict, str]:
+        """Queue a PDF report and return (success, job, error_message)"""
         try:
-            params = {}
+            payload = {}
             if dataset_id:
-                params['dataset_id'] = dataset_id
+                payload['dataset_id'] = dataset_id
+                
+            response = self.session.post(
+                f"{self.base_url}/report/jobs/",
+                json=payload
+            )
+            
+            if response.status_code == 202:
+                return True, response.json(), ""
+            else:
+                error_msg = response.json().get('error', 'Failed to queue report')
+                return False, {}, error_msg
                 
+        except requests.exceptions.RequestException as e:
+            return False, {}, f"Network error: {str(e)}"
+    
+    def get_report_status(self, job_id: int) -> Tuple[bool, Dict, str]:
+        """Get report job progress and return (success, job, error_message)"""
+        try:
+            response = self.session.get(f"{self.base_url}/report/jobs/{job_id}/")
+            
+            if response.status_code == 200:
+                return True, response.json(), ""
+            else:
+                error_msg = response.json().get('error', 'Failed to get report status')
+                return False, {}, error_msg
+                
+        except requests.exceptions.RequestException as e:
+            return False, {}, f"Network error: {str(e)}"
+    
+    def stream_events(self, last_event_id: Optional[str] = None, read_timeout: float = 60.0,
+                      on_open: Optional[Callable[[requests.Response], None]] = None):
+        """Yield server-sent events as {'id', 'event', 'data'} dicts until the server ends the stream.
+
+        Resumes after ``last_event_id`` when given. ``on_open`` receives the
+        response once the server accepted the stream. Network errors are raised
+        so the caller can reconnect with the id of the last event it received;
+        a server that cannot stream (a WSGI deployment) answers 501, raised as
+        an ``HTTPError`` carrying the response.
+        """
+        headers = {'Authorization': f'Token {self.token}', 'Accept': 'text/event-stream'}
+        if last_event_id:
+            headers['Last-Event-ID'] = last_event_id
+        # The server sends a keepalive well within read_timeout while idle
+        with requests.get(f"{self.base_url}/async/events/", headers=headers, stream=True,
+                          timeout=(10, read_timeout)) as response:
+            if response.status_code != 200:
+                raise requests.exceptions.HTTPError(
+                    f"Event stream failed with status {response.status_code}", response=response
+                )
+            if on_open:
+                on_open(response)
+            event = {}
+            for line in response.iter_lines(decode_unicode=True):
+                if line:
+                    field, _, value = line.partition(':')
+                    if field in ('id', 'event', 'data'):
+                        event[field] = value[1:] if value.startswith(' ') else value
+                    continue
+                # A blank line ends an event; comments and retry hints carry no data
+                if 'data' in event:
+                    event['data'] = json.loads(event['data'])
+                    yield event
+                event = {}
+    
+    @staticmethod
+    def close_stream(response: requests.Response):
+        """End a streaming response from another thread.
+
+        Closing the response alone leaves a read blocked until the server sends
+        more data, so the socket is shut down first.
+        """
+        try:
+            response.raw._fp.fp.raw._sock.shutdown(socket.SHUT_RDWR)
+        except (AttributeError, OSError):
+            pass  # Already finished or closed
+        response.close()
+    
+    def download_pdf(self, dataset_id: Optional[int] = None, save_path: str = "report.pdf",
+                     progress_callback: Optional[Callable[[Dict], None]] = None,
+                     poll_interval: float = 0.5, timeout: float = 600.0) -> Tuple[bool, str]:
+        """Queue a PDF report, wait for it to finish and save it.
+
+        ``progress_callback`` receives each job status payload while waiting.
+        Returns (success, error_message).
+        """
+        success, job, error = self.request_report(dataset_id)
+        if not success:
+            return False, error
+        
+        deadline = time.monotonic() + timeout
+        while job.get('status') not in ('done', 'failed'):
+            if time.monotonic() > deadline:
+                return False, "Timed out waiting for report"
+            time.sleep(poll_interval)
+            success, job, error = self.get_report_status(job['id'])
+            if not success:
+                return False, error
+            if progress_callback:
+                progress_callback(job)
+        
+        if job['status'] == 'failed':
+            return False, job.get('error') or "Report generation failed"
+        
+        try:
             headers = {'Authorization': f'Token {self.token}'}
             response = requests.get(
-                f"{self.base_url}/report/pdf/",
-                params=params,
+                job['download_url'],
                 headers=headers,
                 stream=True
             )
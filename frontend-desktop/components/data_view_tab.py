@@ -90,6 +90,11 @@ class DataViewTab(QWidget):
         table_group = QGroupBox("Equipment Data")
         table_layout = QVBoxLayout()
         
+        # Rows the server flagged as anomalous at upload are highlighted in the table
+        self.anomaly_label = QLabel("")
+        self.anomaly_label.setStyleSheet("color: #721c24; font-size: 12px; font-weight: bold;")
+        table_layout.addWidget(self.anomaly_label)
+        
         self.equipment_table = QTableWidget()
         self.equipment_table.setColumnCount(5)
         self.equipment_table.setHorizontalHeaderLabels([
@@ -225,8 +230,10 @@ class DataViewTab(QWidget):
             for label in self.summary_labels.values():
                 label.setText("0")
         
-        # Update equipment table
+        # Update equipment table (sorting would move rows while they are filled in)
+        self.equipment_table.setSortingEnabled(False)
         self.equipment_table.setRowCount(len(equipment))
+        flagged_rows = 0
         
         for row, item in enumerate(equipment):
             # Equipment Name
@@ -249,10 +256,32 @@ class DataViewTab(QWidget):
             # Temperature
             temp_item = QTableWidgetItem(f"{item.get('temperature', 0):.1f}")
             self.equipment_table.setItem(row, 4, temp_item)
+            
+            if item.get('anomaly_score') is not None:
+                flagged_rows += 1
+                self.highlight_anomaly(row, item)
+        
+        self.equipment_table.setSortingEnabled(True)
+        if flagged_rows:
+            self.anomaly_label.setText(f"{flagged_rows} anomalous row(s) highlighted")
+        else:
+            self.anomaly_label.setText("")
         
         # Adjust row heights
         self.equipment_table.resizeRowsToContents()
     
+    def highlight_anomaly(self, row, item):
+        """Highlight the name and the failed readings of a row flagged as anomalous"""
+        reasons = item.get('anomaly_reasons', [])
+        tooltip = f"Anomaly score {item['anomaly_score']:.2f}: {', '.join(reasons)}"
+        columns = {'flowrate': 2, 'pressure': 3, 'temperature': 4}
+        cells = {0} | {columns[reason.split(':')[0]] for reason in reasons if reason.split(':')[0] in columns}
+        
+        for column in cells:
+            cell = self.equipment_table.item(row, column)
+            cell.setBackground(QColor(248, 215, 218))  # Light red
+            cell.setToolTip(tooltip)
+    
     def get_type_color(self, equipment_type):
         """Get background color for equipment type"""
         
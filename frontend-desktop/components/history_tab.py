@@ -10,14 +10,21 @@ from PyQt5.QtCore import Qt, pyqtSignal
 from PyQt5.QtGui import QFont, QColor
 from datetime import datetime
 
+from report_download import start_report_download
+
+STORAGE_LABELS = {'hot': "Hot", 'archived': "Archived", 'rehydrated': "Rehydrated"}
+ARCHIVED_COLOR = QColor("#6c757d")
+
 class HistoryTab(QWidget):
     dataset_selected = pyqtSignal(int)
+    page_changed = pyqtSignal()
     
     def __init__(self, api_client, parent=None):
         super().__init__(parent)
         self.api_client = api_client
         self.current_history = []
         self.selected_dataset_id = None
+        self.page = 1
         
         self.init_ui()
         self.apply_styles()
@@ -33,10 +40,10 @@ class HistoryTab(QWidget):
         
         # Create table
         self.history_table = QTableWidget()
-        self.history_table.setColumnCount(7)
+        self.history_table.setColumnCount(8)
         self.history_table.setHorizontalHeaderLabels([
             "Filename", "Upload Date", "Equipment Count", 
-            "Avg Flowrate", "Avg Pressure", "Avg Temperature", "Actions"
+            "Avg Flowrate", "Avg Pressure", "Avg Temperature", "Storage", "Actions"
         ])
         
         # Configure table
@@ -48,6 +55,7 @@ class HistoryTab(QWidget):
         header.setSectionResizeMode(4, QHeaderView.ResizeToContents)
         header.setSectionResizeMode(5, QHeaderView.ResizeToContents)
         header.setSectionResizeMode(6, QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(7, QHeaderView.ResizeToContents)
         
         self.history_table.setAlternatingRowColors(True)
         self.history_table.setSelectionBehavior(QTableWidget.SelectRows)
@@ -67,9 +75,22 @@ class HistoryTab(QWidget):
         self.pdf_button.clicked.connect(self.download_pdf)
         self.pdf_button.setEnabled(False)
         
+        self.previous_button = QPushButton("< Newer")
+        self.previous_button.clicked.connect(self.show_previous_page)
+        self.previous_button.setEnabled(False)
+        
+        self.page_label = QLabel("")
+        
+        self.next_button = QPushButton("Older >")
+        self.next_button.clicked.connect(self.show_next_page)
+        self.next_button.setEnabled(False)
+        
         buttons_layout.addWidget(self.load_button)
         buttons_layout.addWidget(self.pdf_button)
         buttons_layout.addStretch()
+        buttons_layout.addWidget(self.previous_button)
+        buttons_layout.addWidget(self.page_label)
+        buttons_layout.addWidget(self.next_button)
         
         history_layout.addLayout(buttons_layout)
         history_group.setLayout(history_layout)
@@ -153,10 +174,12 @@ class HistoryTab(QWidget):
             }
         """)
     
-    def update_history(self, history):
-        """Update the history table with new data"""
+    def update_history(self, page):
+        """Update the history table with a page of the history"""
+        history = page.get('results', [])
         self.current_history = history
-        
+        # Rows would move while being filled if sorting stayed on
+        self.history_table.setSortingEnabled(False)
         self.history_table.setRowCount(len(history))
         
         for row, item in enumerate(history):
@@ -199,6 +222,15 @@ class HistoryTab(QWidget):
             temp_item.setTextAlignment(Qt.AlignCenter)
             self.history_table.setItem(row, 5, temp_item)
             
+            # Storage tier; archived rows are rehydrated when loaded
+            storage = item.get('storage', 'hot')
+            storage_item = QTableWidgetItem(STORAGE_LABELS.get(storage, storage))
+            storage_item.setTextAlignment(Qt.AlignCenter)
+            self.history_table.setItem(row, 6, storage_item)
+            if storage == 'archived':
+                for column in range(7):
+                    self.history_table.item(row, column).setForeground(ARCHIVED_COLOR)
+            
             # Actions button
             actions_widget = QWidget()
             actions_layout = QHBoxLayout()
@@ -240,16 +272,32 @@ class HistoryTab(QWidget):
             actions_layout.addWidget(pdf_btn)
             actions_widget.setLayout(actions_layout)
             
-            self.history_table.setCellWidget(row, 6, actions_widget)
+            self.history_table.setCellWidget(row, 7, actions_widget)
         
         # Adjust row heights
         self.history_table.resizeRowsToContents()
+        self.history_table.setSortingEnabled(True)
         
-        # Update info label
-        if len(history) == 0:
+        # Update paging and info label
+        count = page.get('count', len(history))
+        self.previous_button.setEnabled(bool(page.get('previous')))
+        self.next_button.setEnabled(bool(page.get('next')))
+        self.page_label.setText(f"Page {self.page}")
+        if count == 0:
             self.info_label.setText("No upload history available.")
         else:
-            self.info_label.setText(f"Showing {len(history)} recent uploads. Click 'Load' to view a dataset or 'PDF' to download a report.")
+            self.info_label.setText(f"Showing {len(history)} of {count} uploads. Click 'Load' to view a dataset or 'PDF' to download a report. Archived datasets are restored when loaded.")
+    
+    def show_previous_page(self):
+        """Show the page of newer uploads"""
+        if self.page > 1:
+            self.page -= 1
+            self.page_changed.emit()
+    
+    def show_next_page(self):
+        """Show the page of older uploads"""
+        self.page += 1
+        self.page_changed.emit()
     
     def on_selection_changed(self):
         """Handle table selection change"""
@@ -294,22 +342,4 @@ class HistoryTab(QWidget):
         )
         
         if file_path:
-            try:
-                # Show progress dialog
-                from PyQt5.QtWidgets import QProgressDialog
-                progress = QProgressDialog("Generating PDF report...", None, 0, 0, self)
-                progress.setWindowModality(Qt.WindowModal)
-                progress.show()
-                
-                # Download PDF
-                success, error = self.api_client.download_pdf(dataset_id, file_path)
-                
-                progress.close()
-                
-                if success:
-                    QMessageBox.information(self, "Success", f"PDF report saved to:\n{file_path}")
-                else:
-                    QMessageBox.critical(self, "Error", f"Failed to generate PDF:\n{error}")
-                    
-            except Exception as e:
-                QMessageBox.critical(self, "Error", f"An error occurred:\n{str(e)}")
+            self.report_thread = start_report_download(self, self.api_client, dataset_id, file_path)
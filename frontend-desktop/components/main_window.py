@@ -4,6 +4,7 @@ Main Window for PyQt5 Desktop Application
 
 import sys
 import os
+import requests
 from PyQt5.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QTabWidget,
     QMenuBar, QMenu, QAction, QStatusBar, QMessageBox, QFileDialog,
@@ -19,13 +20,14 @@ from history_tab import HistoryTab
 
 class DataRefreshThread(QThread):
     """Thread for refreshing data to avoid UI freezing"""
-    data_ready = pyqtSignal(dict, list, list)  # summary, equipment, history
+    data_ready = pyqtSignal(dict, list, dict)  # summary, equipment, history page
     error_occurred = pyqtSignal(str)
     
-    def __init__(self, api_client, dataset_id=None):
+    def __init__(self, api_client, dataset_id=None, history_page=1):
         super().__init__()
         self.api_client = api_client
         self.dataset_id = dataset_id
+        self.history_page = history_page
     
     def run(self):
         try:
@@ -39,7 +41,7 @@ class DataRefreshThread(QThread):
                 self.error_occurred.emit(error)
                 return
             
-            success, history, error = self.api_client.get_history()
+            success, history, error = self.api_client.get_history(self.history_page)
             if not success:
                 self.error_occurred.emit(error)
                 return
@@ -49,7 +51,88 @@ class DataRefreshThread(QThread):
         except Exception as e:
             self.error_occurred.emit(f"Unexpected error: {str(e)}")
 
+class HistoryRefreshThread(QThread):
+    """Thread fetching one page of the upload history"""
+    history_ready = pyqtSignal(dict)
+    error_occurred = pyqtSignal(str)
+    
+    def __init__(self, api_client, page=1):
+        super().__init__()
+        self.api_client = api_client
+        self.page = page
+    
+    def run(self):
+        try:
+            success, history, error = self.api_client.get_history(self.page)
+            if not success:
+                self.error_occurred.emit(error)
+                return
+            
+            self.history_ready.emit(history)
+            
+        except Exception as e:
+            self.error_occurred.emit(f"Unexpected error: {str(e)}")
+
+class EventListenerThread(QThread):
+    """Thread listening to the server's event stream, reconnecting where it left off"""
+    event_received = pyqtSignal(str, dict)  # kind, data
+    connection_changed = pyqtSignal(bool)  # whether events are being received
+    
+    RECONNECT_DELAY_MS = 3000
+    STOP_TIMEOUT_MS = 5000
+    
+    def __init__(self, api_client):
+        super().__init__()
+        self.api_client = api_client
+        self.last_event_id = None
+        self.response = None
+    
+    def on_open(self, response):
+        self.response = response
+        if self.isInterruptionRequested():
+            # stop() ran before the stream opened
+            self.api_client.close_stream(response)
+        self.connection_changed.emit(True)
+    
+    def stop(self):
+        """End the stream and wait for the thread; it must not outlive the window"""
+        self.requestInterruption()
+        if self.response is not None:
+            self.api_client.close_stream(self.response)
+        if not self.wait(self.STOP_TIMEOUT_MS):
+            # Still connecting; Qt aborts if a running thread is destroyed
+            self.terminate()
+            self.wait()
+    
+    def run(self):
+        while not self.isInterruptionRequested():
+            try:
+                for event in self.api_client.stream_events(self.last_event_id, on_open=self.on_open):
+                    if self.isInterruptionRequested():
+                        return
+                    self.last_event_id = event.get('id', self.last_event_id)
+                    self.event_received.emit(event.get('event', 'message'), event['data'])
+                # The server ends streams periodically; reconnect right away
+                continue
+            except requests.exceptions.HTTPError as e:
+                if e.response is not None and e.response.status_code == 501:
+                    # The server cannot stream (WSGI); keep polling instead
+                    self.connection_changed.emit(False)
+                    return
+            except Exception:
+                pass
+            finally:
+                self.response = None
+            if self.isInterruptionRequested():
+                return
+            self.connection_changed.emit(False)
+            self.msleep(self.RECONNECT_DELAY_MS)
+
 class MainWindow(QMainWindow):
+    POLL_INTERVAL_MS = 30000
+    # Fallback refresh while events arrive, in case one is missed
+    PUSHED_POLL_INTERVAL_MS = 300000
+    
     def __init__(self, token: str, username: str, parent=None):
         super().__init__(parent)
         self.token = token
@@ -65,8 +148,14 @@ class MainWindow(QMainWindow):
         self.apply_styles()
         self.refresh_data()
         
-        # Auto-refresh every 30 seconds
-        self.refresh_timer.start(30000)
+        # Auto-refresh every 30 seconds, slowed down while the server pushes events
+        self.refresh_timer.start(self.POLL_INTERVAL_MS)
+        
+        # New and evicted datasets are pushed by servers that can stream events (ASGI)
+        self.event_listener = EventListenerThread(self.api_client)
+        self.event_listener.event_received.connect(self.on_server_event)
+        self.event_listener.connection_changed.connect(self.on_event_stream_changed)
+        self.event_listener.start()
     
     def init_ui(self):
         """Initialize UI components with modern styling"""
@@ -302,6 +391,7 @@ class MainWindow(QMainWindow):
         # Connect tab signals
         self.data_view_tab.data_updated.connect(self.on_data_updated)
         self.history_tab.dataset_selected.connect(self.on_dataset_selected)
+        self.history_tab.page_changed.connect(self.refresh_history)
         
         
         # Create menu bar
@@ -423,11 +513,18 @@ class MainWindow(QMainWindow):
         """Refresh all data"""
         self.status_bar.showMessage("Refreshing data...")
         
-        self.refresh_thread = DataRefreshThread(self.api_client, self.current_dataset_id)
+        self.refresh_thread = DataRefreshThread(self.api_client, self.current_dataset_id, self.history_tab.page)
         self.refresh_thread.data_ready.connect(self.on_data_refreshed)
         self.refresh_thread.error_occurred.connect(self.on_refresh_error)
         self.refresh_thread.start()
     
+    def refresh_history(self):
+        """Refresh the history tab's current page only"""
+        self.history_thread = HistoryRefreshThread(self.api_client, self.history_tab.page)
+        self.history_thread.history_ready.connect(self.history_tab.update_history)
+        self.history_thread.error_occurred.connect(self.on_refresh_error)
+        self.history_thread.start()
+    
     def on_data_refreshed(self, summary, equipment, history):
         """Handle data refresh completion"""
         self.status_bar.showMessage("Data refreshed successfully")
@@ -442,6 +539,32 @@ class MainWindow(QMainWindow):
         self.status_bar.showMessage("Data refresh failed")
         QMessageBox.warning(self, "Refresh Error", f"Failed to refresh data: {error}")
     
+    def on_event_stream_changed(self, connected):
+        """Poll often only while no event stream is connected"""
+        interval = self.PUSHED_POLL_INTERVAL_MS if connected else self.POLL_INTERVAL_MS
+        if self.refresh_timer.interval() != interval:
+            self.refresh_timer.start(interval)
+    
+    def on_server_event(self, kind, data):
+        """Refresh the views affected by an event pushed by the server"""
+        if kind == 'dataset.created':
+            self.status_bar.showMessage(f"New dataset uploaded: {data.get('filename', '')}")
+            if self.current_dataset_id is None:
+                # The data and analytics tabs show the latest dataset, which this now is
+                self.refresh_data()
+            else:
+                self.refresh_history()
+        elif kind == 'dataset.evicted':
+            if data.get('dataset_id') == self.current_dataset_id and not data.get('archived'):
+                # Its rows are gone; fall back to the latest dataset
+                self.current_dataset_id = None
+                self.refresh_data()
+            else:
+                # The rows shown are unchanged; only the history lists the dataset's new storage
+                self.refresh_history()
+        elif kind == 'report.ready':
+            self.status_bar.showMessage(f"Report ready for dataset {data.get('dataset_id')}")
+    
     def on_data_updated(self):
         """Handle data update from data view tab"""
         self.refresh_data()
@@ -479,8 +602,9 @@ class MainWindow(QMainWindow):
     
     def closeEvent(self, event):
         """Handle application close event"""
-        # Stop refresh timer
+        # Stop refresh timer and event listener
         self.refresh_timer.stop()
+        self.event_listener.stop()
         
         # Logout from server
         try:
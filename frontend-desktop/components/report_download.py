@@ -0,0 +1,56 @@
+"""
+Background PDF report download with progress reporting
+"""
+
+from PyQt5.QtWidgets import QProgressDialog, QMessageBox
+from PyQt5.QtCore import Qt, QThread, pyqtSignal
+
+
+class ReportDownloadThread(QThread):
+    """Thread that queues a report on the server and waits for it to be ready"""
+    progress = pyqtSignal(dict)
+    download_complete = pyqtSignal(bool, str)
+
+    def __init__(self, api_client, dataset_id, file_path):
+        super().__init__()
+        self.api_client = api_client
+        self.dataset_id = dataset_id
+        self.file_path = file_path
+
+    def run(self):
+        success, error = self.api_client.download_pdf(
+            self.dataset_id,
+            self.file_path,
+            progress_callback=self.progress.emit
+        )
+        self.download_complete.emit(success, error)
+
+
+def start_report_download(parent, api_client, dataset_id, file_path):
+    """Download a report in the background while showing its progress"""
+    progress = QProgressDialog("Queuing PDF report...", None, 0, 0, parent)
+    progress.setWindowModality(Qt.WindowModal)
+    progress.show()
+
+    def on_progress(job):
+        rows_total = job.get('rows_total', 0)
+        if rows_total:
+            progress.setMaximum(rows_total)
+            progress.setValue(job.get('rows_processed', 0))
+        progress.setLabelText(
+            f"Generating PDF report... {job.get('rows_processed', 0)}/{rows_total} rows, "
+            f"{job.get('pages_rendered', 0)} pages rendered"
+        )
+
+    def on_complete(success, error):
+        progress.close()
+        if success:
+            QMessageBox.information(parent, "Success", f"PDF report saved to:\n{file_path}")
+        else:
+            QMessageBox.critical(parent, "Error", f"Failed to generate PDF:\n{error}")
+
+    thread = ReportDownloadThread(api_client, dataset_id, file_path)
+    thread.progress.connect(on_progress)
+    thread.download_complete.connect(on_complete)
+    thread.start()
+    return thread
@@ -10,7 +10,8 @@ import HistoryList from './HistoryList';
 const Dashboard = () => {
   const [summary, setSummary] = useState(null);
   const [equipment, setEquipment] = useState([]);
-  const [history, setHistory] = useState([]);
+  const [history, setHistory] = useState({ count: 0, results: [] });
+  const [historyPage, setHistoryPage] = useState(1);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState('');
   const [selectedDatasetId, setSelectedDatasetId] = useState(null);
@@ -37,13 +38,23 @@ const Dashboard = () => {
     }
   }, []);
 
+  const handleHistoryPage = useCallback(async (page) => {
+    try {
+      const historyRes = await equipmentAPI.getHistory(page);
+      setHistory(historyRes.data);
+      setHistoryPage(page);
+    } catch (err) {
+      setError('Failed to load upload history.');
+    }
+  }, []);
+
   const handleUploadSuccess = useCallback(async (datasetId) => {
     setUploadProgress(0);
     try {
       const [summaryRes, equipmentRes, historyRes] = await Promise.all([
         equipmentAPI.getSummary(datasetId),
         equipmentAPI.getEquipment(datasetId),
-        equipmentAPI.getHistory()
+        equipmentAPI.getHistory(historyPage)
       ]);
 
       setSummary(summaryRes.data);
@@ -55,7 +66,7 @@ const Dashboard = () => {
     } finally {
       setLoading(false);
     }
-  }, []);
+  }, [historyPage]);
 
   const handleDownloadPDF = useCallback(async () => {
     if (!summary || summary.total_count === 0) {
@@ -218,6 +229,8 @@ const Dashboard = () => {
           </h3>
           <HistoryList 
             history={history} 
+            page={historyPage}
+            onPageChange={handleHistoryPage}
             onDatasetSelect={handleUploadSuccess}
             selectedDatasetId={selectedDatasetId}
           />
@@ -1,6 +1,8 @@
 import React from 'react';
 
-const HistoryList = ({ history, onDatasetSelect, selectedDatasetId }) => {
+const STORAGE_LABELS = { hot: 'Hot', archived: 'Archived', rehydrated: 'Rehydrated' };
+
+const HistoryList = ({ history, page, onPageChange, onDatasetSelect, selectedDatasetId }) => {
   const formatDate = (dateString) => {
     const date = new Date(dateString);
     return date.toLocaleString();
@@ -12,7 +14,7 @@ const HistoryList = ({ history, onDatasetSelect, selectedDatasetId }) => {
     }
   };
 
-  if (history.length === 0) {
+  if (history.count === 0) {
     return (
       <div className="card">
         <p style={{ 
@@ -39,15 +41,17 @@ const HistoryList = ({ history, onDatasetSelect, selectedDatasetId }) => {
               <th>Avg Flowrate</th>
               <th>Avg Pressure</th>
               <th>Avg Temperature</th>
+              <th>Storage</th>
               <th>Action</th>
             </tr>
           </thead>
           <tbody>
-            {history.map((item) => (
+            {history.results.map((item) => (
               <tr 
                 key={item.id}
                 style={{
                   backgroundColor: selectedDatasetId === item.id ? '#e6f3ff' : 'transparent',
+                  color: item.storage === 'archived' ? '#6c757d' : undefined,
                   cursor: 'pointer'
                 }}
                 onClick={() => handleRowClick(item.id)}
@@ -82,6 +86,7 @@ const HistoryList = ({ history, onDatasetSelect, selectedDatasetId }) => {
                 <td>{item.avg_flowrate.toFixed(2)} L/min</td>
                 <td>{item.avg_pressure.toFixed(2)} bar</td>
                 <td>{item.avg_temperature.toFixed(2)} °C</td>
+                <td>{STORAGE_LABELS[item.storage] || item.storage}</td>
                 <td>
                   <button
                     className="btn btn-primary"
@@ -107,9 +112,30 @@ const HistoryList = ({ history, onDatasetSelect, selectedDatasetId }) => {
         fontStyle: 'italic'
       }}>
         <small>
-          Note: Only the last 5 uploads are retained. Click on any row to load that dataset.
+          Showing {history.results.length} of {history.count} uploads. Click on any row to load that dataset;
+          archived datasets are restored when loaded.
         </small>
       </div>
+
+      {(history.previous || history.next) && (
+        <div style={{ marginTop: '10px', display: 'flex', gap: '10px', alignItems: 'center' }}>
+          <button
+            className="btn btn-secondary"
+            disabled={!history.previous}
+            onClick={() => onPageChange(page - 1)}
+          >
+            Newer
+          </button>
+          <span>Page {page}</span>
+          <button
+            className="btn btn-secondary"
+            disabled={!history.next}
+            onClick={() => onPageChange(page + 1)}
+          >
+            Older
+          </button>
+        </div>
+      )}
     </div>
   );
 };
@@ -65,7 +65,7 @@ export const equipmentAPI = {
   
   getEquipment: (datasetId) => api.get('/equipment/', { params: { dataset_id: datasetId } }),
   getSummary: (datasetId) => api.get('/summary/', { params: { dataset_id: datasetId } }),
-  getHistory: () => api.get('/history/'),
+  getHistory: (page = 1) => api.get('/history/', { params: { page } }),
   downloadPDF: (datasetId) => {
     const pdfApi = axios.create({
       baseURL: API_BASE_URL,